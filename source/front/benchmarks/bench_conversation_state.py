@@ -0,0 +1,79 @@
+"""Size and serialization cost of the conversation state delta sent per update.
+
+Run from source/front:
+
+    python benchmarks/bench_conversation_state.py
+
+Reflex resends a list var in full whenever it changes. This compares, at several conversation
+lengths, the delta produced by appending a message to the full history, by appending to the
+windowed `visible_messages`, and by a streamed token updating `streaming_content`. The
+"bubbles" column counts the message bubbles the browser re-renders for that update.
+
+Browser render time is not measured: it needs a browser (e.g. the React DevTools profiler on a
+long conversation), so "bubbles" only stands in for it as the amount of re-render work.
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chatakon_front.conversation_window import VISIBLE_WINDOW, window_after_append, window_of  # noqa: E402
+
+SIZES = (10, 100, 1000)
+REPEATS = 200
+ANSWER = (
+    "Les inscriptions aux associations se font auprès du BDE au début de chaque semestre. "
+    "Voir https://www.esilv.fr/vie-etudiante/ pour le calendrier et les contacts (question #42)."
+)
+
+
+def make_message(index: int) -> dict:
+    role = "user" if index % 2 else "assistant"
+    return {
+        "id": f"{role}-{index}",
+        "role": role,
+        "content": ANSWER if role == "assistant" else "Comment rejoindre une association ?",
+        "created_at": "2026-10-19T10:00:00+00:00",
+        "time_label": "10:00",
+        "meta": {"status": "approved", "attempts": 1, "reformulated_query": "rejoindre association"}
+        if role == "assistant"
+        else None,
+    }
+
+
+def measure(delta_factory) -> tuple[int, float]:
+    payload = json.dumps(delta_factory())
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        json.dumps(delta_factory())
+    return len(payload.encode()), (time.perf_counter() - start) / REPEATS * 1e6
+
+
+def main() -> None:
+    print(f"{'messages':>8} {'update':<18} {'delta bytes':>12} {'serialize µs':>13} {'bubbles':>8}")
+    for size in SIZES:
+        history = [make_message(index) for index in range(size)]
+        visible = window_of(history, VISIBLE_WINDOW)
+        new_message = make_message(size)
+        streamed = ANSWER[: len(ANSWER) // 2]
+
+        rows = [
+            ("full list", lambda: {"conversation": history + [new_message]}, size + 1),
+            (
+                "windowed list",
+                lambda: {"visible_messages": window_after_append(visible, new_message, VISIBLE_WINDOW)},
+                min(size + 1, VISIBLE_WINDOW),
+            ),
+            ("token (full list)", lambda: {"conversation": history + [{**new_message, "content": streamed}]}, size + 1),
+            ("token (string)", lambda: {"streaming_content": streamed}, 1),
+        ]
+        for name, factory, bubbles in rows:
+            delta_bytes, serialize_us = measure(factory)
+            print(f"{size:>8} {name:<18} {delta_bytes:>12} {serialize_us:>13.1f} {bubbles:>8}")
+
+
+if __name__ == "__main__":
+    main()
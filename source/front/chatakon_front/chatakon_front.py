@@ -77,6 +77,24 @@ def message_bubble(message) -> rx.Component:
     )
 
 
+def streaming_bubble() -> rx.Component:
+    # Rendered apart from the message list so that token updates only touch this bubble.
+    return rx.box(
+        rx.box(
+            rx.markdown(State.streaming_content, class_name="chat-markdown"),
+            rx.box(
+                rx.text(
+                    "Réponse provisoire, en cours de vérification...",
+                    class_name="meta-muted",
+                ),
+                class_name="meta-block",
+            ),
+            class_name="bubble-assistant",
+        ),
+        class_name="message-row start",
+    )
+
+
 def index() -> rx.Component:
     return rx.box(
         rx.cond(State.is_authenticated, rx.fragment(), password_gate()),
@@ -149,9 +167,23 @@ def index() -> rx.Component:
                     class_name="thread-header",
                 ),
                 rx.box(
-                    rx.foreach(State.conversation, message_bubble),
                     rx.cond(
-                        State.is_loading,
+                        State.hidden_message_count > 0,
+                        rx.button(
+                            "Afficher les messages précédents",
+                            on_click=State.load_older_messages,
+                            class_name="history-button",
+                        ),
+                        rx.fragment(),
+                    ),
+                    rx.foreach(State.visible_messages, message_bubble),
+                    rx.cond(
+                        State.is_streaming,
+                        streaming_bubble(),
+                        rx.fragment(),
+                    ),
+                    rx.cond(
+                        State.is_loading & ~State.is_streaming,
                         rx.box(
                             rx.spinner(color="var(--sky-500)", size="2"),
                             rx.text(State.job_status_label, class_name="loading-text"),
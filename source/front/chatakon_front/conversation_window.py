@@ -0,0 +1,27 @@
+"""Windowing helpers for the conversation state.
+
+Reflex resends a whole list var whenever it changes. The full history is therefore kept in a
+backend-only var, and only a bounded window of recent messages is synced to the browser, so
+the delta sent per message stays constant instead of growing with the conversation.
+"""
+
+from typing import Sequence, TypeVar
+
+Message = TypeVar("Message")
+
+VISIBLE_WINDOW = 30
+HISTORY_PAGE = 20
+
+
+def window_after_append(visible: Sequence[Message], message: Message, window_size: int) -> list[Message]:
+    """Return the visible window once `message` is appended, dropping the oldest if it is full."""
+    start = max(0, len(visible) + 1 - window_size)
+    return [*visible[start:], message]
+
+
+def window_of(history: Sequence[Message], window_size: int) -> list[Message]:
+    return list(history[-window_size:]) if window_size > 0 else []
+
+
+def hidden_count(history: Sequence[Message], visible: Sequence[Message]) -> int:
+    return max(0, len(history) - len(visible))
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import os
 import time
 import uuid
@@ -12,6 +13,14 @@ from rxconfig import config
 import httpx
 import reflex as rx
 
+from .conversation_window import (
+    HISTORY_PAGE,
+    VISIBLE_WINDOW,
+    hidden_count,
+    window_after_append,
+    window_of,
+)
+
 
 JOB_STATUS = {
     "QUEUED": "queued",
@@ -22,6 +31,7 @@ JOB_STATUS = {
 
 JOB_POLL_INTERVAL_S = 1.5
 MAX_POLL_DURATION_S = 120
+STREAM_RENDER_INTERVAL_S = 0.05
 BACKEND_URL = config.agentic_api_url
 
 
@@ -84,8 +94,15 @@ class State(rx.State):
     new_message: str = ""
     error_message: str = ""
     is_loading: bool = False
+    is_streaming: bool = False
+    streaming_content: str = ""
     active_job_status: Optional[str] = None
-    conversation: list[ChatMessage] = [initial_assistant_message()]
+    session_id: str = ""
+    # Full history, kept on the backend only; the browser receives `visible_messages`.
+    _history: list[ChatMessage] = [initial_assistant_message()]
+    visible_messages: list[ChatMessage] = list(_history)
+    window_size: int = VISIBLE_WINDOW
+    hidden_message_count: int = 0
     suggestion_chips: list[str] = [
         "Quels sont les prochains événements associatifs ?",
         "Comment réserver une salle de travail au campus ?",
@@ -110,7 +127,17 @@ class State(rx.State):
     def reset_conversation(self) -> None:
         self.new_message = ""
         self.error_message = ""
-        self.conversation = [initial_assistant_message()]
+        self.session_id = ""
+        self.window_size = VISIBLE_WINDOW
+        welcome = initial_assistant_message()
+        self._history = [welcome]
+        self.visible_messages = [welcome]
+        self.hidden_message_count = 0
+
+    def load_older_messages(self) -> None:
+        self.window_size += HISTORY_PAGE
+        self.visible_messages = window_of(self._history, self.window_size)
+        self.hidden_message_count = hidden_count(self._history, self.visible_messages)
 
     def apply_suggestion(self, prompt: str) -> None:
         self.new_message = prompt
@@ -148,13 +175,41 @@ class State(rx.State):
         return BACKEND_URL
 
     def build_job_creation_url(self, message_content: str) -> str:
-        query = urlencode({"message": message_content, "password": self.password})
+        params = {"message": message_content, "password": self.password}
+        if self.session_id:
+            params["session_id"] = self.session_id
+        query = urlencode(params)
         return f"{self.backend_base()}/message?{query}"
 
     def build_job_status_url(self, job_id: str) -> str:
         query = urlencode({"password": self.password})
         return f"{self.backend_base()}/message/{job_id}?{query}"
 
+    def build_job_stream_url(self, job_id: str) -> str:
+        query = urlencode({"password": self.password})
+        return f"{self.backend_base()}/message/{job_id}/stream?{query}"
+
+    async def iter_job_events(self, job_id: str):
+        """Yield the server-sent events of a job as dicts."""
+        timeout = httpx.Timeout(MAX_POLL_DURATION_S, connect=10.0)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            async with client.stream(
+                "GET",
+                self.build_job_stream_url(job_id),
+                headers={"Accept": "text/event-stream"},
+            ) as response:
+                if response.status_code >= 400:
+                    raise httpx.HTTPStatusError(
+                        "Streaming unavailable", request=response.request, response=response
+                    )
+                data_lines: list[str] = []
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        data_lines.append(line[5:].strip())
+                    elif not line and data_lines:
+                        yield json.loads("\n".join(data_lines))
+                        data_lines = []
+
     def build_assistant_meta(self, payload: Optional[Dict[str, Any]]) -> AssistantMeta:
         payload = payload or {}
         status = payload.get("status") or "approved"
@@ -185,7 +240,9 @@ class State(rx.State):
         )
 
     def append_message(self, message: ChatMessage) -> None:
-        self.conversation = self.conversation + [message]
+        self._history.append(message)
+        self.visible_messages = window_after_append(self.visible_messages, message, self.window_size)
+        self.hidden_message_count = hidden_count(self._history, self.visible_messages)
 
     async def send_message(self):
         trimmed_message = self.new_message.strip()
@@ -223,39 +280,77 @@ class State(rx.State):
             job_id = job_payload.get("job_id")
             if not job_id:
                 raise RuntimeError("Réponse invalide du serveur : identifiant de job manquant.")
-
-            deadline = time.monotonic() + MAX_POLL_DURATION_S
-            last_status = None
-            job_result: Dict[str, Any] = {}
-
-            while time.monotonic() < deadline:
-                job_result = await self.request_json(
-                    self.build_job_status_url(job_id),
-                    default_error_message="Impossible de récupérer l'état du traitement.",
-                )
-                current_status = job_result.get("status")
-                if current_status and current_status != last_status:
-                    self.active_job_status = current_status
-                    last_status = current_status
-                    yield
-
-                if current_status == JOB_STATUS["COMPLETED"]:
-                    break
-                if current_status == JOB_STATUS["ERROR"]:
-                    raise RuntimeError(job_result.get("error") or "La génération a échoué.")
-                if current_status in (JOB_STATUS["QUEUED"], JOB_STATUS["PROCESSING"]):
-                    await asyncio.sleep(JOB_POLL_INTERVAL_S)
-                    continue
-
-                raise RuntimeError("Réponse inattendue du serveur, merci de réessayer.")
-
-            if last_status != JOB_STATUS["COMPLETED"]:
-                timeout_message = (
-                    "La file d'attente est temporairement saturée, merci de réessayer dans un instant."
-                    if last_status == JOB_STATUS["QUEUED"]
-                    else "Le délai d'attente a été dépassé, merci de réessayer."
-                )
-                raise RuntimeError(timeout_message)
+            self.session_id = job_payload.get("session_id") or self.session_id
+
+            job_result: Optional[Dict[str, Any]] = None
+            provisional_text = ""
+            last_render = 0.0
+
+            try:
+                async for event in self.iter_job_events(job_id):
+                    event_type = event.get("type")
+                    if event_type == "status":
+                        self.active_job_status = event.get("status")
+                        yield
+                    elif event_type == "token":
+                        # Only the streaming_content string is synced while tokens arrive.
+                        provisional_text += event.get("text") or ""
+                        self.is_streaming = True
+                        if time.monotonic() - last_render >= STREAM_RENDER_INTERVAL_S:
+                            self.streaming_content = provisional_text
+                            last_render = time.monotonic()
+                            yield
+                    elif event_type == "reset":
+                        if provisional_text:
+                            provisional_text = ""
+                            self.streaming_content = ""
+                            self.is_streaming = False
+                            yield
+                    elif event_type == "final":
+                        job_result = {"status": JOB_STATUS["COMPLETED"], "message": event.get("message")}
+                        break
+                    elif event_type == "error":
+                        raise RuntimeError(event.get("error") or "La génération a échoué.")
+            except (httpx.HTTPError, ValueError):
+                # Streaming is unavailable (proxy buffering, older backend...): fall back to polling.
+                job_result = None
+
+            self.streaming_content = ""
+            self.is_streaming = False
+
+            if job_result is None:
+                deadline = time.monotonic() + MAX_POLL_DURATION_S
+                last_status = None
+                job_result = {}
+
+                while time.monotonic() < deadline:
+                    job_result = await self.request_json(
+                        self.build_job_status_url(job_id),
+                        default_error_message="Impossible de récupérer l'état du traitement.",
+                    )
+                    current_status = job_result.get("status")
+                    if current_status and current_status != last_status:
+                        self.active_job_status = current_status
+                        last_status = current_status
+                        yield
+
+                    if current_status == JOB_STATUS["COMPLETED"]:
+                        break
+                    if current_status == JOB_STATUS["ERROR"]:
+                        raise RuntimeError(job_result.get("error") or "La génération a échoué.")
+                    if current_status in (JOB_STATUS["QUEUED"], JOB_STATUS["PROCESSING"]):
+                        await asyncio.sleep(JOB_POLL_INTERVAL_S)
+                        continue
+
+                    raise RuntimeError("Réponse inattendue du serveur, merci de réessayer.")
+
+                if last_status != JOB_STATUS["COMPLETED"]:
+                    timeout_message = (
+                        "La file d'attente est temporairement saturée, merci de réessayer dans un instant."
+                        if last_status == JOB_STATUS["QUEUED"]
+                        else "Le délai d'attente a été dépassé, merci de réessayer."
+                    )
+                    raise RuntimeError(timeout_message)
 
             assistant_payload = job_result.get("message")
             if isinstance(assistant_payload, str):
@@ -301,5 +396,7 @@ class State(rx.State):
             )
         finally:
             self.is_loading = False
+            self.is_streaming = False
+            self.streaming_content = ""
             self.active_job_status = None
             yield
@@ -1,9 +1,54 @@
+import asyncio
+import logging
+import signal
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.routes.v1.batches import router as batch_router
+from app.api.routes.v1.health import router as health_router
 from app.api.routes.v1.messages import router as message_router
+from app.api.routes.v1.metrics import router as metrics_router
+from app.api.routes.v1.profiling import router as profiling_router
+from app.api.routes.v1.settings import router as settings_router
+from app.services.answer_store_service import AnswerStoreService
+from app.services.loop_monitor_service import LoopMonitorService
+from app.services.messages_service import MessagesService
+from app.services.profiling_service import ProfilingService
+from app.settings import get_settings, reload_settings
+
+# Uvicorn only configures its own loggers; the services log under `app.*`.
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def reload_settings_on_signal() -> None:
+    try:
+        reload_settings()
+    except ValueError as exc:
+        logger.error("Settings not reloaded: %s", exc)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Invalid settings (e.g. a malformed ORCHESTRATOR_TEMPERATURE) stop the startup here.
+    get_settings()
+    try:
+        # `kill -HUP <pid>` reloads the settings, like POST /admin/settings/reload.
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_settings_on_signal)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        pass  # No SIGHUP on Windows, nor outside the main thread.
+    LoopMonitorService.start()
+    await MessagesService.resume_checkpointed_jobs()
+    AnswerStoreService.start()
+    yield
+    await AnswerStoreService.stop()
+    ProfilingService.stop()
+    await LoopMonitorService.stop()
+
 
-app = FastAPI(title="Agentic API", version="1.0.0")
+app = FastAPI(title="Agentic API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,4 +58,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(health_router, tags=["Health"])
 app.include_router(message_router, tags=["Messages"])
+app.include_router(batch_router, tags=["Batches"])
+app.include_router(metrics_router, tags=["Metrics"])
+app.include_router(profiling_router, tags=["Admin"])
+app.include_router(settings_router, tags=["Admin"])
@@ -1,85 +1,233 @@
-import os
+import time
 from abc import ABC
-from typing import Any, Dict, List
-
-from langchain_core.messages import ToolMessage
+from typing import Any, Awaitable, Callable, Dict, List
+
+from app.services.cassette_service import CassetteService
+from app.services.hedging_service import HedgingService
+from app.services.model_routing_service import ModelRoutingService
+from app.services.rate_limit_service import LIMIT_CHAT, RateLimitService
+from app.services.resilience_service import DEPENDENCY_OPENAI, ResilienceService
+from app.services.tool_memo_service import STOP_MAX_ITERATIONS, ToolMemoService
+from app.services.tracing_service import TracingService, traced
+from app.settings import get_settings
+from langchain.tools.render import render_text_description
+from langchain_core.messages import (
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+    message_to_dict,
+    messages_from_dict,
+    messages_to_dict,
+)
 from langchain_openai import ChatOpenAI
-from langfuse.decorators import langfuse_context, observe
 
 
 class AgentBase(ABC):
+    AGENT_NAME: str = "agent"
+    # None follows the tier routed for the current job attempt.
+    MODEL_TIER: str | None = None
+    # Idempotent, tool-less agents may duplicate a slow call (see HedgingService).
+    HEDGED: bool = False
+
     def __init__(self):
         self.AVAILABLE_TOOLS: list[callable] = self._get_available_tools()
+        # Rendered once: every request of the agent starts with the same bytes (tools, then system
+        # prompt), which the provider serves from its prompt cache. Per-request content comes after.
+        self.TOOL_DESCRIPTIONS: str = render_text_description(self.AVAILABLE_TOOLS)
+        self.SYSTEM_MESSAGE = SystemMessage(content=self._build_system_prompt())
 
     def _get_available_tools(self) -> list[callable]:
         return []
 
+    def _build_system_prompt(self) -> str:
+        """Static instructions of the agent; nothing that varies between requests belongs here."""
+        return ""
+
     async def _create_openai_llm(self):
+        config = ModelRoutingService.config_for(self.AGENT_NAME, self.MODEL_TIER)
+        settings = get_settings()
         return ChatOpenAI(
-            model=os.getenv("OPENAI_MODEL"),
-            temperature=0.7,
+            model=config.model,
+            temperature=config.temperature,
             top_p=0,
-            api_key=os.getenv("OPENAI_API_KEY"),
+            max_tokens=config.max_tokens,
+            # Without it the SDK waits up to 10 minutes, holding an OpenAI bulkhead slot.
+            timeout=config.timeout_s or ResilienceService.TIMEOUTS_S[DEPENDENCY_OPENAI],
+            stream_usage=True,
+            # Retries are handled by ResilienceService so that they count against the OpenAI breaker.
+            max_retries=0,
+            api_key=settings.openai_api_key,
+            # Sent with every request so that the provider routes an agent's calls to the same prefix cache.
+            model_kwargs=(
+                {"prompt_cache_key": f"{settings.openai_prompt_cache_key}-{self.AGENT_NAME}"}
+                if settings.openai_prompt_cache_key
+                else {}
+            ),
         )
 
-    @observe(as_type="generation")
-    async def _execute_tool(self, tool_name: str, tool_args: Dict[str, Any]) -> str:
-        """Execute a tool by name with given arguments."""
-        langfuse_context.update_current_observation(
-            name="Method: Tool Call", input={"Tool Called": tool_name, "Args": tool_args}
-        )
+    @traced("Method: Tool Call")
+    async def _execute_tool(self, tool_name: str, tool_args: Dict[str, Any], tool_run=None) -> str:
+        """Execute a tool by name with given arguments, memoizing successful results in `tool_run`."""
+        if TracingService.is_sampled():
+            TracingService.update_observation(input={"Tool Called": tool_name, "Args": tool_args})
 
         for selected_tool in self.AVAILABLE_TOOLS:
             if selected_tool.name == tool_name:
                 try:
                     result = await selected_tool.ainvoke(tool_args)
+                    if tool_run is not None:
+                        tool_run.store(tool_name, tool_args, result)
                     return result
                 except Exception as e:
+                    TracingService.mark_error(f"{tool_name}: {e}")
                     return f"Error executing tool {tool_name}: {str(e)}"
 
         return f"Tool {tool_name} not found"
 
 
-    @observe(as_type="generation")
-    async def _llm_call_with_tools(self, llm: ChatOpenAI, messages: List):
-        """Make an LLM call with tools support, handling multiple rounds of tool calls."""
+    @traced("Method: LLM Call", as_type="generation")
+    async def _llm_call_with_tools(
+        self,
+        llm: ChatOpenAI,
+        messages: List,
+        on_token: Callable[[str | None], Awaitable[None]] | None = None,
+    ):
+        """Make an LLM call with tools support, handling multiple rounds of tool calls.
+
+        When `on_token` is given, responses are streamed and every text delta is passed to it.
+        It is called with None when streamed text turns out to precede tool calls.
+        """
         llm_with_tools = llm.bind_tools(self.AVAILABLE_TOOLS)
+        model_config = ModelRoutingService.config_for(self.AGENT_NAME, self.MODEL_TIER)
+        tool_run = ToolMemoService.new_run(self.AGENT_NAME)
+        # Set once the model has to answer without calling more tools.
+        stop_reason: str | None = None
 
         # Keep processing until we get a response without tool calls
         max_iterations = 10  # Prevent infinite loops
         iteration = 0
 
-        while iteration < max_iterations:
-            response = await llm_with_tools.ainvoke(messages)
-            token_usage = response.usage_metadata
-            usage_details = {
-                "input": token_usage.get("input_tokens"),
-                "output": token_usage.get("output_tokens"),
-                "total": token_usage.get("total_tokens"),
-            }
-            langfuse_context.update_current_observation(
-                name="Method: LLM Call", model=os.getenv("OPENAI_MODEL"), usage_details=usage_details
+        while True:
+            if stop_reason is not None:
+                llm_with_tools = llm.bind_tools(self.AVAILABLE_TOOLS, tool_choice="none")
+            started_at = time.perf_counter()
+            response = await CassetteService.call(
+                "openai.chat",
+                {
+                    "agent": self.AGENT_NAME,
+                    "model": model_config.model,
+                    "tools": [selected_tool.name for selected_tool in self.AVAILABLE_TOOLS],
+                    "messages": messages_to_dict(messages),
+                    **({"tool_choice": "none"} if stop_reason is not None else {}),
+                },
+                lambda: self._invoke_llm(
+                    llm_with_tools, messages, on_token, model_config.max_tokens, model_config.timeout_s
+                ),
+                encode=message_to_dict,
+                decode=lambda recorded: messages_from_dict([recorded])[0],
+                on_replay=self._replay_tokens(on_token),
             )
-            # Check if the model wants to use tools
-            if hasattr(response, "tool_calls") and response.tool_calls and len(response.tool_calls) > 0:
-                # Add the AI response to messages
-                messages.append(response)
-
-                # Process each tool call
-                for tool_call in response.tool_calls:
-                    tool_name = tool_call["name"]
-                    tool_args = tool_call["args"]
+            ModelRoutingService.record_call(
+                self.AGENT_NAME, model_config, time.perf_counter() - started_at, response.usage_metadata
+            )
+            if TracingService.is_sampled():
+                token_usage = response.usage_metadata or {}
+                usage_details = {
+                    "input": token_usage.get("input_tokens"),
+                    "input_cached": (token_usage.get("input_token_details") or {}).get("cache_read"),
+                    "output": token_usage.get("output_tokens"),
+                    "total": token_usage.get("total_tokens"),
+                }
+                TracingService.update_observation(model=model_config.model, usage_details=usage_details)
+            # No tool calls (or no more allowed), we have our final response
+            if stop_reason is not None or not getattr(response, "tool_calls", None):
+                return response
 
-                    # Execute the tool
-                    tool_result = await self._execute_tool(tool_name, tool_args)
+            # Add the AI response to messages
+            messages.append(response)
+
+            # Process each tool call, serving repeated ones from this run's memo
+            for tool_call in response.tool_calls:
+                tool_name = tool_call["name"]
+                tool_args = tool_call["args"]
+
+                tool_result = tool_run.lookup(tool_name, tool_args)
+                if tool_result is None:
+                    tool_result = await self._execute_tool(tool_name, tool_args, tool_run)
+
+                # Add tool result to messages
+                messages.append(ToolMessage(content=str(tool_result), tool_call_id=tool_call["id"]))
+
+            iteration += 1
+            stop_reason = tool_run.end_round() or (STOP_MAX_ITERATIONS if iteration >= max_iterations else None)
+            if stop_reason is not None:
+                # Repeating or oscillating tool calls, or too many rounds: ask for the final answer now.
+                ToolMemoService.record_forced_final(self.AGENT_NAME, stop_reason)
+                if TracingService.is_sampled():
+                    TracingService.update_observation(metadata={"forced_final_answer": stop_reason})
+                messages.append(HumanMessage(content=ToolMemoService.FINAL_ANSWER_INSTRUCTION))
+
+    async def _invoke_llm(
+        self,
+        llm_with_tools,
+        messages: List,
+        on_token: Callable[[str | None], Awaitable[None]] | None,
+        max_tokens: int | None = None,
+        timeout_s: float | None = None,
+    ):
+        estimated_tokens = RateLimitService.estimate_chat_tokens(messages, max_tokens)
+
+        def limited(send: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+            # Every attempt (retries, hedges) reserves its budget before taking an OpenAI bulkhead
+            # slot, so that calls queued behind the rate limiter do not hold slots.
+            async def send_and_settle():
+                response = await send()
+                used_tokens = (response.usage_metadata or {}).get("total_tokens")
+                RateLimitService.settle(LIMIT_CHAT, estimated_tokens, used_tokens)
+                return response
 
-                    # Add tool result to messages
-                    messages.append(ToolMessage(content=str(tool_result), tool_call_id=tool_call["id"]))
+            return ResilienceService.call(
+                DEPENDENCY_OPENAI,
+                send_and_settle,
+                admit=lambda: RateLimitService.acquire(LIMIT_CHAT, estimated_tokens),
+                timeout_s=timeout_s,
+            )
 
-                iteration += 1
-            else:
-                # No tool calls, we have our final response
-                return response
-        # If we hit max iterations, return the last response anyway
-        # This prevents infinite loops
+        if on_token is not None:
+            return await limited(lambda: self._stream_response(llm_with_tools, messages, on_token))
+        if self.HEDGED:
+            return await HedgingService.call(self.AGENT_NAME, lambda: limited(lambda: llm_with_tools.ainvoke(messages)))
+        return await limited(lambda: llm_with_tools.ainvoke(messages))
+
+    @staticmethod
+    def _replay_tokens(on_token: Callable[[str | None], Awaitable[None]] | None):
+        """Re-emit the text of a replayed streamed response as a single token."""
+        if on_token is None:
+            return None
+
+        async def replay(response) -> None:
+            if isinstance(response.content, str) and response.content and not response.tool_calls:
+                await on_token(response.content)
+
+        return replay
+
+    @staticmethod
+    async def _stream_response(llm_with_tools, messages: List, on_token: Callable[[str | None], Awaitable[None]]):
+        response = None
+        streamed_text = False
+        try:
+            async for chunk in llm_with_tools.astream(messages):
+                response = chunk if response is None else response + chunk
+                if isinstance(chunk.content, str) and chunk.content:
+                    streamed_text = True
+                    await on_token(chunk.content)
+        except Exception:
+            if streamed_text:
+                # Discard the partial answer so that a retried stream starts from scratch.
+                await on_token(None)
+            raise
+
+        if streamed_text and response.tool_calls:
+            # The text was a preamble to tool calls, not the answer.
+            await on_token(None)
         return response
@@ -1,47 +1,64 @@
 import json
 
 from app.agents.agent_base import AgentBase
-from langchain_core.messages import HumanMessage, SystemMessage
-from langfuse.decorators import langfuse_context, observe
+from app.services.model_routing_service import TIER_SMALL
+from app.services.profiling_service import profiled
+from app.services.tracing_service import traced
+from langchain_core.messages import HumanMessage
 
 
 class AnswerVerifierAgent(AgentBase):
+    AGENT_NAME = "verifier"
+    MODEL_TIER = TIER_SMALL
+    HEDGED = True
+
     def _get_available_tools(self) -> list[callable]:
         return []
 
-    @observe(as_type="generation")
+    def _build_system_prompt(self) -> str:
+        return (
+            "You are the answer verifier agent for the Pole Universitaire Leonard de Vinci (ESILV, EMLV, IIM). "
+            "Critically inspect proposed answers for accuracy, completeness, tone, and alignment with both the "
+            "original user intent and the requirement that all content focus on the Pole and its three schools. "
+            "Approve the answer only if it is fully aligned with the question, grounded in cited evidence related "
+            "to the campus, and follows the user's language. Otherwise, request a revision."
+            " Check the facts of the answer against the evidence provided: when they are supported by it, do "
+            "not ask for more research; when a fact contradicts it or is missing from it, name that fact in "
+            "the feedback."
+            '\nRespond strictly in JSON with the following schema: '
+            '{"status": "approved|revise", "final_answer": "string", "feedback": "string describing issues"}. '
+            "When approving, you may lightly edit the final_answer for clarity."
+        )
+
+    @traced("Agent: Answer Verificator")
+    @profiled("verifier")
     async def send_message(
         self,
         original_query: str,
         reformulated_query: str,
         proposed_answer: str,
+        evidence: str | None = None,
     ) -> dict:
         llm = await self._create_openai_llm()
+        evidence_section = (
+            f"Evidence gathered by the research agents (source: snippet):\n{evidence}\n\n"
+            if evidence
+            else "No evidence was gathered for this answer.\n\n"
+        )
         messages = [
-            SystemMessage(
-                content=(
-                    "You are the answer verifier agent for the Pole Universitaire Leonard de Vinci (ESILV, EMLV, IIM). "
-                    "Critically inspect proposed answers for accuracy, completeness, tone, and alignment with both the "
-                    "original user intent and the requirement that all content focus on the Pole and its three schools. "
-                    "Approve the answer only if it is fully aligned with the question, grounded in cited evidence related "
-                    "to the campus, and follows the user's language. Otherwise, request a revision."
-                    '\nRespond strictly in JSON with the following schema: '
-                    '{"status": "approved|revise", "final_answer": "string", "feedback": "string describing issues"}. '
-                    "When approving, you may lightly edit the final_answer for clarity."
-                )
-            ),
+            self.SYSTEM_MESSAGE,
             HumanMessage(
                 content=(
                     f"Original question:\n{original_query}\n\n"
                     f"Reformulated query:\n{reformulated_query}\n\n"
                     f"Proposed answer (markdown allowed):\n{proposed_answer}\n\n"
+                    f"{evidence_section}"
                     "Return the JSON verdict now."
                 )
             ),
         ]
 
         llm_response = await self._llm_call_with_tools(llm, messages)
-        langfuse_context.update_current_observation(name="Agent: Answer Verificator")
 
         if isinstance(llm_response, str):
             content = llm_response
@@ -1,51 +1,50 @@
-import asyncio
+from typing import Awaitable, Callable
 
 from app.agents.agent_base import AgentBase
 from app.database.client import get_db
-from langchain.tools.render import render_text_description
-from langchain_core.messages import HumanMessage, SystemMessage
+from app.services.cassette_service import CassetteService
+from app.services.evidence_service import KIND_QUESTION, KIND_WEB, EvidenceService
+from app.services.profiling_service import profiled
+from app.services.resilience_service import DEPENDENCY_SUPABASE, DEPENDENCY_TAVILY, ResilienceService
+from app.services.retrieval_service import retrieval_service
+from app.services.tracing_service import TracingService, traced
+from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
 from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_openai import OpenAIEmbeddings
-from langfuse.decorators import langfuse_context, observe
 
 
 EMBEDDING_COLUMN = "title_embedding"
-TOP_K = 40
 
 
 class BasicAgent(AgentBase):
-    def __init__(self):
-        super().__init__()
-        self._embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+    AGENT_NAME = "basic"
 
     def _get_available_tools(self) -> list[callable]:
         @tool
-        async def get_relevant_question_titles(reformulated_user_query: str):
+        async def get_relevant_question_titles(
+            reformulated_user_query: str, french_query: str = "", english_query: str = ""
+        ):
             """
-            Pass the user's question to get up to 40 of the most relevant stored questions (id/title pairs).
+            Pass the user's question to get the most relevant stored questions (id/title pairs), best match first.
+            Also pass the question translated in French and in English: all of them are searched at once and their results merged.
             To get answers to those question, you must use as well user the get_question_detail_by_id tool with the ids of the questions you find interesting.
             This tool does not provide answers, only questions.
             """
-            supabase = get_db()
-            # Compute query embedding asynchronously
-            user_embedding = await asyncio.to_thread(
-                self._embeddings.embed_query, reformulated_user_query
+            rows = await EvidenceService.fetch(
+                "get_relevant_question_titles",
+                {
+                    "reformulated_user_query": reformulated_user_query,
+                    "french_query": french_query,
+                    "english_query": english_query,
+                },
+                lambda: retrieval_service.search_multi([reformulated_user_query, french_query, english_query]),
             )
 
-            response = supabase.rpc(
-                    "match_documents",
-                    {
-                        "query_embedding": user_embedding,
-                        "match_count": 40,
-                    },
-            ).execute()
-
-            if not response.data:
+            if not rows:
                 return [["id", "question"]]  # empty table fallback
 
             matrix = [["id", "question"]]
-            for row in response.data:
+            for row in rows:
                 matrix.append([row["id"], row["Title"]])
             return matrix
 
@@ -56,14 +55,25 @@ class BasicAgent(AgentBase):
             You can fetch question ids using the tool get_relevant_question_titles.
             This tool provides answers.
             """
-            supabase = get_db()
-            response = supabase.table("ai_data").select("Title, Content").eq("id", question_id).execute()
+            rows = await EvidenceService.fetch(
+                "get_question_detail_by_id",
+                {"question_id": question_id},
+                lambda: CassetteService.call(
+                    "supabase.ai_data",
+                    {"id": question_id},
+                    lambda: ResilienceService.call_sync(
+                        DEPENDENCY_SUPABASE,
+                        lambda: get_db().table("ai_data").select("Title, Content").eq("id", question_id).execute().data,
+                    ),
+                ),
+            )
 
-            if not response.data:
+            if not rows:
                 return [["Title", "Content"]]
 
             matrix = [["Title", "Content"]]
-            for row in response.data:
+            for row in rows:
+                EvidenceService.record(KIND_QUESTION, str(question_id), row["Content"], title=row["Title"])
                 matrix.append([row["Title"], row["Content"]])
 
             return matrix
@@ -75,28 +85,34 @@ class BasicAgent(AgentBase):
             Useful for finding recent information not in your database.
             You must use sources from the Pole Universitaire Leonard de Vinci website, or the esilv.fr website, or the emlv.fr website.
             """
-            results = await asyncio.to_thread(TavilySearchResults(max_results=5).run, query)
+            results = await EvidenceService.fetch(
+                "web_search",
+                {"query": query},
+                lambda: CassetteService.call(
+                    "tavily.search",
+                    {"query": query, "max_results": 5},
+                    lambda: ResilienceService.call_sync(
+                        DEPENDENCY_TAVILY, TavilySearchResults(max_results=5).run, query
+                    ),
+                ),
+            )
+            if isinstance(results, list):
+                for result in results:
+                    if isinstance(result, dict):
+                        EvidenceService.record(KIND_WEB, result.get("url", ""), result.get("content", ""))
             return results
 
         return [get_relevant_question_titles, get_question_detail_by_id, web_search]
 
-    @observe(as_type="generation")
-    async def send_message(self, user_message: str) -> str:
-        llm = await self._create_openai_llm()
-        messages = []
-
-        tool_descriptions = render_text_description(self.AVAILABLE_TOOLS)
-
-        messages.append(
-            SystemMessage(
-                content=f"""You are an agentic AI chatbot. Your job is to answer questions about the "Pole Universitaire
+    def _build_system_prompt(self) -> str:
+        return f"""You are an agentic AI chatbot. Your job is to answer questions about the "Pole Universitaire
                     Leonard de Vinci." Use the tools at your disposal to fetch factual answers to the question of the user.
                     Fetch the list of questions you have answers to, then you can get more informations and factual
                     answers to one, or more. This will help you answer the user correctly.
 
                     You have access to the following tools to help users:
 
-                    {tool_descriptions}
+                    {self.TOOL_DESCRIPTIONS}
 
                     Use these tools when they become helpful to provide better answers to the user.
                     Always be helpful and friendly.
@@ -104,30 +120,35 @@ class BasicAgent(AgentBase):
                     You must always answer in the language of the user.
                     You must answer using the markdown format to structure your answers.
                     If a user asks multiple answers, add titles to the markdown answer, to make everything neat.
+                    Cite the origin of every fact: the id of the stored question it comes from, written as (question #<id>),
+                    or the official URL (esilv.fr, emlv.fr, iim.fr, pulv.fr, devinci.fr) of the web result.
                     You must call both get_relevant_question_titles and get_question_detail_by_id (eventually more than once)
                     to get factual answers to your questions.
                     """
-                    # You must call get_relevant_question_titles twice:
-                    # First time by reformulating the user's query in french, second time reformulating in english.
-                    # Then chose the question(s) you find most interesting to get factual answers from, and call the get_question_detail_by_id
-                    # tool to have the answers of your question, passing the chosen question(s) id(s).
-            )
-        )
-
-        messages.append(HumanMessage(content=user_message))
 
-        llm_response = await self._llm_call_with_tools(llm, messages)
+    @traced("Method: POST message")
+    @profiled("basic")
+    async def send_message(
+        self,
+        user_message: str,
+        history: str | None = None,
+        on_token: Callable[[str | None], Awaitable[None]] | None = None,
+    ) -> str:
+        llm = await self._create_openai_llm()
+        messages = [self.SYSTEM_MESSAGE]
 
-        langfuse_context.update_current_observation(name="Method: POST message")
-        langfuse_context.update_current_trace(
-            name="Chat", input=user_message, user_id="Random User", session_id="Random Thread"
+        history_section = (
+            f"Conversation history (context only, answer the latest question):\n{history}\n\n" if history else ""
         )
+        messages.append(HumanMessage(content=f"{history_section}{user_message}"))
+
+        llm_response = await self._llm_call_with_tools(llm, messages, on_token=on_token)
 
         if isinstance(llm_response, str):
-            langfuse_context.update_current_trace(output=llm_response)
+            TracingService.update_trace(output=llm_response)
             return llm_response
         else:
-            langfuse_context.update_current_trace(output=llm_response.content)
+            TracingService.update_trace(output=llm_response.content)
             return llm_response.content
 
 
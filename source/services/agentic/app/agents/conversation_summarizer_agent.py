@@ -0,0 +1,47 @@
+from app.agents.agent_base import AgentBase
+from app.services.model_routing_service import TIER_SMALL
+from app.services.profiling_service import profiled
+from app.services.tracing_service import traced
+from langchain_core.messages import HumanMessage
+
+
+class ConversationSummarizerAgent(AgentBase):
+    AGENT_NAME = "summarizer"
+    MODEL_TIER = TIER_SMALL
+
+    def _get_available_tools(self) -> list[callable]:
+        return []
+
+    def _build_system_prompt(self) -> str:
+        return (
+            "You maintain the running summary of a conversation between a student and the assistant of the "
+            "Pole Universitaire Leonard de Vinci (ESILV, EMLV, IIM). Merge the previous summary with the new "
+            "turns into a single factual summary. Keep the schools, programs, dates, names and constraints the "
+            "student mentioned, and the key facts the assistant gave. Write in the language of the conversation, "
+            "do not add information, and stay under the word limit given with the turns."
+        )
+
+    @traced("Agent: Conversation Summarizer")
+    @profiled("summarizer")
+    async def send_message(self, previous_summary: str, turns: str, max_words: int) -> str:
+        """Fold older conversation turns into the running summary."""
+        llm = await self._create_openai_llm()
+        messages = [
+            self.SYSTEM_MESSAGE,
+            HumanMessage(
+                content=(
+                    f"Previous summary:\n{previous_summary or '(none)'}\n\n"
+                    f"New turns:\n{turns}\n\n"
+                    f"Return the updated summary only, in under {max_words} words."
+                )
+            ),
+        ]
+
+        llm_response = await self._llm_call_with_tools(llm, messages)
+
+        if isinstance(llm_response, str):
+            return llm_response.strip()
+        return llm_response.content.strip()
+
+
+conversation_summarizer_agent = ConversationSummarizerAgent()
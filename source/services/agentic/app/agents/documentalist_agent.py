@@ -1,47 +1,41 @@
-import asyncio
-
 from app.agents.agent_base import AgentBase
 from app.database.client import get_db
-from langchain.tools.render import render_text_description
-from langchain_core.messages import HumanMessage, SystemMessage
+from app.services.cassette_service import CassetteService
+from app.services.evidence_service import KIND_QUESTION, EvidenceService
+from app.services.prefetch_service import PrefetchService
+from app.services.profiling_service import profiled
+from app.services.resilience_service import DEPENDENCY_SUPABASE, ResilienceService
+from app.services.tracing_service import traced
+from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
-from langchain_openai import OpenAIEmbeddings
-from langfuse.decorators import langfuse_context, observe
 
 
 class DocumentalistAgent(AgentBase):
-    def __init__(self):
-        super().__init__()
-        self._embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+    AGENT_NAME = "documentalist"
 
     def _get_available_tools(self) -> list[callable]:
         @tool
-        async def get_relevant_question_titles(reformulated_user_query: str):
+        async def get_relevant_question_titles(
+            reformulated_user_query: str, french_query: str = "", english_query: str = ""
+        ):
             """
-            Fetch up to 40 relevant stored questions (id/title pairs) based on the reformulated query.
+            Fetch the most relevant stored questions (id/title pairs) for the reformulated query, best match first.
+            Also pass the query translated in French and in English: all of them are searched at once and their results merged.
+            Combines semantic and exact keyword search (course codes, room names, acronyms).
             This only provides metadata. Use get_question_detail_by_id to retrieve full answers.
             """
-            supabase = get_db()
-            user_embedding = await asyncio.to_thread(
-                self._embeddings.embed_query,
-                reformulated_user_query,
-            )
-
-            response = (
-                supabase.rpc(
-                    "match_documents",
-                    {
-                        "query_embedding": user_embedding,
-                        "match_count": 40,
-                    },
-                ).execute()
+            rows = await EvidenceService.fetch(
+                "get_relevant_question_titles",
+                {
+                    "reformulated_user_query": reformulated_user_query,
+                    "french_query": french_query,
+                    "english_query": english_query,
+                },
+                lambda: PrefetchService.search([reformulated_user_query, french_query, english_query]),
             )
 
-            if not response.data:
-                return [["id", "question"]]
-
             matrix = [["id", "question"]]
-            for row in response.data:
+            for row in rows:
                 matrix.append([row["id"], row["Title"]])
             return matrix
 
@@ -50,43 +44,59 @@ class DocumentalistAgent(AgentBase):
             """
             Retrieve the full question and answer content given a question id.
             """
-            supabase = get_db()
-            response = (
-                supabase.table("ai_data")
-                .select("Title, Content")
-                .eq("id", question_id)
-                .execute()
+            rows = await EvidenceService.fetch(
+                "get_question_detail_by_id",
+                {"question_id": question_id},
+                lambda: CassetteService.call(
+                    "supabase.ai_data",
+                    {"id": question_id},
+                    lambda: ResilienceService.call_sync(
+                        DEPENDENCY_SUPABASE,
+                        lambda: get_db().table("ai_data").select("Title, Content").eq("id", question_id).execute().data,
+                    ),
+                ),
             )
 
-            if not response.data:
+            if not rows:
                 return [["Title", "Content"]]
 
             matrix = [["Title", "Content"]]
-            for row in response.data:
+            for row in rows:
+                EvidenceService.record(KIND_QUESTION, str(question_id), row["Content"], title=row["Title"])
                 matrix.append([row["Title"], row["Content"]])
 
             return matrix
 
         return [get_relevant_question_titles, get_question_detail_by_id]
 
-    @observe(as_type="generation")
+    def _build_system_prompt(self) -> str:
+        return (
+            "You are the documentalist agent for the Pole Universitaire Leonard de Vinci in Paris La Defense, "
+            "home to ESILV, EMLV, and IIM. Use the provided Supabase tools to discover the most relevant stored "
+            "questions about this campus only and extract their factual answers. Combine findings into a concise "
+            "research note that downstream agents can use. Always call get_relevant_question_titles before any "
+            "detail lookup, unless candidate questions are provided. Summaries must stay factual, cite question "
+            "ids when referencing, stay in the user's language, and exclude information unrelated to the Pole."
+            f"\n\nTools:\n{self.TOOL_DESCRIPTIONS}"
+        )
+
+    @traced("Agent: Documentalist")
+    @profiled("documentalist")
     async def send_message(self, reformulated_query: str) -> str:
         llm = await self._create_openai_llm()
-        tool_descriptions = render_text_description(self.AVAILABLE_TOOLS)
+        candidates = await PrefetchService.candidates()
+        candidates_section = (
+            "Candidate questions already retrieved for the user's question (id: title):\n"
+            + "\n".join(f"- {row['id']}: {row['Title']}" for row in candidates)
+            + "\nLook the relevant ones up directly, or search again if none fits.\n\n"
+            if candidates
+            else ""
+        )
         messages = [
-            SystemMessage(
-                content=(
-                    "You are the documentalist agent for the Pole Universitaire Leonard de Vinci in Paris La Defense, "
-                    "home to ESILV, EMLV, and IIM. Use the provided Supabase tools to discover the most relevant stored "
-                    "questions about this campus only and extract their factual answers. Combine findings into a concise "
-                    "research note that downstream agents can use. Always call get_relevant_question_titles before any "
-                    "detail lookup. Summaries must stay factual, cite question ids when referencing, stay in the user's "
-                    "language, and exclude information unrelated to the Pole."
-                    f"\n\nTools:\n{tool_descriptions}"
-                )
-            ),
+            self.SYSTEM_MESSAGE,
             HumanMessage(
                 content=(
+                    f"{candidates_section}"
                     "Research the following request using the question database and provide the most helpful factual "
                     "notes:\n"
                     f"{reformulated_query}"
@@ -95,7 +105,6 @@ class DocumentalistAgent(AgentBase):
         ]
 
         llm_response = await self._llm_call_with_tools(llm, messages)
-        langfuse_context.update_current_observation(name="Agent: Documentalist")
 
         if isinstance(llm_response, str):
             return llm_response
@@ -1,13 +1,17 @@
+from typing import Awaitable, Callable
+
 from app.agents.agent_base import AgentBase
 from app.agents.documentalist_agent import documentalist_agent
 from app.agents.web_search_agent import web_search_agent
-from langchain.tools.render import render_text_description
-from langchain_core.messages import HumanMessage, SystemMessage
+from app.services.profiling_service import profiled
+from app.services.tracing_service import traced
+from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
-from langfuse.decorators import langfuse_context, observe
 
 
 class OrchestratorAgent(AgentBase):
+    AGENT_NAME = "orchestrator"
+
     def _get_available_tools(self) -> list[callable]:
         @tool
         async def ask_documentalist(question: str):
@@ -25,37 +29,62 @@ class OrchestratorAgent(AgentBase):
 
         return [ask_documentalist, ask_web_search]
 
-    @observe(as_type="generation")
-    async def send_message(self, original_question: str, reformulated_query: str) -> str:
+    def _build_system_prompt(self) -> str:
+        return (
+            "You are the orchestrator agent for the Pole Universitaire Leonard de Vinci (ESILV, EMLV, IIM) in "
+            "Paris La Defense. Combine insights from specialized agents to craft answers strictly about this "
+            "campus, its programs, services, and student life. Use the provided tools whenever more context is "
+            "required, and ignore topics unrelated to the Pole. Always gather enough evidence before finalizing "
+            "an answer. When responding to the user, be clear, cite the origin of facts (e.g., question ids or "
+            "URLs tied to pulv.fr/emlv.fr/esilv.fr), and format the response in markdown using the user's "
+            "language."
+            f"\n\nTools:\n{self.TOOL_DESCRIPTIONS}"
+        )
+
+    @traced("Agent: Orchestrator")
+    @profiled("orchestrator")
+    async def send_message(
+        self,
+        original_question: str,
+        reformulated_query: str,
+        history: str | None = None,
+        feedback: str | None = None,
+        evidence: str | None = None,
+        on_token: Callable[[str | None], Awaitable[None]] | None = None,
+    ) -> str:
         llm = await self._create_openai_llm()
-        tool_descriptions = render_text_description(self.AVAILABLE_TOOLS)
+        history_section = (
+            f"Conversation history (context only, answer the latest question):\n{history}\n\n" if history else ""
+        )
+        feedback_section = (
+            f"A previous answer to this question was rejected by the verifier:\n{feedback}\nAddress it.\n\n"
+            if feedback
+            else ""
+        )
+        evidence_section = (
+            "Evidence already gathered for this question (source: snippet):\n"
+            f"{evidence}\nBuild on it and only consult the agents for what is missing.\n\n"
+            if evidence
+            else ""
+        )
 
         messages = [
-            SystemMessage(
-                content=(
-                    "You are the orchestrator agent for the Pole Universitaire Leonard de Vinci (ESILV, EMLV, IIM) in "
-                    "Paris La Defense. Combine insights from specialized agents to craft answers strictly about this "
-                    "campus, its programs, services, and student life. Use the provided tools whenever more context is "
-                    "required, and ignore topics unrelated to the Pole. Always gather enough evidence before finalizing "
-                    "an answer. When responding to the user, be clear, cite the origin of facts (e.g., question ids or "
-                    "URLs tied to pulv.fr/emlv.fr/esilv.fr), and format the response in markdown using the user's "
-                    "language."
-                    f"\n\nTools:\n{tool_descriptions}"
-                )
-            ),
+            self.SYSTEM_MESSAGE,
             HumanMessage(
                 content=(
+                    f"{history_section}"
                     "Original user question:\n"
                     f"{original_question}\n\n"
                     "Reformulated query for research:\n"
                     f"{reformulated_query}\n\n"
+                    f"{feedback_section}"
+                    f"{evidence_section}"
                     "Plan your reasoning, call the necessary tools, and then provide the final answer when ready."
                 )
             ),
         ]
 
-        llm_response = await self._llm_call_with_tools(llm, messages)
-        langfuse_context.update_current_observation(name="Agent: Orchestrator")
+        llm_response = await self._llm_call_with_tools(llm, messages, on_token=on_token)
 
         if isinstance(llm_response, str):
             return llm_response
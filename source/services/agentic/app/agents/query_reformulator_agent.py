@@ -1,36 +1,50 @@
 from app.agents.agent_base import AgentBase
-from langchain_core.messages import HumanMessage, SystemMessage
-from langfuse.decorators import langfuse_context, observe
+from app.services.model_routing_service import TIER_SMALL
+from app.services.profiling_service import profiled
+from app.services.tracing_service import traced
+from langchain_core.messages import HumanMessage
 
 
 class QueryReformulatorAgent(AgentBase):
+    AGENT_NAME = "reformulator"
+    MODEL_TIER = TIER_SMALL
+    HEDGED = True
+
     def _get_available_tools(self) -> list[callable]:
         return []
 
-    @observe(as_type="generation")
-    async def send_message(self, user_message: str) -> str:
-        """Produce a concise reformulation of the original user query."""
+    def _build_system_prompt(self) -> str:
+        return (
+            "You are a query reformulation specialist dedicated to the Pole Universitaire Leonard de Vinci in "
+            "Paris La Defense, which regroups the ESILV, EMLV, and IIM schools. Rewrite the user's question so it "
+            "is clear, self-contained, factual, and focused on this campus ecosystem. Preserve the original "
+            "language, include every important constraint, filter out topics unrelated to the Pole, and do not "
+            "answer the question. When a conversation history is provided, resolve follow-up questions "
+            "(pronouns, ellipses such as \"et pour l'EMLV ?\") against it so the rewritten question stands on its "
+            "own."
+        )
+
+    @traced("Agent: Query Reformulator")
+    @profiled("reformulator")
+    async def send_message(self, user_message: str, history: str | None = None) -> str:
+        """Produce a concise reformulation of the original user query, resolved against the conversation history."""
         llm = await self._create_openai_llm()
         messages = [
-            SystemMessage(
-                content=(
-                    "You are a query reformulation specialist dedicated to the Pole Universitaire Leonard de Vinci in "
-                    "Paris La Defense, which regroups the ESILV, EMLV, and IIM schools. Rewrite the user's question so it "
-                    "is clear, self-contained, factual, and focused on this campus ecosystem. Preserve the original "
-                    "language, include every important constraint, filter out topics unrelated to the Pole, and do not "
-                    "answer the question."
-                )
-            ),
-            HumanMessage(content=user_message),
+            self.SYSTEM_MESSAGE,
+            HumanMessage(content=self._render_user_message(user_message, history)),
         ]
 
         llm_response = await self._llm_call_with_tools(llm, messages)
 
-        langfuse_context.update_current_observation(name="Agent: Query Reformulator")
-
         if isinstance(llm_response, str):
             return llm_response.strip()
         return llm_response.content.strip()
 
+    @staticmethod
+    def _render_user_message(user_message: str, history: str | None) -> str:
+        if not history:
+            return user_message
+        return f"Conversation history:\n{history}\n\nLatest question to rewrite:\n{user_message}"
+
 
 query_reformulator_agent = QueryReformulatorAgent()
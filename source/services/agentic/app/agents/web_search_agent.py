@@ -1,48 +1,63 @@
-import asyncio
-
 from app.agents.agent_base import AgentBase
-from langchain.tools.render import render_text_description
-from langchain_core.messages import HumanMessage, SystemMessage
+from app.services.cassette_service import CassetteService
+from app.services.evidence_service import KIND_WEB, EvidenceService
+from app.services.profiling_service import profiled
+from app.services.resilience_service import DEPENDENCY_TAVILY, ResilienceService
+from app.services.tracing_service import traced
+from langchain_core.messages import HumanMessage
 from langchain_core.tools import tool
 from langchain_community.tools.tavily_search import TavilySearchResults
-from langfuse.decorators import langfuse_context, observe
 
 
 class WebSearchAgent(AgentBase):
+    AGENT_NAME = "web_search"
+
     def _get_available_tools(self) -> list[callable]:
         @tool
         async def web_search(query: str):
             """
             Perform a Tavily web search to gather up-to-date information from esilv.fr, emlv.fr, or the PULV website.
             """
-            results = await asyncio.to_thread(
-                TavilySearchResults(max_results=5).run,
-                query,
+            results = await EvidenceService.fetch(
+                "web_search",
+                {"query": query},
+                lambda: CassetteService.call(
+                    "tavily.search",
+                    {"query": query, "max_results": 5},
+                    lambda: ResilienceService.call_sync(
+                        DEPENDENCY_TAVILY, TavilySearchResults(max_results=5).run, query
+                    ),
+                ),
             )
+            # Tavily returns a list of {"url", "content"} results, or an error message as a string.
+            if isinstance(results, list):
+                for result in results:
+                    if isinstance(result, dict):
+                        EvidenceService.record(KIND_WEB, result.get("url", ""), result.get("content", ""))
             return results
 
         return [web_search]
 
-    @observe(as_type="generation")
+    def _build_system_prompt(self) -> str:
+        return (
+            "You are the web search agent for the Pole Universitaire Leonard de Vinci (ESILV, EMLV, IIM). Use "
+            "the available Tavily tool to research the request exclusively through reliable sources tied to the "
+            "Pole (esilv.fr, emlv.fr, iim.fr, pulv.fr or other official properties). Consolidate findings into a "
+            "concise report with URLs when possible, keep the response in the user's language, and ignore "
+            "results unrelated to the campus or its three schools."
+            f"\n\nTools:\n{self.TOOL_DESCRIPTIONS}"
+        )
+
+    @traced("Agent: Web Searcher")
+    @profiled("web_search")
     async def send_message(self, reformulated_query: str) -> str:
         llm = await self._create_openai_llm()
-        tool_descriptions = render_text_description(self.AVAILABLE_TOOLS)
         messages = [
-            SystemMessage(
-                content=(
-                    "You are the web search agent for the Pole Universitaire Leonard de Vinci (ESILV, EMLV, IIM). Use "
-                    "the available Tavily tool to research the request exclusively through reliable sources tied to the "
-                    "Pole (esilv.fr, emlv.fr, iim.fr, pulv.fr or other official properties). Consolidate findings into a "
-                    "concise report with URLs when possible, keep the response in the user's language, and ignore "
-                    "results unrelated to the campus or its three schools."
-                    f"\n\nTools:\n{tool_descriptions}"
-                )
-            ),
+            self.SYSTEM_MESSAGE,
             HumanMessage(content=reformulated_query),
         ]
 
         llm_response = await self._llm_call_with_tools(llm, messages)
-        langfuse_context.update_current_observation(name="Agent: Web Searcher")
 
         if isinstance(llm_response, str):
             return llm_response
@@ -0,0 +1,23 @@
+from app.settings import Settings, check_password, get_settings
+from fastapi import Depends, HTTPException, status
+
+# Async dependencies: they do no I/O, and a sync one would cost a threadpool hop on every request.
+
+
+async def current_settings() -> Settings:
+    """Settings loaded at startup (see `get_settings`), as a route dependency."""
+    return get_settings()
+
+
+async def require_password(password: str | None = None, settings: Settings = Depends(current_settings)) -> None:
+    """Route dependency checking the shared PASSWORD passed as query parameter."""
+    if not check_password(password, settings.password):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Wrong password !")
+
+
+async def require_admin_password(password: str | None = None, settings: Settings = Depends(current_settings)) -> None:
+    """Route dependency for the /admin endpoints, which do not exist unless ADMIN_PASSWORD is set."""
+    if settings.admin_password is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin endpoints are disabled")
+    if not check_password(password, settings.admin_password):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Wrong password !")
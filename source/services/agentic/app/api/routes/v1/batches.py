@@ -0,0 +1,52 @@
+from app.api.auth import require_password
+from app.models.base_models import BatchCreateRequest, BatchCreateResponse, BatchStatusResponse
+from app.services.batch_service import BatchService
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+router = APIRouter()
+
+
+@router.post(
+    "/messages/batch",
+    description=(
+        "Queue a list of questions as a batch. Batch items run after interactive messages with a bounded "
+        "concurrency; identical questions are answered once."
+    ),
+    response_model=BatchCreateResponse,
+    dependencies=[Depends(require_password)],
+)
+async def create_batch(batch: BatchCreateRequest):
+    batch_id = await BatchService.submit(batch.questions)
+    return BatchCreateResponse(batch_id=batch_id, status="queued", total=len(batch.questions))
+
+
+@router.get(
+    "/messages/batch/{batch_id}",
+    description="Get the aggregate progress of a batch.",
+    response_model=BatchStatusResponse,
+    dependencies=[Depends(require_password)],
+)
+async def get_batch(batch_id: str):
+    batch = BatchService.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    return BatchStatusResponse(**batch)
+
+
+@router.get(
+    "/messages/batch/{batch_id}/results",
+    description=(
+        "Download the results of a batch as JSON Lines, streamed as items complete: one `item` line per "
+        "question with its status and the aggregate progress, then a final `summary` line."
+    ),
+    dependencies=[Depends(require_password)],
+)
+async def download_batch_results(batch_id: str):
+    if not BatchService.get_batch(batch_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    return StreamingResponse(
+        BatchService.stream_results(batch_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="batch-{batch_id}.jsonl"'},
+    )
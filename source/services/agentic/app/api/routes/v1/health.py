@@ -0,0 +1,30 @@
+from app.models.base_models import HealthResponse, ReadinessResponse
+from app.services.resilience_service import BREAKER_OPEN, ResilienceService
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+
+
+@router.get(
+    "/health",
+    description="Liveness probe: the API process is up.",
+    response_model=HealthResponse,
+)
+async def get_health():
+    return HealthResponse(status="ok")
+
+
+@router.get(
+    "/ready",
+    description="Readiness probe: 503 while the circuit breaker of an external dependency is open.",
+    response_model=ReadinessResponse,
+)
+async def get_readiness():
+    dependencies = ResilienceService.readiness()
+    if BREAKER_OPEN in dependencies.values():
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=ReadinessResponse(status="degraded", dependencies=dependencies).model_dump(),
+        )
+    return ReadinessResponse(status="ready", dependencies=dependencies)
@@ -1,40 +1,49 @@
-import os
+import json
+from typing import Literal
 
-from dotenv import load_dotenv
+from app.api.auth import require_password
 from app.models.base_models import (
     MessageJobCreateResponse,
     MessageJobStatusResponse,
     MessageModel,
 )
+from app.services.conversation_service import ConversationService
 from app.services.messages_service import MessagesService
-from fastapi import APIRouter, HTTPException, status
+from app.services.streaming_service import StreamingService
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 
 router = APIRouter()
 
 
 @router.post(
     "/message",
-    description="Queue a message for processing.",
+    description=(
+        "Queue a message for processing. Pass the returned session_id back to continue the conversation "
+        "with its history. `mode` selects the pipeline: `full` (reformulator, orchestrator and verifier), `fast` "
+        "(a single agent, unverified answer) or `auto` (the fast answer when it passes verification, the full "
+        "pipeline otherwise); PIPELINE_MODE by default."
+    ),
     response_model=MessageJobCreateResponse,
+    dependencies=[Depends(require_password)],
 )
-async def create_message(message: str, password: str | None = None):
-    load_dotenv()
-    if password == os.getenv("PASSWORD", None):
-        job_id = await MessagesService.enqueue_message(message)
-        return MessageJobCreateResponse(job_id=job_id, status="queued")
-    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Wrong password !")
+async def create_message(
+    message: str,
+    session_id: str | None = None,
+    mode: Literal["fast", "full", "auto"] | None = None,
+):
+    session_id = await ConversationService.open_session(session_id)
+    job_id = await MessagesService.enqueue_message(message, session_id=session_id, mode=mode)
+    return MessageJobCreateResponse(job_id=job_id, status="queued", session_id=session_id)
 
 
 @router.get(
     "/message/{job_id}",
     description="Get the status of a queued message.",
     response_model=MessageJobStatusResponse,
+    dependencies=[Depends(require_password)],
 )
-async def get_message(job_id: str, password: str | None = None):
-    load_dotenv()
-    if password != os.getenv("PASSWORD", None):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Wrong password !")
-
+async def get_message(job_id: str):
     job = await MessagesService.get_job(job_id)
     if not job:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message job not found")
@@ -49,4 +58,36 @@ async def get_message(job_id: str, password: str | None = None):
         finished_at=job.get("finished_at"),
         message=message_model,
         error=job.get("error"),
+        session_id=job.get("session_id"),
+        mode=job.get("mode"),
+        checkpoint=job.get("checkpoint"),
+        evidence=job.get("evidence"),
     )
+
+
+@router.get(
+    "/message/{job_id}/stream",
+    description=(
+        "Stream a queued message as server-sent events: `token` events carry the provisional answer while it "
+        "is generated, `reset` discards it after a verifier rejection, and `final` or `error` ends the stream."
+    ),
+    dependencies=[Depends(require_password)],
+)
+async def stream_message(job_id: str):
+    if StreamingService.exists(job_id):
+        return StreamingResponse(StreamingService.subscribe(job_id), media_type="text/event-stream")
+
+    job = await MessagesService.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message job not found")
+
+    # The event buffer has expired: replay the outcome stored on the job.
+    if job["status"] == MessagesService.JOB_STATUS_COMPLETED:
+        event = {"type": "final", "message": job.get("message")}
+    else:
+        event = {"type": "error", "error": job.get("error") or "Le flux de ce message n'est plus disponible."}
+
+    async def replay():
+        yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(replay(), media_type="text/event-stream")
@@ -0,0 +1,44 @@
+from app.api.auth import require_password
+from app.services.answer_store_service import AnswerStoreService
+from app.services.cassette_service import CassetteService
+from app.services.checkpoint_service import CheckpointService
+from app.services.evidence_service import EvidenceService
+from app.services.hedging_service import HedgingService
+from app.services.loop_monitor_service import LoopMonitorService
+from app.services.model_routing_service import ModelRoutingService
+from app.services.pipeline_mode_service import PipelineModeService
+from app.services.pre_verification_service import PreVerificationService
+from app.services.prefetch_service import PrefetchService
+from app.services.rate_limit_service import RateLimitService
+from app.services.resilience_service import ResilienceService
+from app.services.streaming_service import StreamingService
+from app.services.tool_memo_service import ToolMemoService
+from app.services.tracing_service import TracingService
+from fastapi import APIRouter, Depends
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    description="Get in-process counters of the agentic pipeline.",
+    dependencies=[Depends(require_password)],
+)
+async def get_metrics() -> dict:
+    return {
+        "tracing": TracingService.stats(),
+        "pre_verification": PreVerificationService.stats(),
+        "models": ModelRoutingService.stats(),
+        "modes": PipelineModeService.stats(),
+        "streaming": StreamingService.stats(),
+        "dependencies": ResilienceService.stats(),
+        "event_loop": LoopMonitorService.stats(),
+        "hedging": HedgingService.stats(),
+        "prefetch": PrefetchService.stats(),
+        "rate_limits": RateLimitService.stats(),
+        "tool_calls": ToolMemoService.stats(),
+        "answer_store": AnswerStoreService.stats(),
+        "cassettes": CassetteService.stats(),
+        "checkpoints": CheckpointService.stats(),
+        "evidence": EvidenceService.stats(),
+    }
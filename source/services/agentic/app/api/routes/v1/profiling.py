@@ -0,0 +1,57 @@
+from app.api.auth import require_admin_password
+from app.models.base_models import ProfileSessionResponse
+from app.services.profiling_service import ProfilingService
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter()
+
+
+@router.post(
+    "/admin/profile",
+    description=(
+        "Start a sampling profiler session over the next `duration_s` seconds, or until the next `jobs` jobs "
+        "have finished. Requires ADMIN_PASSWORD."
+    ),
+    response_model=ProfileSessionResponse,
+    dependencies=[Depends(require_admin_password)],
+)
+async def start_profile(
+    duration_s: float | None = None,
+    jobs: int | None = None,
+    interval_ms: float | None = None,
+):
+    try:
+        return ProfileSessionResponse(**ProfilingService.start(duration_s, jobs, interval_ms))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+
+@router.get(
+    "/admin/profile",
+    description="Status of the current or last profiling session, with the stage timings of its jobs.",
+    response_model=ProfileSessionResponse,
+    dependencies=[Depends(require_admin_password)],
+)
+async def get_profile():
+    return ProfileSessionResponse(**ProfilingService.status())
+
+
+@router.delete(
+    "/admin/profile",
+    description="Stop the running profiling session; its results stay available.",
+    response_model=ProfileSessionResponse,
+    dependencies=[Depends(require_admin_password)],
+)
+async def stop_profile():
+    return ProfileSessionResponse(**ProfilingService.stop())
+
+
+@router.get(
+    "/admin/profile/flamegraph",
+    description="Samples of the current or last session as collapsed stacks, for flamegraph.pl or speedscope.",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin_password)],
+)
+async def get_flamegraph():
+    return PlainTextResponse(ProfilingService.folded_stacks())
@@ -0,0 +1,25 @@
+from app.api.auth import require_admin_password
+from app.models.base_models import SettingsReloadResponse
+from app.settings import reload_settings
+from fastapi import APIRouter, Depends, HTTPException, status
+
+router = APIRouter()
+
+
+@router.post(
+    "/admin/settings/reload",
+    description=(
+        "Re-read the secrets, connection and model settings (passwords, API keys, Supabase credentials, "
+        "per-agent models) from the environment and the .env file, without a restart. Same as sending SIGHUP "
+        "to the process."
+    ),
+    response_model=SettingsReloadResponse,
+    dependencies=[Depends(require_admin_password)],
+)
+async def reload():
+    try:
+        settings = reload_settings()
+    except ValueError as exc:
+        # The current settings stay in effect.
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return SettingsReloadResponse(configured=settings.summary(), missing=settings.missing())
@@ -1,12 +1,16 @@
-import os
+from app.settings import get_settings
+from supabase import Client, create_client
 
-from dotenv import load_dotenv
-from supabase import create_client
+_client: Client | None = None
+_client_credentials: tuple[str | None, str | None] | None = None
 
-def get_db():
-    load_dotenv()
 
-    SUPABASE_URL=os.getenv("SUPABASE_URL")
-    SUPABASE_KEY=os.getenv("SUPABASE_SERVICE_KEY")
-
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+def get_db() -> Client:
+    """Supabase client shared by the process, created again when a settings reload changes the credentials."""
+    global _client, _client_credentials
+    settings = get_settings()
+    credentials = (settings.supabase_url, settings.supabase_service_key)
+    if _client is None or credentials != _client_credentials:
+        _client = create_client(*credentials)
+        _client_credentials = credentials
+    return _client
@@ -8,18 +8,62 @@ class HealthResponse(BaseModel):
     status: Literal["ok"]
 
 
+class ReadinessResponse(BaseModel):
+    status: Literal["ready", "degraded"]
+    dependencies: dict[str, Literal["closed", "open", "half_open"]]
+
+
+class StageUsageModel(BaseModel):
+    model: str
+    tier: Literal["small", "large"]
+    calls: int
+    latency_ms: int
+    input_tokens: int
+    cached_tokens: int = 0
+    output_tokens: int
+
+
 class MessageModel(BaseModel):
     message: str
     created_at: datetime
-    status: Literal["approved", "fallback"]
+    status: Literal["approved", "fallback", "unverified"]
     attempts: int
     reformulated_query: str | None = None
     verifier_feedback: str | None = None
+    stages: dict[str, StageUsageModel] | None = None
+    time_to_first_token_ms: int | None = None
+    cached: bool = False
+    mode: Literal["fast", "full"] | None = None
+    escalated: bool = False
 
 
 class MessageJobCreateResponse(BaseModel):
     job_id: str
     status: Literal["queued"]
+    session_id: str | None = None
+
+
+class CheckpointAttemptModel(BaseModel):
+    attempt: int
+    fast: dict | None = None
+    reformulation: str | None = None
+    orchestrator: dict | None = None
+    verdict: dict | None = None
+
+
+class CheckpointModel(BaseModel):
+    retries: int
+    updated_at: datetime
+    attempts: list[CheckpointAttemptModel]
+
+
+class EvidenceSummaryModel(BaseModel):
+    items: int
+    kinds: dict[str, int]
+    chars: int
+    fetched: int
+    reused: int
+    duplicates: int
 
 
 class MessageJobStatusResponse(BaseModel):
@@ -29,3 +73,59 @@ class MessageJobStatusResponse(BaseModel):
     finished_at: datetime | None = None
     message: MessageModel | None = None
     error: str | None = None
+    session_id: str | None = None
+    mode: Literal["fast", "full", "auto"] | None = None
+    checkpoint: CheckpointModel | None = None
+    evidence: EvidenceSummaryModel | None = None
+
+
+class ProfileStageModel(BaseModel):
+    stage: str
+    wall_ms: float
+    cpu_ms: float
+    blocked_ms: float
+    await_ms: float
+
+
+class ProfileJobModel(BaseModel):
+    job_id: str
+    started_at: datetime
+    wall_ms: float | None = None
+    stages: list[ProfileStageModel]
+
+
+class ProfileSessionResponse(BaseModel):
+    status: Literal["idle", "running", "stopped"]
+    started_at: datetime | None = None
+    stopped_at: datetime | None = None
+    interval_ms: float | None = None
+    max_jobs: int | None = None
+    samples: int = 0
+    dropped_samples: int = 0
+    distinct_stacks: int = 0
+    jobs: list[ProfileJobModel] = []
+
+
+class BatchCreateRequest(BaseModel):
+    questions: list[str]
+
+
+class BatchCreateResponse(BaseModel):
+    batch_id: str
+    status: Literal["queued"]
+    total: int
+
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    status: Literal["queued", "running", "completed"]
+    created_at: datetime
+    finished_at: datetime | None = None
+    total: int
+    done: int
+    errors: int
+
+
+class SettingsReloadResponse(BaseModel):
+    configured: dict[str, bool]
+    missing: list[str]
@@ -0,0 +1,263 @@
+"""Incremental embedding of the ai_data knowledge base.
+
+Streams ai_data rows page by page, hashes Title/Content and only re-embeds rows whose hash
+differs from the stored content_hash. Run from source/services/agentic:
+
+    python -m app.scripts.ingest_ai_data [--chunks] [--force] [--dry-run]
+
+The expected columns and tables are described in sql/ai_data_ingestion.sql.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from dataclasses import dataclass
+
+from app.agents.basic_agent import EMBEDDING_COLUMN
+from app.database.client import get_db
+from app.settings import get_settings
+from langchain_openai import OpenAIEmbeddings
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken ships with langchain-openai
+    tiktoken = None
+
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+TABLE = "ai_data"
+CHUNKS_TABLE = "ai_data_chunks"
+HASH_COLUMN = "content_hash"
+
+PAGE_SIZE = 500
+BATCH_SIZE = 64
+CONCURRENCY = 4
+MAX_RETRIES = 5
+CHUNK_CHARS = 1200
+CHUNK_OVERLAP = 200
+
+
+@dataclass
+class IngestionStats:
+    scanned: int = 0
+    embedded: int = 0
+    skipped: int = 0
+    chunks: int = 0
+    failed: int = 0
+    tokens: int = 0
+    started_at: float = 0.0
+
+    def report(self) -> str:
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        return (
+            f"scanned={self.scanned} embedded={self.embedded} skipped={self.skipped} chunks={self.chunks} "
+            f"failed={self.failed} tokens={self.tokens} elapsed={elapsed:.1f}s "
+            f"rows/s={self.scanned / elapsed:.1f}"
+        )
+
+
+def content_hash(row: dict) -> str:
+    """Hash of everything that influences the stored embeddings, including the model name."""
+    payload = "\x1f".join([EMBEDDING_MODEL, row.get("Title") or "", row.get("Content") or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def split_chunks(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    text = (text or "").strip()
+    if not text:
+        return []
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            # Prefer cutting on a paragraph or sentence boundary inside the window.
+            boundary = max(text.rfind("\n", start + overlap, end), text.rfind(". ", start + overlap, end))
+            if boundary > start:
+                end = boundary + 1
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return [chunk for chunk in chunks if chunk]
+
+
+class AiDataIngestor:
+    def __init__(
+        self,
+        *,
+        page_size: int = PAGE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        concurrency: int = CONCURRENCY,
+        with_chunks: bool = False,
+        force: bool = False,
+        dry_run: bool = False,
+    ):
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.with_chunks = with_chunks
+        self.force = force
+        self.dry_run = dry_run
+        self.stats = IngestionStats()
+        self._db = get_db()
+        self._embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, api_key=get_settings().openai_api_key)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._encoding = tiktoken.get_encoding("cl100k_base") if tiktoken else None
+
+    async def run(self) -> IngestionStats:
+        self.stats.started_at = time.monotonic()
+        last_id = None
+        while True:
+            rows = await asyncio.to_thread(self._fetch_page, last_id)
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            await self._process_page(rows)
+            print(self.stats.report())
+        return self.stats
+
+    def _fetch_page(self, last_id) -> list[dict]:
+        query = self._db.table(TABLE).select(f"id, Title, Content, {HASH_COLUMN}").order("id").limit(self.page_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        return query.execute().data or []
+
+    async def _process_page(self, rows: list[dict]) -> None:
+        self.stats.scanned += len(rows)
+        changed = []
+        for row in rows:
+            row_hash = content_hash(row)
+            if not self.force and row.get(HASH_COLUMN) == row_hash:
+                self.stats.skipped += 1
+                continue
+            changed.append((row, row_hash))
+
+        if self.dry_run:
+            print(f"[dry-run] {len(changed)} rows would be re-embedded")
+            return
+        if not changed:
+            return
+
+        titles = [row.get("Title") or "" for row, _ in changed]
+        vectors = await self._embed_all(titles)
+
+        updates = []
+        for (row, row_hash), vector in zip(changed, vectors):
+            if vector is None:
+                self.stats.failed += 1
+                continue
+            updates.append(
+                {
+                    "id": row["id"],
+                    "Title": row.get("Title"),
+                    "Content": row.get("Content"),
+                    EMBEDDING_COLUMN: vector,
+                    # Stored last so that a failed chunk pass leaves the row marked as stale.
+                    HASH_COLUMN: None if self.with_chunks else row_hash,
+                }
+            )
+
+        if updates:
+            await self._with_retry(self._upsert, TABLE, updates)
+            self.stats.embedded += len(updates)
+
+        if self.with_chunks:
+            embedded_ids = {update["id"] for update in updates}
+            await self._embed_chunks([(row, row_hash) for row, row_hash in changed if row["id"] in embedded_ids])
+
+    async def _embed_chunks(self, rows: list[tuple[dict, str]]) -> None:
+        chunk_rows = []
+        for row, _ in rows:
+            for index, chunk in enumerate(split_chunks(row.get("Content"))):
+                chunk_rows.append({"question_id": row["id"], "chunk_index": index, "content": chunk})
+
+        vectors = await self._embed_all([chunk["content"] for chunk in chunk_rows])
+        complete_ids = {row["id"] for row, _ in rows}
+        for chunk, vector in zip(chunk_rows, vectors):
+            if vector is None:
+                complete_ids.discard(chunk["question_id"])
+            chunk["embedding"] = vector
+
+        ready_chunks = [chunk for chunk in chunk_rows if chunk["question_id"] in complete_ids]
+        if complete_ids:
+            await self._with_retry(self._replace_chunks, list(complete_ids), ready_chunks)
+            self.stats.chunks += len(ready_chunks)
+            await self._with_retry(
+                self._upsert,
+                TABLE,
+                [
+                    {"id": row["id"], "Title": row.get("Title"), "Content": row.get("Content"), HASH_COLUMN: row_hash}
+                    for row, row_hash in rows
+                    if row["id"] in complete_ids
+                ],
+            )
+        self.stats.failed += len(rows) - len(complete_ids)
+
+    async def _embed_all(self, texts: list[str]) -> list[list[float] | None]:
+        batches = [texts[start : start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(self._embed_batch(batch) for batch in batches))
+        return [vector for batch in results for vector in batch]
+
+    async def _embed_batch(self, texts: list[str]) -> list[list[float] | None]:
+        async with self._semaphore:
+            try:
+                vectors = await self._with_retry(asyncio.to_thread, self._embeddings.embed_documents, texts)
+            except Exception as exc:
+                print(f"Embedding batch of {len(texts)} texts failed: {exc}")
+                return [None] * len(texts)
+        self.stats.tokens += sum(self._count_tokens(text) for text in texts)
+        return vectors
+
+    def _count_tokens(self, text: str) -> int:
+        if self._encoding is None:
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text))
+
+    async def _upsert(self, table: str, rows: list[dict]) -> None:
+        await asyncio.to_thread(lambda: self._db.table(table).upsert(rows).execute())
+
+    async def _replace_chunks(self, question_ids: list, chunks: list[dict]) -> None:
+        def replace():
+            self._db.table(CHUNKS_TABLE).delete().in_("question_id", question_ids).execute()
+            if chunks:
+                self._db.table(CHUNKS_TABLE).insert(chunks).execute()
+
+        await asyncio.to_thread(replace)
+
+    @staticmethod
+    async def _with_retry(func, *args):
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                return await func(*args)
+            except Exception:
+                if attempt == MAX_RETRIES:
+                    raise
+                await asyncio.sleep(min(30.0, 2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Incrementally (re-)embed the ai_data table.")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Texts per embed_documents call.")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Concurrent embedding calls.")
+    parser.add_argument("--chunks", action="store_true", help="Also embed content chunks into ai_data_chunks.")
+    parser.add_argument("--force", action="store_true", help="Re-embed every row, ignoring stored hashes.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many rows changed.")
+    args = parser.parse_args()
+
+    ingestor = AiDataIngestor(
+        page_size=args.page_size,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        with_chunks=args.chunks,
+        force=args.force,
+        dry_run=args.dry_run,
+    )
+    stats = asyncio.run(ingestor.run())
+    print(f"Done: {stats.report()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Replay recorded jobs offline to profile the pipeline on identical traffic.
+
+Record cassettes by running the API with CASSETTE_MODE=record, then run from
+source/services/agentic:
+
+    python -m app.scripts.replay_cassettes [--dir cassettes] [--latency-scale 1.0] [--concurrency 1]
+
+Every cassette's question goes through the full multi-agent pipeline with each LLM,
+embedding, Supabase and Tavily call served from the recording, so no network access is needed.
+The replayed wall time is compared with the recorded one; with a latency scale of 0, the
+difference is the pipeline's own overhead.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import time
+
+from app.services.cassette_service import MODE_REPLAY, CassetteService
+from app.services.messages_service import MessagesService
+
+
+async def replay_one(path: str, semaphore: asyncio.Semaphore) -> dict:
+    with open(path, encoding="utf-8") as file:
+        recorded = json.load(file)
+    async with semaphore:
+        started_at = time.perf_counter()
+        try:
+            payload = await MessagesService.answer_question(recorded["question"], trace_name="Replay")
+            status = payload["status"]
+        except Exception as exc:
+            status = f"error: {exc}"
+        duration_s = time.perf_counter() - started_at
+    return {
+        "job_id": recorded["job_id"],
+        "calls": len(recorded["interactions"]),
+        "recorded_s": recorded["duration_s"],
+        "replayed_s": duration_s,
+        "status": status,
+    }
+
+
+async def replay(directory: str, latency_scale: float, concurrency: int) -> None:
+    CassetteService.configure(MODE_REPLAY, directory=directory, latency_scale=latency_scale)
+    paths = sorted(glob.glob(os.path.join(directory, "*.json")))
+    if not paths:
+        print(f"No cassette found in {directory}")
+        return
+
+    semaphore = asyncio.Semaphore(concurrency)
+    started_at = time.perf_counter()
+    results = await asyncio.gather(*(replay_one(path, semaphore) for path in paths))
+    wall_s = time.perf_counter() - started_at
+
+    print(f"{'job':<38} {'calls':>5} {'recorded s':>10} {'replayed s':>10}  status")
+    for result in results:
+        print(
+            f"{result['job_id']:<38} {result['calls']:>5} {result['recorded_s']:>10.2f} "
+            f"{result['replayed_s']:>10.2f}  {result['status']}"
+        )
+    replayed = [result["replayed_s"] for result in results]
+    print(
+        f"\n{len(results)} jobs in {wall_s:.2f}s (latency scale {latency_scale}), "
+        f"median {statistics.median(replayed):.2f}s, max {max(replayed):.2f}s"
+    )
+    print(f"cassettes: {CassetteService.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded jobs without network access.")
+    parser.add_argument("--dir", default=CassetteService.DIRECTORY, help="Cassette directory.")
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=CassetteService.LATENCY_SCALE,
+        help="Multiplier of the recorded latencies (0 serves every call instantly).",
+    )
+    parser.add_argument("--concurrency", type=int, default=1, help="Jobs replayed at once.")
+    args = parser.parse_args()
+    asyncio.run(replay(args.dir, args.latency_scale, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import ClassVar
+
+from app.database.client import get_db
+from app.services.cassette_service import MODE_REPLAY, CassetteService
+from app.services.evidence_service import KIND_QUESTION, EvidenceService
+from app.services.hybrid_search import tokenize
+from app.services.rate_limit_service import PRIORITY_BATCH, RateLimitService
+from app.services.resilience_service import DEPENDENCY_SUPABASE, ResilienceService
+from app.services.retrieval_service import retrieval_service
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerStoreService:
+    """Precomputed, verified answers for the most asked questions.
+
+    A warm-up job answers a configured question list through the regular pipeline: the front's
+    suggestion chips, the most frequent recent questions and, optionally, every ai_data Title. Only
+    approved answers are stored. Questions matching an entry exactly or near-exactly (same tokens
+    once accents, case, punctuation and stopwords are ignored, or a token overlap of at least
+    NEAR_MATCH_THRESHOLD) are answered from the store without running the agents.
+
+    Each entry remembers the content_hash of the ai_data rows its answer was built from (the stored
+    questions in the run's evidence); a refresh recomputes the entries whose rows changed,
+    disappeared, or that are older than MAX_AGE_S.
+    """
+
+    ENABLED = os.getenv("ANSWER_STORE_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+    REFRESH_S = int(os.getenv("ANSWER_STORE_REFRESH_S", "3600"))
+    MAX_AGE_S = int(os.getenv("ANSWER_STORE_MAX_AGE_S", "86400"))
+    TOP_QUESTIONS = int(os.getenv("ANSWER_STORE_TOP_QUESTIONS", "20"))
+    WARM_TITLES = os.getenv("ANSWER_STORE_WARM_TITLES", "false").lower() in ("1", "true", "yes", "on")
+    NEAR_MATCH_THRESHOLD = float(os.getenv("ANSWER_STORE_NEAR_MATCH", "0.85"))
+    MIN_QUESTION_COUNT = 2
+    MAX_TRACKED_QUESTIONS = 5000
+    HASH_COLUMN = "content_hash"
+
+    # Keep in sync with `suggestion_chips` in the front State.
+    SUGGESTION_QUESTIONS = (
+        "Quels sont les prochains événements associatifs ?",
+        "Comment réserver une salle de travail au campus ?",
+        "Qui contacter pour une question de scolarité ?",
+    )
+
+    _entries: ClassVar[dict[str, dict]] = {}
+    _question_counts: ClassVar[Counter] = Counter()
+    _question_texts: ClassVar[dict[str, str]] = {}
+    _task: ClassVar[asyncio.Task | None] = None
+    _counters: ClassVar[dict[str, int]] = {
+        "hits": 0,
+        "near_hits": 0,
+        "misses": 0,
+        "warmed": 0,
+        "warm_failures": 0,
+        "invalidated": 0,
+    }
+
+    @classmethod
+    def start(cls) -> None:
+        """Warm the store now and then every REFRESH_S seconds. Replays never warm: they serve recorded jobs only."""
+        if cls.ENABLED and CassetteService.MODE != MODE_REPLAY and (cls._task is None or cls._task.done()):
+            cls._task = asyncio.create_task(cls._refresh_loop())
+
+    @classmethod
+    async def stop(cls) -> None:
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    def lookup(cls, question: str) -> dict | None:
+        """Return a copy of the stored answer payload for an exact or near-exact match."""
+        if not cls.ENABLED or not cls._entries:
+            return None
+        tokens = tokenize(question)
+        key = cls._key(tokens)
+        entry = cls._entries.get(key)
+        if entry is not None:
+            cls._counters["hits"] += 1
+            return dict(entry["payload"])
+
+        token_set = set(tokens)
+        best_entry, best_score = None, 0.0
+        for candidate in cls._entries.values():
+            union = token_set | candidate["tokens"]
+            score = len(token_set & candidate["tokens"]) / len(union) if union else 0.0
+            if score > best_score:
+                best_entry, best_score = candidate, score
+        if best_entry is not None and best_score >= cls.NEAR_MATCH_THRESHOLD:
+            cls._counters["near_hits"] += 1
+            return dict(best_entry["payload"])
+
+        cls._counters["misses"] += 1
+        return None
+
+    @classmethod
+    def record_question(cls, question: str) -> None:
+        """Count an incoming question so the most frequent ones get warmed."""
+        key = cls._key(tokenize(question))
+        if not key:
+            return
+        cls._question_counts[key] += 1
+        cls._question_texts.setdefault(key, question)
+        if len(cls._question_counts) > cls.MAX_TRACKED_QUESTIONS:
+            for rare_key, _ in cls._question_counts.most_common()[cls.MAX_TRACKED_QUESTIONS // 2 :]:
+                del cls._question_counts[rare_key]
+                cls._question_texts.pop(rare_key, None)
+
+    @classmethod
+    async def refresh(cls) -> None:
+        """Drop stale entries, then answer every configured question missing from the store."""
+        # Imported here: MessagesService serves its queue from this store.
+        from app.services.messages_service import MessagesService
+
+        await cls._invalidate_stale_entries()
+        for question in await cls._warm_questions():
+            key = cls._key(tokenize(question))
+            if not key or key in cls._entries:
+                continue
+            await MessagesService.wait_until_idle()
+            await cls._warm(key, question, MessagesService.answer_question)
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {"enabled": cls.ENABLED, "entries": len(cls._entries), **cls._counters}
+
+    @classmethod
+    async def _refresh_loop(cls) -> None:
+        while True:
+            try:
+                await cls.refresh()
+            except Exception as exc:
+                logger.warning("Answer store refresh failed: %s", exc)
+            await asyncio.sleep(cls.REFRESH_S)
+
+    @classmethod
+    async def _warm_questions(cls) -> list[str]:
+        questions = list(cls.SUGGESTION_QUESTIONS)
+        questions.extend(
+            cls._question_texts[key]
+            for key, count in cls._question_counts.most_common(cls.TOP_QUESTIONS)
+            if count >= cls.MIN_QUESTION_COUNT
+        )
+        if cls.WARM_TITLES:
+            documents = await retrieval_service.documents()
+            questions.extend(title for title, _ in documents.values() if title)
+        return questions
+
+    @classmethod
+    async def _warm(cls, key: str, question: str, answer_question) -> None:
+        try:
+            # The entry depends on the rows the answer was built from, as recorded in its evidence.
+            with RateLimitService.use_priority(PRIORITY_BATCH), EvidenceService.job(None):
+                payload = await answer_question(question, trace_name="Answer Store Warm-up")
+                source_ids = EvidenceService.sources(KIND_QUESTION)
+        except Exception as exc:
+            cls._counters["warm_failures"] += 1
+            logger.warning("Answer store warm-up failed for %r: %s", question, exc)
+            return
+        if payload["status"] != "approved":
+            cls._counters["warm_failures"] += 1
+            return
+
+        payload["created_at"] = datetime.now(timezone.utc)
+        cls._entries[key] = {
+            "question": question,
+            "tokens": set(key.split()),
+            "payload": payload,
+            "source_hashes": await cls._content_hashes(source_ids),
+            "warmed_at": time.monotonic(),
+        }
+        cls._counters["warmed"] += 1
+
+    @classmethod
+    async def _invalidate_stale_entries(cls) -> None:
+        if not cls._entries:
+            return
+        source_ids = {doc_id for entry in cls._entries.values() for doc_id in entry["source_hashes"]}
+        current_hashes = await cls._content_hashes(list(source_ids))
+        now = time.monotonic()
+        for key, entry in list(cls._entries.items()):
+            expired = now - entry["warmed_at"] > cls.MAX_AGE_S
+            changed = any(current_hashes.get(doc_id) != row_hash for doc_id, row_hash in entry["source_hashes"].items())
+            if expired or changed:
+                del cls._entries[key]
+                cls._counters["invalidated"] += 1
+
+    @classmethod
+    async def _content_hashes(cls, ids: list) -> dict:
+        if not ids:
+            return {}
+        response = await ResilienceService.call_sync(
+            DEPENDENCY_SUPABASE,
+            lambda: get_db().table("ai_data").select(f"id, {cls.HASH_COLUMN}").in_("id", ids).execute(),
+        )
+        return {row["id"]: row.get(cls.HASH_COLUMN) for row in response.data or []}
+
+    @staticmethod
+    def _key(tokens: list[str]) -> str:
+        return " ".join(sorted(set(tokens)))
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, ClassVar
+from uuid import uuid4
+
+from app.services.hybrid_search import normalize
+from app.services.messages_service import MessagesService
+from app.services.rate_limit_service import PRIORITY_BATCH, RateLimitService
+
+from fastapi import HTTPException, status
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    def __init__(self, batch_id: str, questions: list[str]):
+        self.batch_id = batch_id
+        self.questions = questions
+        self.status = BatchService.STATUS_QUEUED
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: datetime | None = None
+        # Items in completion order, so that the results download can stream them as they finish.
+        self.results: list[dict] = []
+        self.condition = asyncio.Condition()
+        self.task: asyncio.Task | None = None
+
+    def progress(self) -> dict:
+        errors = sum(result["status"] == MessagesService.JOB_STATUS_ERROR for result in self.results)
+        return {"total": len(self.questions), "done": len(self.results), "errors": errors}
+
+
+class BatchService:
+    """Bulk question runs (FAQ re-answering, evaluation sweeps) outside the interactive queue.
+
+    Batch items run at a lower priority than interactive messages: an item only starts once the
+    interactive queue is drained, and at most CONCURRENCY items run at once. Identical questions
+    within a batch are answered once and the result is shared.
+    """
+
+    CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "2"))
+    MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "1000"))
+    RETENTION_S = int(os.getenv("BATCH_RETENTION_S", "86400"))
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+
+    _batches: ClassVar[dict[str, _Batch]] = {}
+    _semaphore: ClassVar[asyncio.Semaphore | None] = None
+
+    @classmethod
+    async def submit(cls, questions: list[str]) -> str:
+        cls._validate_questions(questions)
+        batch = _Batch(str(uuid4()), [question.strip() for question in questions])
+        cls._batches[batch.batch_id] = batch
+        batch.task = asyncio.create_task(cls._run_batch(batch))
+        return batch.batch_id
+
+    @classmethod
+    def get_batch(cls, batch_id: str) -> dict | None:
+        batch = cls._batches.get(batch_id)
+        if batch is None:
+            return None
+        return {
+            "batch_id": batch.batch_id,
+            "status": batch.status,
+            "created_at": batch.created_at,
+            "finished_at": batch.finished_at,
+            **batch.progress(),
+        }
+
+    @classmethod
+    async def stream_results(cls, batch_id: str) -> AsyncIterator[str]:
+        """Yield one JSON line per item as it completes, each with the aggregate progress."""
+        batch = cls._batches.get(batch_id)
+        if batch is None:
+            return
+        position = 0
+        while True:
+            async with batch.condition:
+                await batch.condition.wait_for(
+                    lambda: len(batch.results) > position or batch.status == cls.STATUS_COMPLETED
+                )
+                pending = batch.results[position:]
+                completed = batch.status == cls.STATUS_COMPLETED
+            for result in pending:
+                position += 1
+                progress = {"done": position, "total": len(batch.questions)}
+                yield json.dumps({**result, "progress": progress}, default=str) + "\n"
+            if completed and position >= len(batch.results):
+                yield json.dumps({"type": "summary", "batch_id": batch_id, **batch.progress()}) + "\n"
+                return
+
+    @classmethod
+    async def _run_batch(cls, batch: _Batch) -> None:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(cls.CONCURRENCY)
+        batch.status = cls.STATUS_RUNNING
+
+        indexes_by_question: dict[str, list[int]] = {}
+        for index, question in enumerate(batch.questions):
+            indexes_by_question.setdefault(normalize(question), []).append(index)
+
+        await asyncio.gather(*(cls._run_item(batch, indexes) for indexes in indexes_by_question.values()))
+
+        async with batch.condition:
+            batch.status = cls.STATUS_COMPLETED
+            batch.finished_at = datetime.now(timezone.utc)
+            batch.condition.notify_all()
+        asyncio.get_running_loop().call_later(cls.RETENTION_S, cls._batches.pop, batch.batch_id, None)
+
+    @classmethod
+    async def _run_item(cls, batch: _Batch, indexes: list[int]) -> None:
+        question = batch.questions[indexes[0]]
+        async with cls._semaphore:
+            await MessagesService.wait_until_idle()
+            try:
+                with RateLimitService.use_priority(PRIORITY_BATCH):
+                    payload = await MessagesService.answer_question(
+                        question,
+                        trace_name="Batch",
+                        trace_id=f"{batch.batch_id}-{indexes[0]}",
+                        session_id=batch.batch_id,
+                    )
+                payload["created_at"] = datetime.now(timezone.utc)
+                outcome = {"status": MessagesService.JOB_STATUS_COMPLETED, "message": payload, "error": None}
+            except Exception as exc:
+                logger.error("Batch %s item %s failed: %s", batch.batch_id, indexes[0], exc)
+                outcome = {"status": MessagesService.JOB_STATUS_ERROR, "message": None, "error": str(exc)}
+
+        async with batch.condition:
+            for index in indexes:
+                batch.results.append({"type": "item", "index": index, "question": batch.questions[index], **outcome})
+            batch.condition.notify_all()
+
+    @classmethod
+    def _validate_questions(cls, questions: list[str]) -> None:
+        if not questions:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch cannot be empty")
+        if len(questions) > cls.MAX_QUESTIONS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Batch is over {cls.MAX_QUESTIONS} questions",
+            )
+        for question in questions:
+            MessagesService.validate_message(question)
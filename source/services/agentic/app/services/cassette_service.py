@@ -0,0 +1,273 @@
+import asyncio
+import contextvars
+import glob
+import hashlib
+import importlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, ClassVar, Iterator, TypeVar
+
+T = TypeVar("T")
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+
+class CassetteMissError(Exception):
+    """Raised in replay mode when a call has no recorded interaction to serve it."""
+
+
+class _Cassette:
+    def __init__(self, job_id: str, question: str, interactions: list[dict] | None = None):
+        self.job_id = job_id
+        self.question = question
+        self.interactions = interactions if interactions is not None else []
+        self.used: set[int] = set()
+        self.started_at = time.monotonic()
+        self.mismatches = 0
+
+    def take(self, kind: str, key: str) -> dict | None:
+        """Next unused interaction with this exact request, else the next unused one of the same kind."""
+        fallback = None
+        for position, interaction in enumerate(self.interactions):
+            if position in self.used or interaction["kind"] != kind:
+                continue
+            if interaction["key"] == key:
+                self.used.add(position)
+                return interaction
+            if fallback is None:
+                fallback = position
+        if fallback is None:
+            return None
+        # The request changed since the recording (e.g. an edited prompt): replay in recorded order.
+        self.mismatches += 1
+        self.used.add(fallback)
+        return self.interactions[fallback]
+
+
+def _error_fields(exc: Exception) -> dict:
+    status_code = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return {
+        "error": repr(exc),
+        "error_type": f"{type(exc).__module__}:{type(exc).__qualname__}",
+        "error_message": str(exc),
+        "error_status_code": status_code if isinstance(status_code, int) else None,
+    }
+
+
+def _replayed_error(kind: str, interaction: dict) -> Exception:
+    """An exception of the recorded type, so that a replay takes the same error path.
+
+    Recorded errors are raised as a subclass of their original type built from the recorded message
+    (and HTTP status), since most client errors cannot be rebuilt from their constructor arguments.
+    Cassettes recorded without the type, or whose type cannot be imported, raise RuntimeError.
+    """
+    message = interaction.get("error_message") or f"Replayed {kind} error: {interaction['error']}"
+    module_name, _, qualname = (interaction.get("error_type") or "").partition(":")
+    try:
+        error_class = importlib.import_module(module_name)
+        for name in qualname.split("."):
+            error_class = getattr(error_class, name)
+    except (ImportError, AttributeError, ValueError):
+        return RuntimeError(message)
+    if not isinstance(error_class, type) or not issubclass(error_class, Exception):
+        return RuntimeError(message)
+    replayed_class = type(
+        error_class.__name__,
+        (error_class,),
+        {"__init__": Exception.__init__, "__str__": Exception.__str__, "__module__": error_class.__module__},
+    )
+    error = replayed_class(message)
+    if interaction.get("error_status_code") is not None:
+        error.status_code = interaction["error_status_code"]
+    return error
+
+
+_current_cassette: contextvars.ContextVar[_Cassette | None] = contextvars.ContextVar("cassette", default=None)
+
+
+class CassetteService:
+    """Record/replay of the pipeline's outbound calls (LLM, embeddings, Supabase, Tavily).
+
+    In record mode, every call made while a job runs is written with its request, response and
+    latency to `<CASSETTE_DIR>/<job_id>.json`; the attempts of a retried job share that file, while runs
+    without a job id are keyed by their question and keep only their latest recording. In replay mode,
+    jobs are matched to a cassette by question and calls are served from it without network access,
+    after sleeping the recorded latency multiplied by LATENCY_SCALE (1 keeps the original timing, 0
+    serves instantly).
+    Data shared across jobs, such as the ai_data rows behind the lexical index, is stored once under
+    `<CASSETTE_DIR>/shared/`.
+    """
+
+    MODE = os.getenv("CASSETTE_MODE", MODE_OFF)
+    DIRECTORY = os.getenv("CASSETTE_DIR", "cassettes")
+    LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "1"))
+
+    _replay_index: ClassVar[dict[str, str] | None] = None
+    _counters: ClassVar[dict[str, int]] = {"recorded": 0, "replayed": 0, "mismatches": 0, "misses": 0}
+
+    @classmethod
+    def configure(cls, mode: str, directory: str | None = None, latency_scale: float | None = None) -> None:
+        cls.MODE = mode
+        cls.DIRECTORY = directory or cls.DIRECTORY
+        cls.LATENCY_SCALE = cls.LATENCY_SCALE if latency_scale is None else latency_scale
+        cls._replay_index = None
+
+    @classmethod
+    @contextmanager
+    def use(cls, job_id: str | None, question: str) -> Iterator[None]:
+        """Attach a cassette to the current job: a new one when recording, the matching one when replaying."""
+        if cls.MODE == MODE_OFF:
+            yield
+            return
+
+        if cls.MODE == MODE_RECORD:
+            cassette_id = job_id or hashlib.sha1(question.encode()).hexdigest()[:16]
+            previous = []
+            # A retried job runs again under the same id: its calls are appended to the first attempt's.
+            # Runs without an id (e.g. answer store warm-ups) are not retries and replace the last recording.
+            if job_id is not None and os.path.exists(cls._path(cassette_id)):
+                with open(cls._path(cassette_id), encoding="utf-8") as file:
+                    previous = json.load(file)["interactions"]
+            cassette = _Cassette(cassette_id, question, previous)
+        else:
+            path = cls._index().get(question.strip())
+            if path is None:
+                cls._counters["misses"] += 1
+                raise CassetteMissError(f"No cassette recorded for question {question!r}")
+            with open(path, encoding="utf-8") as file:
+                recorded = json.load(file)
+            cassette = _Cassette(recorded["job_id"], question, recorded["interactions"])
+
+        token = _current_cassette.set(cassette)
+        try:
+            yield
+        finally:
+            _current_cassette.reset(token)
+            cls._counters["mismatches"] += cassette.mismatches
+            if cls.MODE == MODE_RECORD:
+                cls._write(cassette)
+
+    @classmethod
+    async def call(
+        cls,
+        kind: str,
+        request: Any,
+        operation: Callable[[], Awaitable[T]],
+        encode: Callable[[T], Any] = lambda value: value,
+        decode: Callable[[Any], T] = lambda value: value,
+        on_replay: Callable[[T], Awaitable[None]] | None = None,
+    ) -> T:
+        """Run `operation`, recording or replaying it under `kind` and the JSON-serializable `request`.
+
+        `on_replay` receives replayed results, e.g. to re-emit the tokens of a streamed response.
+        """
+        cassette = _current_cassette.get()
+        if cls.MODE == MODE_OFF or (cassette is None and cls.MODE == MODE_RECORD):
+            return await operation()
+        if cassette is None:
+            cls._counters["misses"] += 1
+            raise CassetteMissError(f"{kind} call outside of a replayed job")
+
+        key = cls._request_key(request)
+        if cls.MODE == MODE_REPLAY:
+            interaction = cassette.take(kind, key)
+            if interaction is None:
+                cls._counters["misses"] += 1
+                raise CassetteMissError(f"No recorded {kind} call left in cassette {cassette.job_id}")
+            if cls.LATENCY_SCALE > 0:
+                await asyncio.sleep(interaction["latency_s"] * cls.LATENCY_SCALE)
+            cls._counters["replayed"] += 1
+            if interaction.get("error"):
+                raise _replayed_error(kind, interaction)
+            result = decode(interaction["response"])
+            if on_replay is not None:
+                await on_replay(result)
+            return result
+
+        started_at = time.monotonic()
+        interaction = {
+            "kind": kind,
+            "key": key,
+            "offset_s": round(started_at - cassette.started_at, 4),
+            "request": request,
+        }
+        try:
+            result = await operation()
+        except Exception as exc:
+            # Failures are recorded too, so that a replay takes the same error path.
+            interaction.update(latency_s=round(time.monotonic() - started_at, 4), response=None, **_error_fields(exc))
+            cassette.interactions.append(interaction)
+            raise
+        interaction.update(latency_s=round(time.monotonic() - started_at, 4), response=encode(result))
+        cassette.interactions.append(interaction)
+        cls._counters["recorded"] += 1
+        return result
+
+    @classmethod
+    async def shared(
+        cls,
+        name: str,
+        operation: Callable[[], Awaitable[T]],
+        encode: Callable[[T], Any] = lambda value: value,
+        decode: Callable[[Any], T] = lambda value: value,
+    ) -> T:
+        """Record or replay job-independent data under `<CASSETTE_DIR>/shared/<name>.json`."""
+        path = os.path.join(cls.DIRECTORY, "shared", f"{name}.json")
+        if cls.MODE == MODE_REPLAY:
+            if not os.path.exists(path):
+                raise CassetteMissError(f"No shared cassette {path}")
+            with open(path, encoding="utf-8") as file:
+                return decode(json.load(file))
+
+        result = await operation()
+        if cls.MODE == MODE_RECORD:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(encode(result), file, ensure_ascii=False, default=str)
+        return result
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {"mode": cls.MODE, **cls._counters}
+
+    @classmethod
+    def _index(cls) -> dict[str, str]:
+        """Map each recorded question to its most recent cassette."""
+        if cls._replay_index is None:
+            index = {}
+            for path in sorted(glob.glob(os.path.join(cls.DIRECTORY, "*.json")), key=os.path.getmtime):
+                with open(path, encoding="utf-8") as file:
+                    index[json.load(file)["question"].strip()] = path
+            cls._replay_index = index
+        return cls._replay_index
+
+    @classmethod
+    def _path(cls, job_id: str) -> str:
+        return os.path.join(cls.DIRECTORY, f"{job_id}.json")
+
+    @classmethod
+    def _write(cls, cassette: _Cassette) -> None:
+        os.makedirs(cls.DIRECTORY, exist_ok=True)
+        with open(cls._path(cassette.job_id), "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "job_id": cassette.job_id,
+                    "question": cassette.question,
+                    "recorded_at": datetime.now(timezone.utc).isoformat(),
+                    "duration_s": round(time.monotonic() - cassette.started_at, 4),
+                    "interactions": cassette.interactions,
+                },
+                file,
+                ensure_ascii=False,
+                default=str,
+            )
+
+    @staticmethod
+    def _request_key(request: Any) -> str:
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,165 @@
+import glob
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, ClassVar
+
+logger = logging.getLogger(__name__)
+
+STAGE_FAST = "fast"
+STAGE_REFORMULATION = "reformulation"
+STAGE_ORCHESTRATOR = "orchestrator"
+STAGE_VERDICT = "verdict"
+
+
+class CheckpointService:
+    """Stage-level checkpoints of queued jobs, stored as `<CHECKPOINT_DIR>/<job_id>.json`.
+
+    A checkpoint holds the job's question, session and history, then each completed stage of each
+    verification attempt: the reformulated query, the orchestrator answer and the verifier verdict,
+    along with the job's evidence store (see EvidenceService). A job retried after an error, or re-queued after a
+    process restart, skips every stage already in its checkpoint. Checkpoints are removed once the
+    job is finalized.
+    """
+
+    ENABLED = os.getenv("CHECKPOINT_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+    DIRECTORY = os.getenv("CHECKPOINT_DIR", "checkpoints")
+    MAX_RETRIES = int(os.getenv("CHECKPOINT_MAX_RETRIES", "1"))
+
+    _checkpoints: ClassVar[dict[str, dict]] = {}
+    _counters: ClassVar[dict[str, int]] = {"saved_stages": 0, "resumed_stages": 0, "retries": 0, "restored_jobs": 0}
+
+    @classmethod
+    def create(cls, job: dict) -> None:
+        if not cls.ENABLED:
+            return
+        cls._checkpoints[job["job_id"]] = {
+            "job_id": job["job_id"],
+            "user_message": job["user_message"],
+            "session_id": job["session_id"],
+            "mode": job["mode"],
+            "created_at": job["created_at"].isoformat(),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "history": None,
+            "history_saved": False,
+            "retries": 0,
+            "attempts": {},
+            "evidence": None,
+        }
+        cls._write(job["job_id"])
+
+    @classmethod
+    def get(cls, job_id: str | None) -> dict | None:
+        if job_id is None:
+            return None
+        return cls._checkpoints.get(job_id)
+
+    @classmethod
+    def save_history(cls, job_id: str, history: str | None) -> None:
+        checkpoint = cls._checkpoints.get(job_id)
+        if checkpoint is None:
+            return
+        checkpoint.update(history=history, history_saved=True)
+        cls._write(job_id)
+
+    @classmethod
+    def stage(cls, job_id: str | None, attempt: int, stage: str) -> Any | None:
+        """Result of a completed stage, or None when it still has to run."""
+        checkpoint = cls.get(job_id)
+        if checkpoint is None:
+            return None
+        result = checkpoint["attempts"].get(str(attempt), {}).get(stage)
+        if result is not None:
+            cls._counters["resumed_stages"] += 1
+        return result
+
+    @classmethod
+    def save_stage(cls, job_id: str | None, attempt: int, stage: str, result: Any) -> None:
+        checkpoint = cls.get(job_id)
+        if checkpoint is None:
+            return
+        checkpoint["attempts"].setdefault(str(attempt), {})[stage] = result
+        checkpoint["updated_at"] = datetime.now(timezone.utc).isoformat()
+        cls._counters["saved_stages"] += 1
+        cls._write(job_id)
+
+    @classmethod
+    def save_evidence(cls, job_id: str, evidence: dict) -> None:
+        """Keep the job's evidence store (see EvidenceService), written to disk with the next saved stage."""
+        checkpoint = cls._checkpoints.get(job_id)
+        if checkpoint is not None:
+            checkpoint["evidence"] = evidence
+
+    @classmethod
+    def record_retry(cls, job_id: str) -> bool:
+        """Count a retry of a failed job; False when it has used all of its retries."""
+        checkpoint = cls._checkpoints.get(job_id)
+        if checkpoint is None or checkpoint["retries"] >= cls.MAX_RETRIES:
+            return False
+        checkpoint["retries"] += 1
+        cls._counters["retries"] += 1
+        cls._write(job_id)
+        return True
+
+    @classmethod
+    def discard(cls, job_id: str) -> dict | None:
+        """Forget a finalized job's checkpoint and return its summary."""
+        summary = cls.summary(job_id)
+        cls._checkpoints.pop(job_id, None)
+        try:
+            os.remove(cls._path(job_id))
+        except FileNotFoundError:
+            pass
+        return summary
+
+    @classmethod
+    def restore(cls) -> list[dict]:
+        """Load the checkpoints of jobs left unfinished by a previous process, oldest first."""
+        if not cls.ENABLED:
+            return []
+        restored = []
+        for path in glob.glob(os.path.join(cls.DIRECTORY, "*.json")):
+            try:
+                with open(path, encoding="utf-8") as file:
+                    checkpoint = json.load(file)
+            except (OSError, ValueError) as exc:
+                logger.warning("Ignoring unreadable checkpoint %s: %s", path, exc)
+                continue
+            cls._checkpoints[checkpoint["job_id"]] = checkpoint
+            restored.append(checkpoint)
+        cls._counters["restored_jobs"] += len(restored)
+        return sorted(restored, key=lambda checkpoint: checkpoint["created_at"])
+
+    @classmethod
+    def summary(cls, job_id: str) -> dict | None:
+        """Checkpoint contents exposed in the job status, for debugging."""
+        checkpoint = cls._checkpoints.get(job_id)
+        if checkpoint is None:
+            return None
+        return {
+            "retries": checkpoint["retries"],
+            "updated_at": checkpoint["updated_at"],
+            "attempts": [
+                {"attempt": int(attempt), **stages}
+                for attempt, stages in sorted(checkpoint["attempts"].items(), key=lambda item: int(item[0]))
+            ],
+        }
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {"enabled": cls.ENABLED, "pending": len(cls._checkpoints), **cls._counters}
+
+    @classmethod
+    def _write(cls, job_id: str) -> None:
+        os.makedirs(cls.DIRECTORY, exist_ok=True)
+        path = cls._path(job_id)
+        # Written aside then renamed, so that a crash mid-write never leaves a truncated checkpoint.
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(cls._checkpoints[job_id], file, ensure_ascii=False, default=str)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def _path(cls, job_id: str) -> str:
+        return os.path.join(cls.DIRECTORY, f"{job_id}.json")
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import ClassVar
+from uuid import uuid4
+
+from app.agents.conversation_summarizer_agent import conversation_summarizer_agent
+
+from fastapi import HTTPException, status
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationService:
+    """Server-side conversation state: a rolling window of recent turns plus a running summary.
+
+    The context handed to the agents never exceeds TOKEN_BUDGET estimated tokens. Turns that
+    fall out of the window are folded into the summary in the background, after the answer
+    has been delivered.
+    """
+
+    TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "1200"))
+    RECENT_TURNS = int(os.getenv("CONVERSATION_RECENT_TURNS", "6"))
+    SESSION_TTL = timedelta(seconds=int(os.getenv("CONVERSATION_TTL_S", "3600")))
+    SUMMARY_MAX_WORDS = 150
+    MAX_TURN_CHARS = 1500
+    MAX_SESSIONS = 1000
+    MAX_SESSION_ID_LENGTH = 64
+
+    ROLE_LABELS = {"user": "Student", "assistant": "Assistant"}
+
+    _sessions: ClassVar[dict[str, dict]] = {}
+    _sessions_lock: ClassVar[asyncio.Lock] = asyncio.Lock()
+    _compaction_tasks: ClassVar[set[asyncio.Task]] = set()
+
+    @classmethod
+    async def open_session(cls, session_id: str | None) -> str:
+        """Return an existing session id, or create the session (a fresh id when none is given)."""
+        if session_id is not None:
+            cls._validate_session_id(session_id)
+        session_id = session_id or str(uuid4())
+        now = datetime.now(timezone.utc)
+
+        async with cls._sessions_lock:
+            cls._prune_sessions(now)
+            session = cls._sessions.get(session_id)
+            if session is None:
+                session = {
+                    "session_id": session_id,
+                    "summary": "",
+                    "turns": [],
+                    "summarized_turns": 0,
+                    "compacting": False,
+                    "lock": asyncio.Lock(),
+                    "updated_at": now,
+                }
+                cls._sessions[session_id] = session
+            session["updated_at"] = now
+        return session_id
+
+    @classmethod
+    async def build_context(cls, session_id: str | None) -> str | None:
+        """Render the summary and the most recent turns that fit in the token budget."""
+        session = cls._sessions.get(session_id) if session_id else None
+        if session is None:
+            return None
+
+        async with session["lock"]:
+            summary = session["summary"]
+            remaining = cls.TOKEN_BUDGET - cls.estimate_tokens(summary)
+            recent: list[str] = []
+            for turn in reversed(session["turns"][-cls.RECENT_TURNS :]):
+                line = f"{cls.ROLE_LABELS[turn['role']]}: {turn['content']}"
+                cost = cls.estimate_tokens(line)
+                if cost > remaining:
+                    break
+                recent.append(line)
+                remaining -= cost
+
+        if not summary and not recent:
+            return None
+
+        sections = []
+        if summary:
+            sections.append(f"Summary of earlier exchanges:\n{summary}")
+        if recent:
+            sections.append("Recent exchanges:\n" + "\n".join(reversed(recent)))
+        return "\n\n".join(sections)
+
+    @classmethod
+    async def record_exchange(cls, session_id: str | None, user_message: str, assistant_message: str) -> None:
+        session = cls._sessions.get(session_id) if session_id else None
+        if session is None:
+            return
+
+        async with session["lock"]:
+            session["turns"].append({"role": "user", "content": cls._clip(user_message)})
+            session["turns"].append({"role": "assistant", "content": cls._clip(assistant_message)})
+            session["updated_at"] = datetime.now(timezone.utc)
+            needs_compaction = not session["compacting"] and cls._needs_compaction(session)
+            if needs_compaction:
+                session["compacting"] = True
+
+        if needs_compaction:
+            task = asyncio.create_task(cls._compact(session))
+            cls._compaction_tasks.add(task)
+            task.add_done_callback(cls._compaction_tasks.discard)
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Cheap token estimate (about four characters per token for French and English)."""
+        if not text:
+            return 0
+        return len(text) // 4 + 1
+
+    @classmethod
+    def _needs_compaction(cls, session: dict, folded: int = 0) -> bool:
+        """Whether the window is still over its limits once its first `folded` turns are summarized."""
+        turns = session["turns"][folded:]
+        if len(turns) > cls.RECENT_TURNS:
+            return True
+        turns_tokens = sum(cls.estimate_tokens(turn["content"]) for turn in turns)
+        return turns_tokens + cls.estimate_tokens(session["summary"]) > cls.TOKEN_BUDGET
+
+    @classmethod
+    async def _compact(cls, session: dict) -> None:
+        try:
+            async with session["lock"]:
+                folded = 0
+                while cls._needs_compaction(session, folded) and len(session["turns"]) - folded > 2:
+                    # Fold whole exchanges so the window always starts with a student turn.
+                    folded += 2
+                if not folded:
+                    return
+                previous_summary = session["summary"]
+                rendered_turns = "\n".join(
+                    f"{cls.ROLE_LABELS[turn['role']]}: {turn['content']}" for turn in session["turns"][:folded]
+                )
+
+            # Summarized without the lock, so that the session's next message is not held up by the LLM
+            # call; meanwhile its context still shows the turns being folded. Turns are only appended
+            # and compactions do not overlap, so the first `folded` turns are unchanged afterwards.
+            try:
+                summary = await conversation_summarizer_agent.send_message(
+                    previous_summary=previous_summary,
+                    turns=rendered_turns,
+                    max_words=cls.SUMMARY_MAX_WORDS,
+                )
+            except Exception as exc:
+                # The folded turns are lost from the context rather than growing it without bound.
+                logger.warning("Conversation summary failed for session %s: %s", session["session_id"], exc)
+                summary = previous_summary
+
+            async with session["lock"]:
+                session["summary"] = summary
+                del session["turns"][:folded]
+                session["summarized_turns"] += folded
+        finally:
+            session["compacting"] = False
+
+    @classmethod
+    def _prune_sessions(cls, now: datetime) -> None:
+        expired = [
+            session_id
+            for session_id, session in cls._sessions.items()
+            if now - session["updated_at"] > cls.SESSION_TTL
+        ]
+        for session_id in expired:
+            del cls._sessions[session_id]
+
+        overflow = len(cls._sessions) - cls.MAX_SESSIONS + 1
+        if overflow > 0:
+            oldest = sorted(cls._sessions.values(), key=lambda session: session["updated_at"])[:overflow]
+            for session in oldest:
+                del cls._sessions[session["session_id"]]
+
+    @classmethod
+    def _clip(cls, text: str) -> str:
+        text = text.strip()
+        if len(text) <= cls.MAX_TURN_CHARS:
+            return text
+        return f"{text[: cls.MAX_TURN_CHARS]}..."
+
+    @classmethod
+    def _validate_session_id(cls, session_id: str):
+        if not session_id.strip() or len(session_id) > cls.MAX_SESSION_ID_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid session id",
+            )
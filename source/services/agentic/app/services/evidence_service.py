@@ -0,0 +1,188 @@
+import contextvars
+import os
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, ClassVar, Iterator
+
+from app.services.checkpoint_service import CheckpointService
+from app.services.tool_memo_service import ToolMemoService
+
+KIND_QUESTION = "question"
+KIND_WEB = "web"
+
+
+class _JobEvidence:
+    def __init__(self, job_id: str | None, snapshot: dict | None = None):
+        snapshot = snapshot or {}
+        self.job_id = job_id
+        # Keyed by "<kind>:<source>", so that a source seen several times is stored once.
+        self.items: dict[str, dict] = dict(snapshot.get("items", {}))
+        # Raw tool results by normalized call, reused by later attempts instead of refetching.
+        self.fetches: dict[str, Any] = dict(snapshot.get("fetches", {}))
+        self.counters: dict[str, int] = {"fetched": 0, "reused": 0, "duplicates": 0}
+        # Changed since the last flush into the checkpoint.
+        self.dirty = False
+
+    def snapshot(self) -> dict:
+        return {"items": self.items, "fetches": self.fetches}
+
+
+_current_store: contextvars.ContextVar[_JobEvidence | None] = contextvars.ContextVar("job_evidence", default=None)
+
+
+class EvidenceService:
+    """Structured evidence of a job: the knowledge base rows and web pages its tools returned.
+
+    Sub-agent tools fetch through `fetch`, which serves a call already made by an earlier attempt
+    of the same job from the store, and record what they found with `record`. The verifier then
+    checks the proposed answer against `digest`, a compact deduplicated listing of the sources, and
+    an orchestrator retrying after a rejection starts from it. The store is saved with the job
+    checkpoint once per stage (`flush`), so that a job resumed after a restart does not refetch either.
+    """
+
+    ENABLED = os.getenv("EVIDENCE_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+    DIGEST_MAX_CHARS = int(os.getenv("EVIDENCE_DIGEST_MAX_CHARS", "6000"))
+    SNIPPET_CHARS = int(os.getenv("EVIDENCE_SNIPPET_CHARS", "600"))
+    MAX_ITEM_CHARS = 4000
+
+    _stores: ClassVar[dict[str, _JobEvidence]] = {}
+    _counters: ClassVar[dict[str, int]] = {"jobs": 0, "items": 0, "fetched": 0, "reused": 0, "duplicates": 0}
+
+    @classmethod
+    @contextmanager
+    def job(cls, job_id: str | None) -> Iterator[None]:
+        """Collect the evidence of a job for the duration of the block, starting from its checkpoint.
+
+        A block without a job id nested in another one shares the enclosing store, so that a caller
+        can read the evidence of a pipeline run (see `sources`).
+        """
+        if not cls.ENABLED:
+            yield
+            return
+
+        # A job retried in this process keeps its store; one resumed after a restart reloads it.
+        store = cls._stores.get(job_id) if job_id is not None else _current_store.get()
+        if store is None:
+            checkpoint = CheckpointService.get(job_id)
+            store = _JobEvidence(job_id, checkpoint.get("evidence") if checkpoint is not None else None)
+            if job_id is not None:
+                cls._stores[job_id] = store
+            cls._counters["jobs"] += 1
+        token = _current_store.set(store)
+        try:
+            yield
+        finally:
+            _current_store.reset(token)
+
+    @classmethod
+    async def fetch(cls, tool_name: str, tool_args: dict, run: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of a tool call, from the job's store when an earlier attempt already made it."""
+        store = _current_store.get()
+        if store is None:
+            return await run()
+
+        key = ToolMemoService.call_key(tool_name, tool_args)
+        if key in store.fetches:
+            cls._count(store, "reused")
+            return store.fetches[key]
+
+        result = await run()
+        store.fetches[key] = result
+        store.dirty = True
+        cls._count(store, "fetched")
+        return result
+
+    @classmethod
+    def record(cls, kind: str, source: str, content: str, title: str | None = None) -> None:
+        """Add a source to the job's evidence; a longer content replaces a shorter one for the same source."""
+        store = _current_store.get()
+        if store is None or not source:
+            return
+
+        key = f"{kind}:{source}"
+        content = " ".join(str(content or "").split())[: cls.MAX_ITEM_CHARS]
+        existing = store.items.get(key)
+        if existing is not None:
+            cls._count(store, "duplicates")
+            if len(content) <= len(existing["content"]):
+                return
+        else:
+            cls._counters["items"] += 1
+        store.items[key] = {
+            "kind": kind,
+            "source": source,
+            "title": title or (existing or {}).get("title"),
+            "content": content,
+        }
+        store.dirty = True
+
+    @classmethod
+    def digest(cls) -> str | None:
+        """Sources of the current job, one line each and at most DIGEST_MAX_CHARS, or None without any."""
+        store = _current_store.get()
+        if store is None or not store.items:
+            return None
+
+        lines, size = [], 0
+        # Knowledge base rows first: they are the reference answers of the school.
+        for item in sorted(store.items.values(), key=lambda item: item["kind"] != KIND_QUESTION):
+            label = f"[{item['kind']} {item['source']}]"
+            title = f" {item['title']}:" if item["title"] else ""
+            snippet = item["content"][: cls.SNIPPET_CHARS]
+            if len(item["content"]) > cls.SNIPPET_CHARS:
+                snippet += "..."
+            line = f"- {label}{title} {snippet}".rstrip()
+            if size + len(line) > cls.DIGEST_MAX_CHARS:
+                lines.append(f"- ({len(store.items) - len(lines)} more sources omitted)")
+                break
+            lines.append(line)
+            size += len(line) + 1
+        return "\n".join(lines)
+
+    @classmethod
+    def sources(cls, kind: str) -> list[str]:
+        """Sources of one kind (e.g. the ids of the stored questions) recorded in the current store."""
+        store = _current_store.get()
+        if store is None:
+            return []
+        return [item["source"] for item in store.items.values() if item["kind"] == kind]
+
+    @classmethod
+    def flush(cls) -> None:
+        """Put the current job's evidence into its checkpoint, written with the stage being saved."""
+        store = _current_store.get()
+        if store is None or store.job_id is None or not store.dirty:
+            return
+        CheckpointService.save_evidence(store.job_id, store.snapshot())
+        store.dirty = False
+
+    @classmethod
+    def summary(cls, job_id: str) -> dict | None:
+        """Size and reuse of a job's evidence, exposed in the job status."""
+        store = cls._stores.get(job_id)
+        if store is None:
+            return None
+        kinds: dict[str, int] = {}
+        for item in store.items.values():
+            kinds[item["kind"]] = kinds.get(item["kind"], 0) + 1
+        return {
+            "items": len(store.items),
+            "kinds": kinds,
+            "chars": sum(len(item["content"]) for item in store.items.values()),
+            **store.counters,
+        }
+
+    @classmethod
+    def discard(cls, job_id: str) -> dict | None:
+        """Forget a finalized job's store and return its summary."""
+        summary = cls.summary(job_id)
+        cls._stores.pop(job_id, None)
+        return summary
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {"enabled": cls.ENABLED, "active_jobs": len(cls._stores), **cls._counters}
+
+    @classmethod
+    def _count(cls, store: _JobEvidence, counter: str) -> None:
+        store.counters[counter] += 1
+        cls._counters[counter] += 1
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, ClassVar, TypeVar
+
+T = TypeVar("T")
+
+
+class _OperationStats:
+    __slots__ = ("latencies", "requests", "hedged", "hedge_wins", "budget_denied")
+
+    def __init__(self, window: int):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    def hedge_delay_s(self, percentile: float, min_samples: int) -> float | None:
+        if len(self.latencies) < min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+class HedgingService:
+    """Hedged requests for idempotent calls (reformulator, verifier, embeddings, match_documents).
+
+    When a call has not returned after the observed p95 latency of its operation, a duplicate is
+    fired; the first successful response wins and the other call is cancelled. Hedges draw from a
+    global budget: every request earns BUDGET_RATIO of a hedge, capped at MAX_BURST, so duplicates
+    stay under that share of the traffic even when a dependency slows down across the board.
+    """
+
+    ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+    BUDGET_RATIO = float(os.getenv("HEDGING_BUDGET_PERCENT", "5")) / 100
+    PERCENTILE = float(os.getenv("HEDGING_PERCENTILE", "95")) / 100
+    MIN_SAMPLES = int(os.getenv("HEDGING_MIN_SAMPLES", "20"))
+    LATENCY_WINDOW = 500
+    MAX_BURST = 10.0
+
+    _operations: ClassVar[dict[str, _OperationStats]] = {}
+    _budget: ClassVar[float] = 0.0
+
+    @classmethod
+    async def call(cls, operation_name: str, operation: Callable[[], Awaitable[T]]) -> T:
+        stats = cls._operations.get(operation_name)
+        if stats is None:
+            stats = cls._operations[operation_name] = _OperationStats(cls.LATENCY_WINDOW)
+        stats.requests += 1
+        cls._budget = min(cls.MAX_BURST, cls._budget + cls.BUDGET_RATIO)
+
+        delay_s = stats.hedge_delay_s(cls.PERCENTILE, cls.MIN_SAMPLES) if cls.ENABLED else None
+        if delay_s is None:
+            started_at = time.perf_counter()
+            result = await operation()
+            stats.latencies.append(time.perf_counter() - started_at)
+            return result
+
+        started_at = time.perf_counter()
+        primary = asyncio.ensure_future(operation())
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay_s)
+            if not done and cls._budget < 1:
+                stats.budget_denied += 1
+                done, pending = await asyncio.wait(pending)
+            if done:
+                result = primary.result()
+                stats.latencies.append(time.perf_counter() - started_at)
+                return result
+
+            cls._budget -= 1
+            stats.hedged += 1
+            hedge_started_at = time.perf_counter()
+            hedge = asyncio.ensure_future(operation())
+            pending = {primary, hedge}
+            first_error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        first_error = first_error or task.exception()
+                        continue
+                    if task is hedge:
+                        stats.hedge_wins += 1
+                        stats.latencies.append(time.perf_counter() - hedge_started_at)
+                    else:
+                        stats.latencies.append(time.perf_counter() - started_at)
+                    return task.result()
+            raise first_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @classmethod
+    def stats(cls) -> dict:
+        operations = {}
+        for name, stats in cls._operations.items():
+            delay_s = stats.hedge_delay_s(cls.PERCENTILE, cls.MIN_SAMPLES)
+            operations[name] = {
+                "requests": stats.requests,
+                "hedged": stats.hedged,
+                "hedge_wins": stats.hedge_wins,
+                "hedge_win_rate": round(stats.hedge_wins / stats.hedged, 3) if stats.hedged else None,
+                "budget_denied": stats.budget_denied,
+                "hedge_delay_ms": round(delay_s * 1000) if delay_s is not None else None,
+            }
+        return {"enabled": cls.ENABLED, "budget_percent": cls.BUDGET_RATIO * 100, "operations": operations}
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._operations.clear()
+        cls._budget = 0.0
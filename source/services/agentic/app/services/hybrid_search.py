@@ -0,0 +1,150 @@
+"""Local lexical search, rank fusion and reranking used by the hybrid retriever.
+
+Everything here is pure Python so that it can run (and be benchmarked) without network access.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Hashable, Iterable, Sequence
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    """
+    a au aux avec ce ces cette comment dans de des du elle en est et il je la le les leur mais me mon ne nous
+    on ou par pas pour qu que quel quelle quelles quels qui sa se ses son sur ta te tes ton tu un une vos votre
+    vous y l d j c s n
+    an and are as at be by can do does for from how i in is it of on or the to what when where which who why
+    with you your my me
+    """.split()
+)
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def tokenize(text: str) -> list[str]:
+    """Accent-insensitive tokens. Compound codes such as "info-301" are kept along with their parts."""
+    tokens = []
+    for match in _TOKEN_PATTERN.findall(normalize(text)):
+        parts = re.split(r"[-_./]", match)
+        if len(parts) > 1:
+            tokens.append(match)
+        tokens.extend(part for part in parts if part and part not in STOPWORDS)
+    return tokens
+
+
+def has_digit(token: str) -> bool:
+    return any(char.isdigit() for char in token)
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring over Title (weighted) and Content."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_weight: int = 2):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._doc_ids: list[Hashable] = []
+        self._doc_lengths: list[int] = []
+        self._avg_length = 0.0
+        self._idf: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def build(self, documents: Iterable[tuple[Hashable, str, str]]) -> "BM25Index":
+        postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        for doc_id, title, content in documents:
+            doc_index = len(self._doc_ids)
+            terms = tokenize(title) * self.title_weight + tokenize(content)
+            self._doc_ids.append(doc_id)
+            self._doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings[term].append((doc_index, frequency))
+
+        self._postings = dict(postings)
+        count = len(self._doc_ids)
+        self._avg_length = (sum(self._doc_lengths) / count) if count else 0.0
+        self._idf = {
+            term: math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            for term, entries in self._postings.items()
+        }
+        return self
+
+    def search(self, query: str, limit: int) -> list[tuple[Hashable, float]]:
+        if not self._doc_ids:
+            return []
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            entries = self._postings.get(term)
+            if not entries:
+                continue
+            idf = self._idf[term]
+            for doc_index, frequency in entries:
+                length_norm = 1 - self.b + self.b * self._doc_lengths[doc_index] / (self._avg_length or 1.0)
+                scores[doc_index] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self._doc_ids[doc_index], score) for doc_index, score in ranked]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Hashable]],
+    k: int = 60,
+    weights: Sequence[float] | None = None,
+) -> list[tuple[Hashable, float]]:
+    """Fuse ranked id lists: score(d) = sum(weight / (k + rank)) over the lists containing d."""
+    scores: dict[Hashable, float] = defaultdict(float)
+    for list_index, ranking in enumerate(rankings):
+        weight = weights[list_index] if weights else 1.0
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def rerank(
+    query: str,
+    fused: Sequence[tuple[Hashable, float]],
+    documents: dict[Hashable, tuple[str, str]],
+) -> list[tuple[Hashable, float]]:
+    """Cheap local rerank: fused score blended with query-term coverage and exact code matches."""
+    query_terms = set(tokenize(query))
+    if not fused or not query_terms:
+        return list(fused)
+
+    code_terms = {term for term in query_terms if has_digit(term)}
+    top_score = fused[0][1] or 1.0
+    rescored = []
+    for doc_id, fused_score in fused:
+        title, content = documents.get(doc_id, ("", ""))
+        title_terms = set(tokenize(title))
+        content_terms = set(tokenize(content))
+        title_coverage = len(query_terms & title_terms) / len(query_terms)
+        content_coverage = len(query_terms & content_terms) / len(query_terms)
+        code_match = 1.0 if code_terms and code_terms <= (title_terms | content_terms) else 0.0
+        score = 0.5 * fused_score / top_score + 0.3 * title_coverage + 0.1 * content_coverage + 0.1 * code_match
+        rescored.append((doc_id, score))
+    return sorted(rescored, key=lambda item: item[1], reverse=True)
+
+
+def rerank_multi(
+    queries: Sequence[str],
+    fused: Sequence[tuple[Hashable, float]],
+    documents: dict[Hashable, tuple[str, str]],
+) -> list[tuple[Hashable, float]]:
+    """`rerank` for several variants of a query (e.g. French and English): each document keeps its best score.
+
+    Scoring against the variant a document matches best keeps a French title from losing coverage
+    for the terms of the English variant.
+    """
+    best: dict[Hashable, float] = {}
+    for query in queries:
+        for doc_id, score in rerank(query, fused, documents):
+            best[doc_id] = max(score, best.get(doc_id, score))
+    return sorted(best.items(), key=lambda item: item[1], reverse=True)
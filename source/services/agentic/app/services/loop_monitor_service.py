@@ -0,0 +1,184 @@
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import ClassVar, Iterator
+
+logger = logging.getLogger(__name__)
+
+_current_job_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("loop_monitor_job", default=None)
+_current_agent: contextvars.ContextVar[str | None] = contextvars.ContextVar("loop_monitor_agent", default=None)
+
+
+class LoopMonitorService:
+    """Continuous event-loop lag measurement and reports of the callbacks that block the loop.
+
+    A task sleeps INTERVAL_MS at a time and records how late it wakes up: the event-loop lag every
+    job and status poll pays. A watchdog thread checks that this task keeps waking up; once it has
+    been silent for SLOW_CALLBACK_MS past its interval, something is running on the loop without
+    yielding, and the watchdog captures the loop thread's stack at that moment, i.e. the blocking
+    code itself, with the job and agent of the task being run. The report is completed with the
+    measured stall when the loop recovers, logged as a warning, and kept among the last MAX_REPORTS.
+    """
+
+    ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+    INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50"))
+    SLOW_CALLBACK_MS = float(os.getenv("LOOP_SLOW_CALLBACK_MS", "100"))
+    LAG_WINDOW = 2000
+    MAX_REPORTS = 20
+    MAX_STACK_DEPTH = 15
+
+    _lags: ClassVar[deque[float]] = deque(maxlen=LAG_WINDOW)
+    _reports: ClassVar[deque[dict]] = deque(maxlen=MAX_REPORTS)
+    _counters: ClassVar[dict[str, int]] = {"samples": 0, "slow_callbacks": 0}
+    _max_lag_s: ClassVar[float] = 0.0
+    _task: ClassVar[asyncio.Task | None] = None
+    _stop_event: ClassVar[threading.Event | None] = None
+    _loop: ClassVar[asyncio.AbstractEventLoop | None] = None
+    _loop_thread_id: ClassVar[int | None] = None
+    _heartbeat: ClassVar[float] = 0.0
+    _pending_report: ClassVar[dict | None] = None
+
+    @classmethod
+    def start(cls) -> None:
+        """Start monitoring the running event loop."""
+        if not cls.ENABLED or (cls._task is not None and not cls._task.done()):
+            return
+        cls._loop = asyncio.get_running_loop()
+        cls._loop_thread_id = threading.get_ident()
+        cls._heartbeat = time.monotonic()
+        cls._stop_event = threading.Event()
+        cls._task = asyncio.create_task(cls._measure_lag())
+        threading.Thread(target=cls._watch, args=(cls._stop_event,), name="loop-watchdog", daemon=True).start()
+
+    @classmethod
+    async def stop(cls) -> None:
+        if cls._stop_event is not None:
+            cls._stop_event.set()
+        task, cls._task = cls._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    @classmethod
+    @contextmanager
+    def job(cls, job_id: str | None) -> Iterator[None]:
+        """Attribute the callbacks run for the block to `job_id` in slow-callback reports."""
+        token = _current_job_id.set(job_id)
+        try:
+            yield
+        finally:
+            _current_job_id.reset(token)
+
+    @classmethod
+    @contextmanager
+    def agent(cls, agent_name: str) -> Iterator[None]:
+        token = _current_agent.set(agent_name)
+        try:
+            yield
+        finally:
+            _current_agent.reset(token)
+
+    @classmethod
+    def stats(cls) -> dict:
+        ordered = sorted(cls._lags)
+
+        def percentile_ms(share: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * share))] * 1000, 1)
+
+        return {
+            "enabled": cls.ENABLED,
+            "interval_ms": cls.INTERVAL_MS,
+            "slow_callback_ms": cls.SLOW_CALLBACK_MS,
+            **cls._counters,
+            "lag_p50_ms": percentile_ms(0.5),
+            "lag_p95_ms": percentile_ms(0.95),
+            "lag_p99_ms": percentile_ms(0.99),
+            "lag_max_ms": round(cls._max_lag_s * 1000, 1),
+            "recent_slow_callbacks": list(cls._reports),
+        }
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._lags.clear()
+        cls._reports.clear()
+        cls._counters = {"samples": 0, "slow_callbacks": 0}
+        cls._max_lag_s = 0.0
+
+    @classmethod
+    async def _measure_lag(cls) -> None:
+        loop = asyncio.get_running_loop()
+        interval_s = cls.INTERVAL_MS / 1000
+        while True:
+            expected_at = loop.time() + interval_s
+            await asyncio.sleep(interval_s)
+            lag_s = max(loop.time() - expected_at, 0.0)
+            cls._heartbeat = time.monotonic()
+            cls._lags.append(lag_s)
+            cls._counters["samples"] += 1
+            cls._max_lag_s = max(cls._max_lag_s, lag_s)
+
+            report, cls._pending_report = cls._pending_report, None
+            if report is not None:
+                report["blocked_ms"] = round(lag_s * 1000, 1)
+                logger.warning(
+                    "Event loop blocked for %s ms (job %s, agent %s, task %s):\n%s",
+                    report["blocked_ms"],
+                    report["job_id"],
+                    report["agent"],
+                    report["task"],
+                    "\n".join(report["stack"]),
+                )
+
+    @classmethod
+    def _watch(cls, stop_event: threading.Event) -> None:
+        stall_after_s = (cls.INTERVAL_MS + cls.SLOW_CALLBACK_MS) / 1000
+        reported_heartbeat = None
+        while not stop_event.wait(max(cls.SLOW_CALLBACK_MS / 4000, 0.005)):
+            heartbeat = cls._heartbeat
+            if heartbeat == reported_heartbeat or time.monotonic() - heartbeat < stall_after_s:
+                continue
+            # One report per stall: the heartbeat changes once the loop runs again.
+            reported_heartbeat = heartbeat
+            cls._report_stall()
+
+    @classmethod
+    def _report_stall(cls) -> None:
+        frame = sys._current_frames().get(cls._loop_thread_id)
+        if frame is None:
+            return
+        stack = [
+            f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}"
+            for entry in traceback.extract_stack(frame)[-cls.MAX_STACK_DEPTH :]
+        ]
+
+        task = asyncio.current_task(cls._loop)
+        job_id = agent = None
+        # Task.get_context() (Python 3.12+) exposes the contextvars of the task being run.
+        context = task.get_context() if task is not None and hasattr(task, "get_context") else None
+        if context is not None:
+            job_id, agent = context.get(_current_job_id), context.get(_current_agent)
+
+        report = {
+            "detected_at": datetime.now(timezone.utc).isoformat(),
+            "blocked_ms": None,
+            "job_id": job_id,
+            "agent": agent,
+            "task": task.get_name() if task is not None else None,
+            "stack": stack,
+        }
+        cls._counters["slow_callbacks"] += 1
+        cls._reports.append(report)
+        cls._pending_report = report
@@ -1,14 +1,38 @@
 import asyncio
+import logging
+import time
 from datetime import datetime, timezone
-from typing import ClassVar
+from typing import Any, Awaitable, Callable, ClassVar
 from uuid import uuid4
 
 from app.agents.answer_verifier_agent import answer_verifier_agent
+from app.agents.basic_agent import basic_agent
 from app.agents.orchestrator_agent import orchestrator_agent
 from app.agents.query_reformulator_agent import query_reformulator_agent
+from app.services.answer_store_service import AnswerStoreService
+from app.services.cassette_service import CassetteService
+from app.services.checkpoint_service import (
+    STAGE_FAST,
+    STAGE_ORCHESTRATOR,
+    STAGE_REFORMULATION,
+    STAGE_VERDICT,
+    CheckpointService,
+)
+from app.services.conversation_service import ConversationService
+from app.services.evidence_service import EvidenceService
+from app.services.loop_monitor_service import LoopMonitorService
+from app.services.model_routing_service import ModelRoutingService
+from app.services.pipeline_mode_service import MODE_AUTO, MODE_FAST, MODE_FULL, PipelineModeService
+from app.services.pre_verification_service import PreVerificationService
+from app.services.prefetch_service import PrefetchService
+from app.services.profiling_service import ProfilingService
+from app.services.resilience_service import DependencyUnavailableError
+from app.services.streaming_service import StreamingService
+from app.services.tracing_service import TracingService, traced
 
 from fastapi import HTTPException, status
-from langfuse.decorators import langfuse_context, observe
+
+logger = logging.getLogger(__name__)
 
 
 class MessagesService:
@@ -17,6 +41,7 @@ class MessagesService:
         "Je n'ai pas pu vérifier une réponse fiable pour le moment. "
         "Merci de contacter la scolarité à scolarite@esilv.com."
     )
+    UNAVAILABLE_MESSAGE = "Un service externe est momentanément indisponible. Merci de réessayer dans quelques instants."
 
     JOB_STATUS_QUEUED = "queued"
     JOB_STATUS_PROCESSING = "processing"
@@ -30,8 +55,8 @@ class MessagesService:
     _worker_task: ClassVar[asyncio.Task | None] = None
 
     @classmethod
-    async def enqueue_message(cls, user_message: str) -> str:
-        cls._validate_message(user_message)
+    async def enqueue_message(cls, user_message: str, session_id: str | None = None, mode: str | None = None) -> str:
+        cls.validate_message(user_message)
         job_id = str(uuid4())
         timestamp = datetime.now(timezone.utc)
         sanitized_message = user_message.strip()
@@ -39,22 +64,78 @@ class MessagesService:
         job_record = {
             "job_id": job_id,
             "user_message": sanitized_message,
+            "session_id": session_id,
+            "mode": PipelineModeService.resolve(mode),
             "status": cls.JOB_STATUS_QUEUED,
             "created_at": timestamp,
             "started_at": None,
             "finished_at": None,
             "message": None,
             "error": None,
+            "checkpoint": None,
+            "evidence": None,
         }
 
+        AnswerStoreService.record_question(sanitized_message)
+        # Stored answers are context-free: only serve them outside a conversation in progress.
+        history = await ConversationService.build_context(session_id)
+        stored_payload = AnswerStoreService.lookup(sanitized_message) if history is None else None
+
         async with cls._job_lock:
             cls._jobs[job_id] = job_record
+        StreamingService.open(job_id)
+
+        if stored_payload is not None:
+            await cls._complete_from_store(job_id, sanitized_message, session_id, stored_payload)
+            return job_id
 
+        CheckpointService.create(job_record)
         await cls._ensure_worker()
         assert cls._queue is not None
         await cls._queue.put(job_id)
         return job_id
 
+    @classmethod
+    async def resume_checkpointed_jobs(cls) -> int:
+        """Re-queue the jobs a previous process left unfinished; they resume from their checkpoint."""
+        checkpoints = CheckpointService.restore()
+        for checkpoint in checkpoints:
+            job_id = checkpoint["job_id"]
+            async with cls._job_lock:
+                cls._jobs[job_id] = {
+                    "job_id": job_id,
+                    "user_message": checkpoint["user_message"],
+                    "session_id": checkpoint["session_id"],
+                    "mode": PipelineModeService.resolve(checkpoint.get("mode")),
+                    "status": cls.JOB_STATUS_QUEUED,
+                    "created_at": datetime.fromisoformat(checkpoint["created_at"]),
+                    "started_at": None,
+                    "finished_at": None,
+                    "message": None,
+                    "error": None,
+                    "checkpoint": None,
+                    "evidence": None,
+                }
+            StreamingService.open(job_id)
+            await cls._ensure_worker()
+            assert cls._queue is not None
+            await cls._queue.put(job_id)
+        return len(checkpoints)
+
+    @classmethod
+    async def _complete_from_store(cls, job_id: str, user_message: str, session_id: str | None, payload: dict) -> None:
+        await ConversationService.record_exchange(session_id, user_message, payload["message"])
+        completed_at = datetime.now(timezone.utc)
+        payload.update({"created_at": completed_at, "cached": True, "stages": {}, "time_to_first_token_ms": None})
+        await cls._finalize_job(
+            job_id,
+            status=cls.JOB_STATUS_COMPLETED,
+            finished_at=completed_at,
+            message=payload,
+            error=None,
+        )
+        await StreamingService.close(job_id, {"type": "final", "message": payload})
+
     @classmethod
     async def get_job(cls, job_id: str) -> dict | None:
         async with cls._job_lock:
@@ -82,13 +163,27 @@ class MessagesService:
         while True:
             job_id = await cls._queue.get()
             try:
-                user_message = await cls._mark_job_processing(job_id)
-                if user_message is None:
+                job = await cls._mark_job_processing(job_id)
+                if job is None:
                     continue
+                await StreamingService.publish(job_id, {"type": "status", "status": cls.JOB_STATUS_PROCESSING})
 
-                payload = await cls._run_multi_agent(user_message)
+                user_message = job["user_message"]
+                session_id = job["session_id"]
+                checkpoint = CheckpointService.get(job_id)
+                if checkpoint is not None and checkpoint["history_saved"]:
+                    # A resumed job keeps the history its first run was answered with.
+                    history = checkpoint["history"]
+                else:
+                    history = await ConversationService.build_context(session_id)
+                    CheckpointService.save_history(job_id, history)
+                payload = await cls.answer_question(
+                    user_message, history, job_id=job_id, trace_id=job_id, session_id=session_id, mode=job["mode"]
+                )
+                await ConversationService.record_exchange(session_id, user_message, payload["message"])
                 completed_at = datetime.now(timezone.utc)
                 payload["created_at"] = completed_at
+                payload["time_to_first_token_ms"] = StreamingService.time_to_first_token_ms(job_id)
                 await cls._finalize_job(
                     job_id,
                     status=cls.JOB_STATUS_COMPLETED,
@@ -96,7 +191,10 @@ class MessagesService:
                     message=payload,
                     error=None,
                 )
+                CheckpointService.discard(job_id)
+                await StreamingService.close(job_id, {"type": "final", "message": payload})
             except asyncio.CancelledError:
+                # The checkpoint is kept: a restarted process resumes the job.
                 await cls._finalize_job(
                     job_id,
                     status=cls.JOB_STATUS_ERROR,
@@ -104,8 +202,24 @@ class MessagesService:
                     message=None,
                     error="Le traitement a été interrompu.",
                 )
+                await StreamingService.close(job_id, {"type": "error", "error": "Le traitement a été interrompu."})
                 raise
+            except DependencyUnavailableError as exc:
+                logger.error("Job %s failed fast: %s", job_id, exc)
+                await cls._finalize_job(
+                    job_id,
+                    status=cls.JOB_STATUS_ERROR,
+                    finished_at=datetime.now(timezone.utc),
+                    message=None,
+                    error=cls.UNAVAILABLE_MESSAGE,
+                )
+                CheckpointService.discard(job_id)
+                await StreamingService.close(job_id, {"type": "error", "error": cls.UNAVAILABLE_MESSAGE})
             except Exception as exc:
+                if CheckpointService.record_retry(job_id):
+                    logger.warning("Job %s failed, retrying from its last checkpoint: %s", job_id, exc)
+                    await cls._requeue_job(job_id)
+                    continue
                 await cls._finalize_job(
                     job_id,
                     status=cls.JOB_STATUS_ERROR,
@@ -113,18 +227,61 @@ class MessagesService:
                     message=None,
                     error=str(exc),
                 )
+                CheckpointService.discard(job_id)
+                await StreamingService.close(job_id, {"type": "error", "error": str(exc)})
             finally:
                 cls._queue.task_done()
 
     @classmethod
-    async def _mark_job_processing(cls, job_id: str) -> str | None:
+    async def answer_question(
+        cls,
+        question: str,
+        history: str | None = None,
+        *,
+        job_id: str | None = None,
+        trace_name: str = "Chat",
+        trace_id: str | None = None,
+        session_id: str | None = None,
+        mode: str | None = None,
+    ) -> dict:
+        """Run the pipeline of `mode` (PIPELINE_MODE by default) for one question under its own trace."""
+        with TracingService.trace(
+            trace_name,
+            input=question,
+            trace_id=trace_id,
+            user_id="Random User",
+            session_id=session_id or "Random Thread",
+        ), CassetteService.use(trace_id, question), ProfilingService.job(job_id or trace_id):
+            with LoopMonitorService.job(job_id or trace_id):
+                return await cls._run_pipeline(question, history, job_id, PipelineModeService.resolve(mode))
+
+    @classmethod
+    async def wait_until_idle(cls) -> None:
+        """Wait until every queued interactive message has been processed."""
+        await cls._ensure_worker()
+        assert cls._queue is not None
+        await cls._queue.join()
+
+    @classmethod
+    async def _mark_job_processing(cls, job_id: str) -> dict | None:
         async with cls._job_lock:
             job = cls._jobs.get(job_id)
             if not job:
                 return None
             job["status"] = cls.JOB_STATUS_PROCESSING
             job["started_at"] = datetime.now(timezone.utc)
-            return job["user_message"]
+            return job.copy()
+
+    @classmethod
+    async def _requeue_job(cls, job_id: str) -> None:
+        async with cls._job_lock:
+            job = cls._jobs.get(job_id)
+            if job is None:
+                return
+            job["status"] = cls.JOB_STATUS_QUEUED
+        await StreamingService.publish(job_id, {"type": "status", "status": cls.JOB_STATUS_QUEUED})
+        assert cls._queue is not None
+        cls._queue.put_nowait(job_id)
 
     @classmethod
     async def _finalize_job(
@@ -146,51 +303,148 @@ class MessagesService:
                     "finished_at": finished_at,
                     "message": message,
                     "error": error,
+                    "checkpoint": CheckpointService.summary(job_id),
+                    "evidence": EvidenceService.discard(job_id),
                 }
             )
 
     @staticmethod
     def _public_job_snapshot(job: dict) -> dict:
         snapshot = job.copy()
+        snapshot["checkpoint"] = CheckpointService.summary(job["job_id"]) or job.get("checkpoint")
+        snapshot["evidence"] = EvidenceService.summary(job["job_id"]) or job.get("evidence")
         snapshot.pop("user_message", None)
         snapshot.pop("started_at", None)
         return snapshot
 
     @classmethod
-    @observe(as_type="generation")
-    async def _run_multi_agent(cls, original_question: str) -> dict:
-        langfuse_context.update_current_observation(name="Method: Multi-Agent Message")
-        langfuse_context.update_current_trace(
-            name="Chat",
-            input=original_question,
-            user_id="Random User",
-            session_id="Random Thread",
+    async def _run_pipeline(cls, question: str, history: str | None, job_id: str | None, mode: str) -> dict:
+        started_at = time.perf_counter()
+        with ModelRoutingService.track_job() as stages, EvidenceService.job(job_id):
+            if mode == MODE_FULL:
+                payload = await cls._run_multi_agent(question, history, job_id)
+            else:
+                payload = await cls._run_fast(question, history, job_id, escalate=mode == MODE_AUTO)
+        payload["stages"] = stages
+        PipelineModeService.record(mode, time.perf_counter() - started_at, payload)
+        return payload
+
+    @classmethod
+    @traced("Method: Multi-Agent Message")
+    async def _run_multi_agent(
+        cls,
+        original_question: str,
+        history: str | None = None,
+        job_id: str | None = None,
+    ) -> dict:
+        # Retrieval starts on the raw question while the reformulator runs.
+        async with PrefetchService.prefetch(original_question):
+            payload = await cls._run_attempts(original_question, history, job_id)
+        payload.update(mode=MODE_FULL, escalated=False)
+        return payload
+
+    @classmethod
+    @traced("Method: Fast Message")
+    async def _run_fast(cls, question: str, history: str | None, job_id: str | None, escalate: bool) -> dict:
+        """Answer with the single BasicAgent loop; with `escalate`, fall back to the full pipeline on rejection.
+
+        The fast answer is checkpointed as attempt 0, ahead of the attempts of the full pipeline.
+        """
+        with ModelRoutingService.use_tier(ModelRoutingService.choose_tier(question, 1)):
+            fast_stage = await cls._run_stage(
+                job_id,
+                0,
+                STAGE_FAST,
+                lambda: cls._answer_fast(question, history, job_id),
+                on_resume=cls._restream_answer(job_id, 0),
+            )
+            answer = fast_stage["answer"]
+            if not escalate:
+                return {
+                    "message": answer,
+                    "status": "unverified",
+                    "attempts": 1,
+                    "reformulated_query": None,
+                    "verifier_feedback": None,
+                    "mode": MODE_FAST,
+                    "escalated": False,
+                }
+
+            verdict = await cls._run_stage(
+                job_id, 0, STAGE_VERDICT, lambda: cls._verify_answer(question, question, answer, history)
+            )
+
+        if verdict.get("status") == "approved":
+            final_answer = verdict.get("final_answer") or answer
+            TracingService.update_trace(output=final_answer)
+            return {
+                "message": final_answer,
+                "status": "approved",
+                "attempts": 1,
+                "reformulated_query": None,
+                "verifier_feedback": verdict.get("feedback"),
+                "mode": MODE_FAST,
+                "escalated": False,
+            }
+
+        if job_id:
+            await StreamingService.publish(job_id, {"type": "reset", "attempt": 0})
+        # The full pipeline starts from the evidence the fast answer gathered.
+        payload = await cls._run_multi_agent(question, history, job_id)
+        payload["escalated"] = True
+        return payload
+
+    @classmethod
+    async def _answer_fast(cls, question: str, history: str | None, job_id: str | None) -> dict:
+        answer = await basic_agent.send_message(
+            question,
+            history=history,
+            on_token=StreamingService.token_callback(job_id, 0) if job_id else None,
         )
+        return {"answer": answer}
 
+    @classmethod
+    async def _run_attempts(cls, original_question: str, history: str | None, job_id: str | None) -> dict:
         last_feedback: str | None = None
         last_reformulation: str | None = None
 
         for attempt in range(1, cls.MAX_VERIFICATION_ATTEMPTS + 1):
-            reformulated_query = await query_reformulator_agent.send_message(original_question)
-            last_reformulation = reformulated_query
+            # Retries after a verifier rejection always escalate to the large tier.
+            with ModelRoutingService.use_tier(ModelRoutingService.choose_tier(original_question, attempt)):
+                reformulated_query = await cls._run_stage(
+                    job_id,
+                    attempt,
+                    STAGE_REFORMULATION,
+                    lambda: query_reformulator_agent.send_message(original_question, history=history),
+                )
+                last_reformulation = reformulated_query
 
-            orchestrator_response = await orchestrator_agent.send_message(
-                original_question=original_question,
-                reformulated_query=reformulated_query,
-            )
+                orchestrator_stage = await cls._run_stage(
+                    job_id,
+                    attempt,
+                    STAGE_ORCHESTRATOR,
+                    lambda: cls._orchestrate(
+                        original_question, reformulated_query, history, last_feedback, job_id, attempt
+                    ),
+                    on_resume=cls._restream_answer(job_id, attempt),
+                )
+                orchestrator_response = orchestrator_stage["answer"]
 
-            verdict = await answer_verifier_agent.send_message(
-                original_query=original_question,
-                reformulated_query=reformulated_query,
-                proposed_answer=orchestrator_response,
-            )
+                verdict = await cls._run_stage(
+                    job_id,
+                    attempt,
+                    STAGE_VERDICT,
+                    lambda: cls._verify_answer(
+                        original_question, reformulated_query, orchestrator_response, history
+                    ),
+                )
 
             verdict_status = verdict.get("status")
             last_feedback = verdict.get("feedback")
 
             if verdict_status == "approved":
                 final_answer = verdict.get("final_answer") or orchestrator_response
-                langfuse_context.update_current_trace(output=final_answer)
+                TracingService.update_trace(output=final_answer)
                 return {
                     "message": final_answer,
                     "status": "approved",
@@ -199,7 +453,12 @@ class MessagesService:
                     "verifier_feedback": last_feedback,
                 }
 
-        langfuse_context.update_current_trace(output=cls.FALLBACK_MESSAGE)
+            if job_id:
+                # The streamed provisional answer was rejected; the next attempt streams a new one.
+                await StreamingService.publish(job_id, {"type": "reset", "attempt": attempt})
+
+        TracingService.update_trace(output=cls.FALLBACK_MESSAGE)
+        TracingService.mark_fallback()
         return {
             "message": cls.FALLBACK_MESSAGE,
             "status": "fallback",
@@ -208,8 +467,78 @@ class MessagesService:
             "verifier_feedback": last_feedback,
         }
 
+    @classmethod
+    async def _run_stage(
+        cls,
+        job_id: str | None,
+        attempt: int,
+        stage: str,
+        run: Callable[[], Awaitable[Any]],
+        on_resume: Callable[[Any], Awaitable[None]] | None = None,
+    ) -> Any:
+        """Return the checkpointed result of a stage, or run it and checkpoint its result."""
+        result = CheckpointService.stage(job_id, attempt, stage)
+        if result is not None:
+            if on_resume is not None:
+                await on_resume(result)
+            return result
+        result = await run()
+        # A single checkpoint write per stage, carrying the evidence the stage gathered.
+        EvidenceService.flush()
+        CheckpointService.save_stage(job_id, attempt, stage, result)
+        return result
+
+    @classmethod
+    async def _orchestrate(
+        cls,
+        original_question: str,
+        reformulated_query: str,
+        history: str | None,
+        feedback: str | None,
+        job_id: str | None,
+        attempt: int,
+    ) -> dict:
+        answer = await orchestrator_agent.send_message(
+            original_question=original_question,
+            reformulated_query=reformulated_query,
+            history=history,
+            feedback=feedback,
+            evidence=EvidenceService.digest(),
+            on_token=StreamingService.token_callback(job_id, attempt) if job_id else None,
+        )
+        return {"answer": answer}
+
+    @staticmethod
+    def _restream_answer(job_id: str | None, attempt: int) -> Callable[[dict], Awaitable[None]] | None:
+        """Publish a checkpointed orchestrator answer as the provisional answer of a resumed job."""
+        if job_id is None:
+            return None
+
+        async def restream(stage_result: dict) -> None:
+            await StreamingService.token_callback(job_id, attempt)(stage_result["answer"])
+
+        return restream
+
+    @classmethod
+    async def _verify_answer(
+        cls, original_question: str, reformulated_query: str, proposed_answer: str, history: str | None = None
+    ) -> dict:
+        """Run the deterministic pre-checks, and the LLM verifier only when they are inconclusive."""
+        pre_verdict = PreVerificationService.check(original_question, proposed_answer, history)
+        if not PreVerificationService.should_call_llm(pre_verdict):
+            if pre_verdict["status"] == "reject":
+                return {"status": "revise", "final_answer": "", "feedback": pre_verdict["feedback"]}
+            return {"status": "approved", "final_answer": proposed_answer, "feedback": None}
+
+        return await answer_verifier_agent.send_message(
+            original_query=original_question,
+            reformulated_query=reformulated_query,
+            proposed_answer=proposed_answer,
+            evidence=EvidenceService.digest(),
+        )
+
     @staticmethod
-    def _validate_message(user_message: str):
+    def validate_message(user_message: str):
         if len(user_message) > 500:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
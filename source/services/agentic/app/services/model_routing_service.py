@@ -0,0 +1,151 @@
+import contextvars
+import os
+import re
+from contextlib import contextmanager
+from typing import ClassVar, Iterator
+
+from app.settings import TIER_LARGE, TIER_SMALL, ModelConfig, get_settings
+
+_current_tier: contextvars.ContextVar[str | None] = contextvars.ContextVar("model_tier", default=None)
+_job_usage: contextvars.ContextVar[dict | None] = contextvars.ContextVar("model_job_usage", default=None)
+
+
+class ModelRoutingService:
+    """Per-agent model settings and the small/large tier router.
+
+    The model settings of every agent and tier are parsed once with the other settings (see
+    `app.settings.Settings`), so a reload applies them too. Agents without a fixed tier follow the
+    tier chosen for the current job attempt by `choose_tier`.
+    """
+
+    ROUTER_ENABLED = os.getenv("MODEL_ROUTER_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+    SIMPLE_QUESTION_MAX_CHARS = int(os.getenv("MODEL_ROUTER_SIMPLE_MAX_CHARS", "120"))
+
+    _COMPLEXITY_MARKERS = re.compile(
+        r"\b(?:compare|comparer|difference|différence|versus|vs|pourquoi|why|explain|expliquer|et aussi|also)\b",
+        re.IGNORECASE,
+    )
+
+    # Keyed by (tier, model): both tiers may share a model, e.g. when OPENAI_SMALL_MODEL is unset.
+    _stats: ClassVar[dict[tuple[str, str], dict]] = {}
+
+    @classmethod
+    def config_for(cls, agent_name: str, fixed_tier: str | None = None) -> ModelConfig:
+        tier = fixed_tier or _current_tier.get() or TIER_LARGE
+        return get_settings().model_configs[agent_name][tier]
+
+    @classmethod
+    def choose_tier(cls, question: str, attempt: int) -> str:
+        """Small tier for short, single-part questions on the first attempt; large tier otherwise."""
+        if not cls.ROUTER_ENABLED or attempt > 1:
+            return TIER_LARGE
+        is_simple = (
+            len(question) <= cls.SIMPLE_QUESTION_MAX_CHARS
+            and question.count("?") <= 1
+            and not cls._COMPLEXITY_MARKERS.search(question)
+        )
+        return TIER_SMALL if is_simple else TIER_LARGE
+
+    @classmethod
+    @contextmanager
+    def use_tier(cls, tier: str) -> Iterator[None]:
+        token = _current_tier.set(tier)
+        try:
+            yield
+        finally:
+            _current_tier.reset(token)
+
+    @classmethod
+    @contextmanager
+    def track_job(cls) -> Iterator[dict]:
+        """Collect, per agent stage and tier, which model served it with its latency and token usage."""
+        usage: dict[str, dict] = {}
+        token = _job_usage.set(usage)
+        try:
+            yield usage
+        finally:
+            _job_usage.reset(token)
+
+    @classmethod
+    def record_call(cls, agent_name: str, config: ModelConfig, latency_s: float, usage_metadata: dict | None) -> None:
+        usage_metadata = usage_metadata or {}
+        input_tokens = usage_metadata.get("input_tokens") or 0
+        output_tokens = usage_metadata.get("output_tokens") or 0
+        # Prompt tokens served from the provider's prefix cache.
+        cached_tokens = (usage_metadata.get("input_token_details") or {}).get("cache_read") or 0
+
+        model_stats = cls._stats.setdefault(
+            (config.tier, config.model),
+            {
+                "model": config.model,
+                "tier": config.tier,
+                "calls": 0,
+                "latency_s": 0.0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cached_tokens": 0,
+                "cache_hit_calls": 0,
+                "cache_hit_latency_s": 0.0,
+            },
+        )
+        model_stats["calls"] += 1
+        model_stats["latency_s"] += latency_s
+        model_stats["input_tokens"] += input_tokens
+        model_stats["output_tokens"] += output_tokens
+        model_stats["cached_tokens"] += cached_tokens
+        if cached_tokens:
+            model_stats["cache_hit_calls"] += 1
+            model_stats["cache_hit_latency_s"] += latency_s
+
+        job_usage = _job_usage.get()
+        if job_usage is None:
+            return
+        # Keyed by stage and tier so that an escalated retry shows up next to the first attempt.
+        stage = job_usage.setdefault(
+            f"{agent_name}.{config.tier}",
+            {
+                "model": config.model,
+                "tier": config.tier,
+                "calls": 0,
+                "latency_ms": 0,
+                "input_tokens": 0,
+                "cached_tokens": 0,
+                "output_tokens": 0,
+            },
+        )
+        stage["calls"] += 1
+        stage["latency_ms"] += round(latency_s * 1000)
+        stage["input_tokens"] += input_tokens
+        stage["cached_tokens"] += cached_tokens
+        stage["output_tokens"] += output_tokens
+
+    @classmethod
+    def stats(cls) -> dict:
+        tier_models = get_settings().tier_models
+        return {
+            "router_enabled": cls.ROUTER_ENABLED,
+            "small_model": tier_models[TIER_SMALL],
+            "large_model": tier_models[TIER_LARGE],
+            "models": {
+                f"{tier}:{model}": cls._model_stats(values)
+                for (tier, model), values in cls._stats.items()
+                if values["calls"]
+            },
+        }
+
+    @staticmethod
+    def _model_stats(values: dict) -> dict:
+        """Totals of a model in a tier, with the share of cached prompt tokens and the latency with and without cache hits."""
+        miss_calls = values["calls"] - values["cache_hit_calls"]
+        miss_latency_s = values["latency_s"] - values["cache_hit_latency_s"]
+        return {
+            **values,
+            "avg_latency_s": round(values["latency_s"] / values["calls"], 3),
+            "cached_token_ratio": round(values["cached_tokens"] / values["input_tokens"], 3)
+            if values["input_tokens"]
+            else 0.0,
+            "avg_latency_cache_hit_s": round(values["cache_hit_latency_s"] / values["cache_hit_calls"], 3)
+            if values["cache_hit_calls"]
+            else None,
+            "avg_latency_cache_miss_s": round(miss_latency_s / miss_calls, 3) if miss_calls else None,
+        }
@@ -0,0 +1,68 @@
+import os
+from collections import deque
+from typing import ClassVar
+
+MODE_FAST = "fast"
+MODE_FULL = "full"
+MODE_AUTO = "auto"
+MODES = (MODE_FAST, MODE_FULL, MODE_AUTO)
+
+
+class _ModeStats:
+    __slots__ = ("latencies", "jobs", "approved", "fast_answers", "escalated")
+
+    def __init__(self, window: int):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.jobs = 0
+        self.approved = 0
+        self.fast_answers = 0
+        self.escalated = 0
+
+
+class PipelineModeService:
+    """Which pipeline answers a job, and how each mode performs.
+
+    `full` is the reformulator/orchestrator/verifier pipeline, `fast` a single BasicAgent loop whose
+    answer is returned unverified, and `auto` the fast answer when the pre-checks (or the verifier,
+    when they are inconclusive) approve it, escalating to the full pipeline otherwise. Per requested
+    mode, stats report latency percentiles over the last LATENCY_WINDOW jobs, the approval rate and,
+    for `auto`, how often the fast answer was kept.
+    """
+
+    DEFAULT_MODE = os.getenv("PIPELINE_MODE", MODE_FULL)
+    LATENCY_WINDOW = 500
+
+    _modes: ClassVar[dict[str, _ModeStats]] = {}
+
+    @classmethod
+    def resolve(cls, mode: str | None) -> str:
+        mode = mode or cls.DEFAULT_MODE
+        if mode not in MODES:
+            raise ValueError(f"Unknown pipeline mode {mode!r}, expected one of {MODES}")
+        return mode
+
+    @classmethod
+    def record(cls, mode: str, latency_s: float, payload: dict) -> None:
+        stats = cls._modes.get(mode)
+        if stats is None:
+            stats = cls._modes[mode] = _ModeStats(cls.LATENCY_WINDOW)
+        stats.jobs += 1
+        stats.latencies.append(latency_s)
+        stats.approved += payload["status"] == "approved"
+        stats.fast_answers += payload["mode"] == MODE_FAST
+        stats.escalated += payload["escalated"]
+
+    @classmethod
+    def stats(cls) -> dict:
+        modes = {}
+        for mode, stats in cls._modes.items():
+            ordered = sorted(stats.latencies)
+            modes[mode] = {
+                "jobs": stats.jobs,
+                "latency_p50_s": round(ordered[len(ordered) // 2], 3),
+                "latency_p95_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                "approval_rate": round(stats.approved / stats.jobs, 3),
+                "fast_answers": stats.fast_answers,
+                "escalated": stats.escalated,
+            }
+        return {"default_mode": cls.DEFAULT_MODE, "modes": modes}
@@ -0,0 +1,179 @@
+import os
+import re
+from typing import ClassVar
+from urllib.parse import urlparse
+
+from app.services.conversation_service import ConversationService
+from app.services.hybrid_search import normalize
+
+
+class PreVerificationService:
+    """Deterministic checks run before the LLM answer verifier.
+
+    `check` returns a verdict with one of three statuses:
+    - "reject": an obvious failure, retried with synthesized feedback without calling the LLM verifier;
+    - "grounded": every check passed and the answer cites its sources, the LLM verifier may be skipped;
+    - "uncertain": nothing obviously wrong, the LLM verifier decides.
+    """
+
+    SKIP_LLM_WHEN_GROUNDED = os.getenv("PRE_VERIFIER_SKIP_LLM", "false").lower() in ("1", "true", "yes", "on")
+    MIN_ANSWER_CHARS = 20
+
+    ALLOWED_DOMAINS = ("esilv.fr", "emlv.fr", "iim.fr", "pulv.fr", "devinci.fr", "devinci-onaccess.fr")
+    CONTACT_DOMAINS = ALLOWED_DOMAINS + ("esilv.com",)
+    UNRELATED_INSTITUTIONS = (
+        "sorbonne",
+        "hec",
+        "essec",
+        "escp",
+        "epita",
+        "epitech",
+        "efrei",
+        "ece paris",
+        "polytechnique",
+        "dauphine",
+        "centralesupelec",
+        "sciences po",
+        "paris-saclay",
+        "isep",
+        "esiea",
+    )
+
+    _FRENCH_MARKERS = frozenset(
+        "le la les des une est et pour que qui dans sur avec vous nous pas ce cette sont aux du au ou quels quelle "
+        "comment peux puis".split()
+    )
+    _ENGLISH_MARKERS = frozenset(
+        "the is are and for that which with you your can what how this these there of to in on where when".split()
+    )
+    _WORD_PATTERN = re.compile(r"[a-z]+")
+    _URL_PATTERN = re.compile(r"https?://[^\s)\]>\"']+", re.IGNORECASE)
+    _EMAIL_DOMAIN_PATTERN = re.compile(r"[\w.+-]+@([\w-]+(?:\.[\w-]+)+)")
+    _QUESTION_ID_PATTERN = re.compile(
+        r"(?:\b(?:id|question)\s*(?:n°|no\.?|#|:)?\s*\d+\b)|(?:#\d+\b)",
+        re.IGNORECASE,
+    )
+
+    _counters: ClassVar[dict[str, int]] = {
+        "checked": 0,
+        "rejected": 0,
+        "grounded": 0,
+        "uncertain": 0,
+        "llm_calls": 0,
+        "llm_calls_avoided": 0,
+    }
+
+    @classmethod
+    def check(cls, original_query: str, proposed_answer: str, history: str | None = None) -> dict:
+        cls._counters["checked"] += 1
+        answer = (proposed_answer or "").strip()
+        issues: list[str] = []
+
+        if len(answer) < cls.MIN_ANSWER_CHARS:
+            issues.append("The answer is empty or too short to be useful.")
+        else:
+            expected_language = cls._expected_language(original_query, history)
+            answer_language = cls.detect_language(answer)
+            if expected_language and answer_language and expected_language != answer_language:
+                issues.append(f"The answer must be written in the user's language ({expected_language}).")
+
+            off_domain_urls = [url for url in cls._urls(answer) if not cls._is_allowed_url(url)]
+            if off_domain_urls:
+                issues.append(
+                    "Only cite official Pole sources (esilv.fr, emlv.fr, iim.fr, pulv.fr); remove: "
+                    + ", ".join(off_domain_urls[:3])
+                )
+
+            unrelated = cls._unrelated_institutions(original_query, answer)
+            if unrelated:
+                issues.append(
+                    "The answer mentions institutions unrelated to the Pole Leonard de Vinci: " + ", ".join(unrelated)
+                )
+
+        if issues:
+            cls._counters["rejected"] += 1
+            return {"status": "reject", "feedback": " ".join(issues)}
+
+        if not cls._has_citation(answer):
+            if cls._refers_to_official_contact(answer):
+                # "Contact the scolarite" answers legitimately cite nothing; let the LLM judge them.
+                cls._counters["uncertain"] += 1
+                return {"status": "uncertain", "feedback": None}
+            cls._counters["rejected"] += 1
+            return {
+                "status": "reject",
+                "feedback": "Cite the origin of the facts (stored question ids or official Pole URLs).",
+            }
+
+        cls._counters["grounded"] += 1
+        return {"status": "grounded", "feedback": None}
+
+    @classmethod
+    def should_call_llm(cls, pre_verdict: dict) -> bool:
+        """Whether the LLM verifier still has to run after the deterministic checks."""
+        if pre_verdict["status"] == "reject" or (pre_verdict["status"] == "grounded" and cls.SKIP_LLM_WHEN_GROUNDED):
+            cls._counters["llm_calls_avoided"] += 1
+            return False
+        cls._counters["llm_calls"] += 1
+        return True
+
+    @classmethod
+    def stats(cls) -> dict[str, int | bool]:
+        return {"skip_llm_when_grounded": cls.SKIP_LLM_WHEN_GROUNDED, **cls._counters}
+
+    @classmethod
+    def detect_language(cls, text: str, min_markers: int = 3) -> str | None:
+        """Return "French", "English" or None when the text is too short or ambiguous."""
+        words = cls._WORD_PATTERN.findall(normalize(text))
+        french = sum(word in cls._FRENCH_MARKERS for word in words)
+        english = sum(word in cls._ENGLISH_MARKERS for word in words)
+        if french + english < min_markers:
+            return None
+        if french >= 2 * english:
+            return "French"
+        if english >= 2 * french:
+            return "English"
+        return None
+
+    @classmethod
+    def _expected_language(cls, original_query: str, history: str | None) -> str | None:
+        """Language of the query; short queries fall back to the student's earlier turns, then to a single marker."""
+        language = cls.detect_language(original_query)
+        if language is None and history:
+            student_prefix = f"{ConversationService.ROLE_LABELS['user']}: "
+            student_turns = [
+                line[len(student_prefix) :] for line in history.splitlines() if line.startswith(student_prefix)
+            ]
+            language = cls.detect_language(" ".join(student_turns))
+        return language or cls.detect_language(original_query, min_markers=1)
+
+    @classmethod
+    def _urls(cls, text: str) -> list[str]:
+        return [url.rstrip(".,;:") for url in cls._URL_PATTERN.findall(text)]
+
+    @classmethod
+    def _is_allowed_url(cls, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == domain or host.endswith(f".{domain}") for domain in cls.ALLOWED_DOMAINS)
+
+    @classmethod
+    def _has_citation(cls, answer: str) -> bool:
+        if cls._QUESTION_ID_PATTERN.search(answer):
+            return True
+        return any(cls._is_allowed_url(url) for url in cls._urls(answer))
+
+    @classmethod
+    def _refers_to_official_contact(cls, answer: str) -> bool:
+        return any(
+            domain.lower().endswith(cls.CONTACT_DOMAINS) for domain in cls._EMAIL_DOMAIN_PATTERN.findall(answer)
+        )
+
+    @classmethod
+    def _unrelated_institutions(cls, original_query: str, answer: str) -> list[str]:
+        query = normalize(original_query)
+        text = normalize(answer)
+        return [
+            name
+            for name in cls.UNRELATED_INSTITUTIONS
+            if re.search(rf"\b{re.escape(name)}\b", text) and not re.search(rf"\b{re.escape(name)}\b", query)
+        ]
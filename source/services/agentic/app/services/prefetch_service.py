@@ -0,0 +1,133 @@
+import asyncio
+import contextvars
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, ClassVar
+
+from app.services.hybrid_search import tokenize
+from app.services.retrieval_service import retrieval_service
+
+logger = logging.getLogger(__name__)
+
+
+class _Prefetch:
+    def __init__(self, question: str, task: asyncio.Task):
+        self.question = question
+        self.tokens = set(tokenize(question))
+        self.task = task
+        self.used = False
+
+
+_current_prefetch: contextvars.ContextVar[_Prefetch | None] = contextvars.ContextVar("prefetch", default=None)
+
+
+class PrefetchService:
+    """Speculative retrieval on the raw question, started while the query reformulator runs.
+
+    The prefetched candidates are handed to the documentalist as a warm start, and its searches
+    reuse them unless one of their query variants differs meaningfully from the question (token
+    overlap below REUSE_THRESHOLD), in which case a second, multi-query retrieval runs over the
+    variants and the original question. A prefetch nobody used is counted as wasted; for second
+    retrievals, the share of their results the prefetch had already found is averaged as
+    `mean_overlap`.
+    """
+
+    ENABLED = os.getenv("RETRIEVAL_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+    REUSE_THRESHOLD = float(os.getenv("RETRIEVAL_PREFETCH_REUSE_THRESHOLD", "0.5"))
+
+    _counters: ClassVar[dict[str, int]] = {
+        "prefetches": 0,
+        "reused": 0,
+        "second_retrievals": 0,
+        "wasted": 0,
+        "failed": 0,
+    }
+    _overlap_total: ClassVar[float] = 0.0
+    _overlap_samples: ClassVar[int] = 0
+
+    @classmethod
+    @asynccontextmanager
+    async def prefetch(cls, question: str) -> AsyncIterator[None]:
+        """Start retrieving for `question` in the background for the duration of the block."""
+        if not cls.ENABLED:
+            yield
+            return
+
+        prefetch = _Prefetch(question, asyncio.create_task(retrieval_service.search(question)))
+        cls._counters["prefetches"] += 1
+        token = _current_prefetch.set(prefetch)
+        try:
+            yield
+        finally:
+            _current_prefetch.reset(token)
+            if not prefetch.task.done():
+                prefetch.task.cancel()
+            elif not prefetch.task.cancelled() and prefetch.task.exception() is not None:
+                cls._counters["failed"] += 1
+            if not prefetch.used:
+                cls._counters["wasted"] += 1
+
+    @classmethod
+    async def candidates(cls) -> list[dict] | None:
+        """Prefetched rows for the current job, or None without a (successful) prefetch."""
+        prefetch = _current_prefetch.get()
+        if prefetch is None:
+            return None
+        rows = await cls._result(prefetch)
+        if rows:
+            prefetch.used = True
+        return rows
+
+    @classmethod
+    async def search(cls, queries: list[str]) -> list[dict]:
+        """Search through the prefetch when all of `queries` are close enough to the prefetched question."""
+        queries = [query for query in queries if query.strip()]
+        prefetch = _current_prefetch.get()
+        if prefetch is None:
+            return await retrieval_service.search_multi(queries)
+
+        if all(cls._similarity(query, prefetch) >= cls.REUSE_THRESHOLD for query in queries):
+            rows = await cls._result(prefetch)
+            if rows is not None:
+                prefetch.used = True
+                cls._counters["reused"] += 1
+                return rows
+
+        rows = await retrieval_service.search_multi([*queries, prefetch.question])
+        cls._counters["second_retrievals"] += 1
+        if rows and prefetch.task.done():
+            prefetched = await cls._result(prefetch)
+            if prefetched is not None:
+                prefetched_ids = {row["id"] for row in prefetched}
+                cls._overlap_total += sum(row["id"] in prefetched_ids for row in rows) / len(rows)
+                cls._overlap_samples += 1
+        return rows
+
+    @classmethod
+    def stats(cls) -> dict:
+        mean_overlap = cls._overlap_total / cls._overlap_samples if cls._overlap_samples else None
+        return {
+            "enabled": cls.ENABLED,
+            **cls._counters,
+            "mean_overlap": None if mean_overlap is None else round(mean_overlap, 3),
+        }
+
+    @staticmethod
+    def _similarity(query: str, prefetch: _Prefetch) -> float:
+        query_tokens = set(tokenize(query))
+        union = query_tokens | prefetch.tokens
+        return len(query_tokens & prefetch.tokens) / len(union) if union else 1.0
+
+    @staticmethod
+    async def _result(prefetch: _Prefetch) -> list[dict] | None:
+        try:
+            # Shielded: a cancelled consumer must not cancel the prefetch shared with the others.
+            return await asyncio.shield(prefetch.task)
+        except asyncio.CancelledError:
+            if prefetch.task.cancelled():
+                return None
+            raise
+        except Exception as exc:
+            logger.warning("Retrieval prefetch failed: %s", exc)
+            return None
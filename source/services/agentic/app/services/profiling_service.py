@@ -0,0 +1,249 @@
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, ClassVar, Iterator
+
+from app.services.loop_monitor_service import LoopMonitorService
+
+
+class _StageTimer:
+    """Drive a coroutine step by step, timing the steps it spends running on the event loop."""
+
+    def __init__(self, coroutine):
+        self.coroutine = coroutine
+        self.on_loop_s = 0.0
+        self.cpu_s = 0.0
+
+    def __await__(self):
+        steps = self.coroutine.__await__()
+        value, error = None, None
+        while True:
+            started_at, cpu_started_at = time.perf_counter(), time.thread_time()
+            try:
+                yielded = steps.throw(error) if error is not None else steps.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.on_loop_s += time.perf_counter() - started_at
+                self.cpu_s += time.thread_time() - cpu_started_at
+            try:
+                value, error = (yield yielded), None
+            except BaseException as exc:
+                value, error = None, exc
+
+
+class _JobProfile:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started_at = datetime.now(timezone.utc)
+        self.stages: list[dict] = []
+        self.wall_s: float | None = None
+
+
+class _Session:
+    def __init__(self, duration_s: float, max_jobs: int | None, interval_s: float):
+        self.started_at = datetime.now(timezone.utc)
+        self.deadline = time.monotonic() + duration_s
+        self.max_jobs = max_jobs
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.dropped_samples = 0
+        self.jobs: list[_JobProfile] = []
+        self.started_jobs = 0
+        self.stopped_at: datetime | None = None
+        self.stop_event = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.stopped_at is None
+
+
+_current_job: contextvars.ContextVar[_JobProfile | None] = contextvars.ContextVar("profiled_job", default=None)
+
+
+class ProfilingService:
+    """On-demand sampling profiler and per-job stage timings, for diagnosing slow jobs in production.
+
+    A session samples the stacks of every thread at INTERVAL_MS from a background thread and folds
+    them into `frame;frame;frame count` lines, the input format of flamegraph.pl and speedscope. It
+    ends after its time window or once its next N jobs have finished. Those jobs also record, per
+    agent stage, the wall-clock time split into CPU time on the event loop, time blocking the loop
+    without CPU (synchronous I/O, GIL contention) and time awaiting, e.g. the network.
+
+    Overhead is bounded: one session at a time, at most MAX_DURATION_S long and MAX_JOBS jobs, a
+    sampling interval of at least MIN_INTERVAL_MS, stacks cut at MAX_STACK_DEPTH frames and at most
+    MAX_DISTINCT_STACKS distinct stacks kept. Outside a session, stage timing is a single lookup.
+    """
+
+    INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "10"))
+    MAX_DURATION_S = float(os.getenv("PROFILING_MAX_DURATION_S", "300"))
+    MAX_JOBS = int(os.getenv("PROFILING_MAX_JOBS", "50"))
+    MIN_INTERVAL_MS = 1.0
+    MAX_STACK_DEPTH = 64
+    MAX_DISTINCT_STACKS = 20000
+
+    _session: ClassVar[_Session | None] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def start(cls, duration_s: float | None = None, jobs: int | None = None, interval_ms: float | None = None) -> dict:
+        """Start a session over `duration_s` seconds, or until `jobs` jobs have finished."""
+        if cls._session is not None and cls._session.running:
+            raise RuntimeError("A profiling session is already running")
+        duration_s = min(duration_s or cls.MAX_DURATION_S, cls.MAX_DURATION_S)
+        max_jobs = min(jobs, cls.MAX_JOBS) if jobs else None
+        interval_s = max(interval_ms or cls.INTERVAL_MS, cls.MIN_INTERVAL_MS) / 1000
+
+        session = _Session(duration_s, max_jobs, interval_s)
+        session.thread = threading.Thread(target=cls._sample, args=(session,), name="profiler", daemon=True)
+        cls._session = session
+        session.thread.start()
+        return cls.status()
+
+    @classmethod
+    def stop(cls) -> dict:
+        session = cls._session
+        if session is not None and session.running:
+            session.stop_event.set()
+            session.stopped_at = datetime.now(timezone.utc)
+        return cls.status()
+
+    @classmethod
+    def status(cls) -> dict:
+        session = cls._session
+        if session is None:
+            return {"status": "idle"}
+        return {
+            "status": "running" if session.running else "stopped",
+            "started_at": session.started_at,
+            "stopped_at": session.stopped_at,
+            "interval_ms": round(session.interval_s * 1000, 3),
+            "max_jobs": session.max_jobs,
+            "samples": session.samples,
+            "dropped_samples": session.dropped_samples,
+            "distinct_stacks": len(session.stacks),
+            "jobs": [
+                {
+                    "job_id": job.job_id,
+                    "started_at": job.started_at,
+                    "wall_ms": None if job.wall_s is None else round(job.wall_s * 1000, 1),
+                    "stages": job.stages,
+                }
+                for job in session.jobs
+            ],
+        }
+
+    @classmethod
+    def folded_stacks(cls) -> str:
+        """Samples of the last session in collapsed-stack format, most frequent first."""
+        session = cls._session
+        if session is None:
+            return ""
+        with cls._lock:
+            stacks = session.stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    @classmethod
+    @contextmanager
+    def job(cls, job_id: str | None) -> Iterator[None]:
+        """Record the stage timings of a job while a session still has room for it."""
+        session = cls._session
+        if job_id is None or session is None or not session.running:
+            yield
+            return
+        if session.max_jobs is not None:
+            if session.started_jobs >= session.max_jobs:
+                yield
+                return
+            session.started_jobs += 1
+
+        profile = _JobProfile(job_id)
+        session.jobs.append(profile)
+        started_at = time.perf_counter()
+        token = _current_job.set(profile)
+        try:
+            yield
+        finally:
+            _current_job.reset(token)
+            profile.wall_s = time.perf_counter() - started_at
+            finished_jobs = sum(job.wall_s is not None for job in session.jobs)
+            if session.max_jobs is not None and finished_jobs >= session.max_jobs and session is cls._session:
+                cls.stop()
+
+    @classmethod
+    def _sample(cls, session: _Session) -> None:
+        own_thread_id = threading.get_ident()
+        while not session.stop_event.wait(session.interval_s):
+            if time.monotonic() >= session.deadline:
+                cls.stop()
+                return
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            with cls._lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own_thread_id:
+                        continue
+                    stack = cls._fold(frame, thread_names.get(thread_id, str(thread_id)))
+                    session.samples += 1
+                    if stack in session.stacks or len(session.stacks) < cls.MAX_DISTINCT_STACKS:
+                        session.stacks[stack] += 1
+                    else:
+                        session.dropped_samples += 1
+
+    @classmethod
+    def _fold(cls, frame, thread_name: str) -> str:
+        names = []
+        while frame is not None and len(names) < cls.MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        names.append(f"thread:{thread_name}")
+        return ";".join(reversed(names)).replace(" ", "_")
+
+
+def profiled(stage: str) -> Callable:
+    """Async decorator recording the wall/CPU/blocked/await split of a stage of a profiled job.
+
+    Timings are inclusive: an orchestrator stage contains the agent stages it calls as tools.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            # The stage also labels the event-loop stalls it causes (see LoopMonitorService).
+            with LoopMonitorService.agent(stage):
+                return await _run_stage(func(*args, **kwargs))
+
+        async def _run_stage(coroutine) -> Any:
+            profile = _current_job.get()
+            if profile is None:
+                return await coroutine
+
+            timer = _StageTimer(coroutine)
+            started_at = time.perf_counter()
+            try:
+                return await timer
+            finally:
+                wall_s = time.perf_counter() - started_at
+                profile.stages.append(
+                    {
+                        "stage": stage,
+                        "wall_ms": round(wall_s * 1000, 1),
+                        "cpu_ms": round(timer.cpu_s * 1000, 1),
+                        "blocked_ms": round(max(timer.on_loop_s - timer.cpu_s, 0.0) * 1000, 1),
+                        "await_ms": round(max(wall_s - timer.on_loop_s, 0.0) * 1000, 1),
+                    }
+                )
+
+        return wrapper
+
+    return decorator
+
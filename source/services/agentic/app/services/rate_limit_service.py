@@ -0,0 +1,214 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, ClassVar, Iterator, TypeVar
+
+T = TypeVar("T")
+
+LIMIT_CHAT = "chat"
+LIMIT_EMBEDDING = "embedding"
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+_current_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "rate_limit_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+class _TokenBucket:
+    """Continuously refilled bucket holding at most one minute of capacity; the level may go negative
+    when actual usage exceeds the estimate, which delays the next requests."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.capacity / 60)
+        self.updated_at = now
+
+    def seconds_until(self, amount: float) -> float:
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60 / self.capacity)
+
+
+class _Limit:
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float):
+        self.name = name
+        self.requests = _TokenBucket(requests_per_minute)
+        self.tokens = _TokenBucket(tokens_per_minute)
+        self.waiters: list[tuple[int, int, float, asyncio.Future]] = []
+        self.wakeup: asyncio.TimerHandle | None = None
+        self.counters = {"requests": 0, "waited": 0, "wait_s": 0.0, "estimated_tokens": 0, "actual_tokens": 0}
+
+
+class RateLimitService:
+    """Process-wide OpenAI request and token budgets.
+
+    Every chat completion and embedding call reserves one request and its estimated tokens from
+    token buckets refilled at the configured per-minute limits; the reservation is corrected with
+    the real usage once the response arrives. Waiting calls are served in priority order, and batch
+    calls (batches, answer store warm-up) may not dip into the last BATCH_RESERVE share of capacity,
+    which is kept for interactive jobs.
+    """
+
+    LIMITS = {
+        LIMIT_CHAT: (float(os.getenv("OPENAI_RPM_LIMIT", "500")), float(os.getenv("OPENAI_TPM_LIMIT", "200000"))),
+        LIMIT_EMBEDDING: (
+            float(os.getenv("EMBEDDING_RPM_LIMIT", "3000")),
+            float(os.getenv("EMBEDDING_TPM_LIMIT", "1000000")),
+        ),
+    }
+    BATCH_RESERVE = float(os.getenv("RATE_LIMIT_BATCH_RESERVE", "0.2"))
+    DEFAULT_COMPLETION_TOKENS = 512
+
+    _limits: ClassVar[dict[str, _Limit]] = {}
+    _sequence: ClassVar[itertools.count] = itertools.count()
+
+    @classmethod
+    @contextmanager
+    def use_priority(cls, priority: int) -> Iterator[None]:
+        token = _current_priority.set(priority)
+        try:
+            yield
+        finally:
+            _current_priority.reset(token)
+
+    @classmethod
+    async def run(
+        cls,
+        limit_name: str,
+        estimated_tokens: int,
+        operation: Callable[[], Awaitable[T]],
+        actual_tokens: Callable[[T], int | None] = lambda result: None,
+    ) -> T:
+        """Await `operation()` once the budget allows it, then settle its real token usage."""
+        await cls.acquire(limit_name, estimated_tokens)
+        result = await operation()
+        cls.settle(limit_name, estimated_tokens, actual_tokens(result))
+        return result
+
+    @classmethod
+    async def acquire(cls, limit_name: str, estimated_tokens: int) -> None:
+        """Reserve one request and `estimated_tokens`, waiting in priority order; see `settle`."""
+        await cls._acquire(cls._limit(limit_name), estimated_tokens)
+
+    @classmethod
+    def settle(cls, limit_name: str, estimated_tokens: int, used_tokens: int | None) -> None:
+        """Correct an `acquire` reservation with the real usage, when the response reports it."""
+        limit = cls._limit(limit_name)
+        if used_tokens is not None:
+            # Positive when the estimate was too low: the extra usage delays later requests.
+            limit.tokens.level -= used_tokens - estimated_tokens
+            limit.counters["actual_tokens"] += used_tokens
+        else:
+            limit.counters["actual_tokens"] += estimated_tokens
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return len(text) // 4 + 1
+
+    @classmethod
+    def estimate_chat_tokens(cls, messages: list, max_tokens: int | None) -> int:
+        """Prompt tokens from the message contents, plus the completion allowance."""
+        prompt_chars = sum(len(str(getattr(message, "content", message))) for message in messages)
+        return prompt_chars // 4 + 1 + (max_tokens or cls.DEFAULT_COMPLETION_TOKENS)
+
+    @classmethod
+    def stats(cls) -> dict:
+        now = time.monotonic()
+        limits = {}
+        for name, limit in cls._limits.items():
+            limit.requests.refill(now)
+            limit.tokens.refill(now)
+            limits[name] = {
+                "rpm_limit": limit.requests.capacity,
+                "tpm_limit": limit.tokens.capacity,
+                "requests_available": round(limit.requests.level),
+                "tokens_available": round(limit.tokens.level),
+                "waiting": len(limit.waiters),
+                **{key: round(value, 3) if isinstance(value, float) else value for key, value in limit.counters.items()},
+            }
+        return limits
+
+    @classmethod
+    def _limit(cls, name: str) -> _Limit:
+        limit = cls._limits.get(name)
+        if limit is None:
+            requests_per_minute, tokens_per_minute = cls.LIMITS[name]
+            limit = cls._limits[name] = _Limit(name, requests_per_minute, tokens_per_minute)
+        return limit
+
+    @classmethod
+    async def _acquire(cls, limit: _Limit, tokens: int) -> None:
+        limit.counters["requests"] += 1
+        limit.counters["estimated_tokens"] += tokens
+        priority = _current_priority.get()
+        if not limit.waiters and cls._try_take(limit, priority, tokens):
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(limit.waiters, (priority, next(cls._sequence), tokens, future))
+        limit.counters["waited"] += 1
+        started_at = time.monotonic()
+        cls._dispatch(limit)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation: give the reservation back.
+                limit.requests.level += 1
+                limit.tokens.level += tokens
+            else:
+                limit.waiters = [waiter for waiter in limit.waiters if waiter[3] is not future]
+                heapq.heapify(limit.waiters)
+            cls._dispatch(limit)
+            raise
+        finally:
+            limit.counters["wait_s"] += time.monotonic() - started_at
+
+    @classmethod
+    def _try_take(cls, limit: _Limit, priority: int, tokens: int) -> bool:
+        now = time.monotonic()
+        limit.requests.refill(now)
+        limit.tokens.refill(now)
+        reserve = cls.BATCH_RESERVE if priority == PRIORITY_BATCH else 0.0
+        # A single call larger than the whole bucket is let through once the bucket is full.
+        needed_tokens = min(tokens, limit.tokens.capacity * (1 - reserve))
+        if (
+            limit.requests.level - 1 < limit.requests.capacity * reserve
+            or limit.tokens.level - needed_tokens < limit.tokens.capacity * reserve
+        ):
+            return False
+        limit.requests.level -= 1
+        limit.tokens.level -= tokens
+        return True
+
+    @classmethod
+    def _dispatch(cls, limit: _Limit) -> None:
+        """Grant waiting calls in priority order; schedule a wake-up when the head has to wait for a refill."""
+        if limit.wakeup is not None:
+            limit.wakeup.cancel()
+            limit.wakeup = None
+        while limit.waiters:
+            priority, _, tokens, future = limit.waiters[0]
+            if future.done():
+                heapq.heappop(limit.waiters)
+                continue
+            if not cls._try_take(limit, priority, tokens):
+                reserve = cls.BATCH_RESERVE if priority == PRIORITY_BATCH else 0.0
+                delay = max(
+                    limit.requests.seconds_until(1 + limit.requests.capacity * reserve),
+                    limit.tokens.seconds_until(tokens + limit.tokens.capacity * reserve),
+                    0.01,
+                )
+                limit.wakeup = asyncio.get_running_loop().call_later(delay, cls._dispatch, limit)
+                return
+            heapq.heappop(limit.waiters)
+            future.set_result(None)
@@ -0,0 +1,357 @@
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, ClassVar, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEPENDENCY_OPENAI = "openai"
+DEPENDENCY_SUPABASE = "supabase"
+DEPENDENCY_TAVILY = "tavily"
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class DependencyUnavailableError(Exception):
+    """Raised without calling the dependency while its circuit breaker is open."""
+
+    def __init__(self, dependency: str, retry_in_s: float):
+        super().__init__(f"{dependency} is temporarily unavailable, retry in {retry_in_s:.0f}s.")
+        self.dependency = dependency
+        self.retry_in_s = retry_in_s
+
+
+class BulkheadFullError(DependencyUnavailableError):
+    """Raised when every concurrent call slot of a dependency stays busy for longer than the bulkhead wait."""
+
+    def __init__(self, dependency: str, wait_s: float):
+        Exception.__init__(self, f"{dependency} is saturated: no call slot freed within {wait_s:.0f}s.")
+        self.dependency = dependency
+        self.retry_in_s = wait_s
+
+
+class _Bulkhead:
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.rejected = 0
+        # Slots kept by worker threads that outlived their (timed out or cancelled) call.
+        self.lingering = 0
+
+
+class _Slot:
+    """A bulkhead slot, released once the call has ended and every worker thread it started has returned."""
+
+    def __init__(self, bulkhead: _Bulkhead):
+        self.bulkhead = bulkhead
+        self.threads = 0
+        self.ended = False
+
+    def end(self) -> None:
+        self.ended = True
+        self.bulkhead.in_flight -= 1
+        if self.threads:
+            self.bulkhead.lingering += 1
+        else:
+            self.bulkhead.semaphore.release()
+
+    def thread_returned(self) -> None:
+        self.threads -= 1
+        if self.ended and not self.threads:
+            self.bulkhead.lingering -= 1
+            self.bulkhead.semaphore.release()
+
+
+_current_slot: contextvars.ContextVar[_Slot | None] = contextvars.ContextVar("bulkhead_slot", default=None)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive retryable failures, then lets a single probe
+    through once `reset_timeout_s` has elapsed: its success closes the breaker, its failure reopens it."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout_s: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.counters = {"calls": 0, "failures": 0, "retries": 0, "rejected": 0, "opened": 0}
+
+    def before_call(self) -> None:
+        if self.state == BREAKER_OPEN:
+            remaining = self.reset_timeout_s - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                self.counters["rejected"] += 1
+                raise DependencyUnavailableError(self.name, remaining)
+            self.state = BREAKER_HALF_OPEN
+        if self.state == BREAKER_HALF_OPEN:
+            if self.probe_in_flight:
+                self.counters["rejected"] += 1
+                raise DependencyUnavailableError(self.name, self.reset_timeout_s)
+            self.probe_in_flight = True
+        self.counters["calls"] += 1
+
+    def record_success(self) -> None:
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.counters["failures"] += 1
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == BREAKER_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != BREAKER_OPEN:
+                self.counters["opened"] += 1
+            self.state = BREAKER_OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """Free the half-open probe slot after an error that says nothing about the dependency."""
+        self.probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.consecutive_failures, **self.counters}
+
+
+class ResilienceService:
+    """Retries with exponential backoff and full jitter behind per-dependency circuit breakers.
+
+    Only transient errors are retried: timeouts, connection errors, HTTP 408/409/429 and 5xx. Other
+    errors (bad request, authentication, validation) are raised immediately and do not count
+    against the breaker. While a breaker is open, calls fail fast with `DependencyUnavailableError`.
+
+    Each dependency also has a bulkhead capping its concurrent calls, so that a slow dependency
+    cannot hold every worker; a call waiting more than BULKHEAD_WAIT_S for a slot fails fast.
+    `admit` (e.g. a rate-limit reservation) is awaited before the slot is requested, so that calls
+    queued for budget neither hold slots nor spend their bulkhead wait.
+    """
+
+    MAX_ATTEMPTS = int(os.getenv("RESILIENCE_MAX_ATTEMPTS", "3"))
+    BASE_DELAY_S = float(os.getenv("RESILIENCE_BASE_DELAY_S", "0.5"))
+    MAX_DELAY_S = float(os.getenv("RESILIENCE_MAX_DELAY_S", "8"))
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    BREAKER_RESET_TIMEOUT_S = float(os.getenv("BREAKER_RESET_TIMEOUT_S", "30"))
+    # Per-attempt timeouts; an agent's `<AGENT>_TIMEOUT_S` replaces the OpenAI one for its calls.
+    TIMEOUTS_S = {
+        DEPENDENCY_OPENAI: float(os.getenv("OPENAI_TIMEOUT_S", "60")),
+        DEPENDENCY_SUPABASE: float(os.getenv("SUPABASE_TIMEOUT_S", "10")),
+        DEPENDENCY_TAVILY: float(os.getenv("TAVILY_TIMEOUT_S", "20")),
+    }
+
+    BULKHEADS = {
+        DEPENDENCY_OPENAI: int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")),
+        DEPENDENCY_SUPABASE: int(os.getenv("SUPABASE_MAX_CONCURRENCY", "8")),
+        DEPENDENCY_TAVILY: int(os.getenv("TAVILY_MAX_CONCURRENCY", "4")),
+    }
+    BULKHEAD_WAIT_S = float(os.getenv("BULKHEAD_WAIT_S", "10"))
+
+    RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+    _RETRYABLE_ERROR_NAMES = frozenset(
+        {
+            "APIConnectionError",
+            "APITimeoutError",
+            "RateLimitError",
+            "InternalServerError",
+            "ConnectError",
+            "ConnectTimeout",
+            "ReadTimeout",
+            "ReadError",
+            "WriteTimeout",
+            "PoolTimeout",
+            "RemoteProtocolError",
+            "TimeoutException",
+        }
+    )
+
+    _breakers: ClassVar[dict[str, CircuitBreaker]] = {}
+    _bulkheads: ClassVar[dict[str, _Bulkhead]] = {}
+
+    @classmethod
+    def breaker(cls, dependency: str) -> CircuitBreaker:
+        breaker = cls._breakers.get(dependency)
+        if breaker is None:
+            breaker = CircuitBreaker(dependency, cls.BREAKER_FAILURE_THRESHOLD, cls.BREAKER_RESET_TIMEOUT_S)
+            cls._breakers[dependency] = breaker
+        return breaker
+
+    @classmethod
+    async def call(
+        cls,
+        dependency: str,
+        operation: Callable[[], Awaitable[T]],
+        *,
+        max_attempts: int | None = None,
+        on_retry: Callable[[], Awaitable[None]] | None = None,
+        admit: Callable[[], Awaitable[None]] | None = None,
+        timeout_s: float | None = None,
+    ) -> T:
+        """Await `operation()` with retries; `on_retry` runs before each new attempt, `admit` before each attempt.
+
+        Each attempt is bounded by `timeout_s`, by default the dependency's timeout.
+        """
+        breaker = cls.breaker(dependency)
+        max_attempts = max_attempts or cls.MAX_ATTEMPTS
+        timeout_s = timeout_s or cls.TIMEOUTS_S.get(dependency)
+
+        for attempt in range(1, max_attempts + 1):
+            breaker.before_call()
+            try:
+                if admit is not None:
+                    await admit()
+                async with cls._bulkhead(dependency):
+                    if timeout_s:
+                        result = await asyncio.wait_for(operation(), timeout_s)
+                    else:
+                        result = await operation()
+            except asyncio.CancelledError:
+                # A cancelled call (e.g. the losing side of a hedged request) says nothing about the dependency.
+                breaker.release_probe()
+                raise
+            except Exception as exc:
+                if not cls.is_retryable(exc):
+                    if cls._status_code(exc) is not None:
+                        # The dependency answered, e.g. with a 400 or 401: it is up.
+                        breaker.record_success()
+                    else:
+                        # Raised before reaching the dependency (full bulkhead) or by the caller's own code.
+                        breaker.release_probe()
+                    raise
+                breaker.record_failure()
+                if attempt >= max_attempts or breaker.state == BREAKER_OPEN:
+                    raise
+                delay = cls.backoff_delay(attempt, exc)
+                logger.warning(
+                    "%s call failed (%s: %s), retry %d in %.2fs", dependency, type(exc).__name__, exc, attempt, delay
+                )
+                breaker.counters["retries"] += 1
+                await asyncio.sleep(delay)
+                if on_retry is not None:
+                    await on_retry()
+            else:
+                breaker.record_success()
+                return result
+
+    @classmethod
+    @asynccontextmanager
+    async def _bulkhead(cls, dependency: str) -> AsyncIterator[None]:
+        bulkhead = cls._bulkheads.get(dependency)
+        if bulkhead is None:
+            if dependency not in cls.BULKHEADS:
+                yield
+                return
+            bulkhead = cls._bulkheads[dependency] = _Bulkhead(cls.BULKHEADS[dependency])
+        try:
+            await asyncio.wait_for(bulkhead.semaphore.acquire(), cls.BULKHEAD_WAIT_S)
+        except asyncio.TimeoutError:
+            bulkhead.rejected += 1
+            raise BulkheadFullError(dependency, cls.BULKHEAD_WAIT_S) from None
+        bulkhead.in_flight += 1
+        slot = _Slot(bulkhead)
+        token = _current_slot.set(slot)
+        try:
+            yield
+        finally:
+            _current_slot.reset(token)
+            slot.end()
+
+    @classmethod
+    async def call_sync(cls, dependency: str, function: Callable[..., T], *args, **kwargs) -> T:
+        """Run a blocking client call in a worker thread through `call`.
+
+        A thread cannot be cancelled: after a timeout it keeps running, and keeps its bulkhead slot
+        until it returns, so that retries cannot pile up more threads than the bulkhead allows.
+        """
+        return await cls.call(dependency, lambda: cls._in_thread(function, *args, **kwargs))
+
+    @staticmethod
+    async def _in_thread(function: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        slot = _current_slot.get()
+        context = contextvars.copy_context()
+
+        def run() -> T:
+            try:
+                return context.run(function, *args, **kwargs)
+            finally:
+                if slot is not None:
+                    try:
+                        loop.call_soon_threadsafe(slot.thread_returned)
+                    except RuntimeError:
+                        pass  # The loop is closed: nothing left to release.
+
+        if slot is not None:
+            slot.threads += 1
+        # Shielded so that a timeout never cancels the queued call before it starts: `run` always
+        # runs, and always gives the slot back.
+        return await asyncio.shield(loop.run_in_executor(None, run))
+
+    @classmethod
+    def is_retryable(cls, exc: BaseException) -> bool:
+        if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+            return True
+        status_code = cls._status_code(exc)
+        if status_code is not None:
+            return status_code in cls.RETRYABLE_STATUS_CODES
+        return any(klass.__name__ in cls._RETRYABLE_ERROR_NAMES for klass in type(exc).__mro__)
+
+    @classmethod
+    def backoff_delay(cls, attempt: int, exc: BaseException | None = None) -> float:
+        """Full jitter: uniform in [0, min(max delay, base * 2^(attempt - 1))], or the server's Retry-After."""
+        retry_after = cls._retry_after_s(exc) if exc is not None else None
+        if retry_after is not None:
+            return min(retry_after, cls.MAX_DELAY_S)
+        return random.uniform(0, min(cls.MAX_DELAY_S, cls.BASE_DELAY_S * 2 ** (attempt - 1)))
+
+    @classmethod
+    def readiness(cls) -> dict[str, str]:
+        return {name: breaker.state for name, breaker in cls._breakers.items()}
+
+    @classmethod
+    def stats(cls) -> dict[str, dict]:
+        stats = {name: breaker.snapshot() for name, breaker in cls._breakers.items()}
+        for name, bulkhead in cls._bulkheads.items():
+            stats.setdefault(name, {})["bulkhead"] = {
+                "max_concurrent": bulkhead.max_concurrent,
+                "in_flight": bulkhead.in_flight,
+                "lingering_threads": bulkhead.lingering,
+                "rejected": bulkhead.rejected,
+            }
+        return stats
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._breakers.clear()
+        cls._bulkheads.clear()
+
+    @staticmethod
+    def _status_code(exc: BaseException) -> int | None:
+        status_code = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+        if status_code is None:
+            response = getattr(exc, "response", None)
+            status_code = getattr(response, "status_code", None)
+        try:
+            return int(status_code) if status_code is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _retry_after_s(exc: BaseException) -> float | None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        if not headers:
+            return None
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
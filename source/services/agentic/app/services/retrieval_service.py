@@ -0,0 +1,326 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable
+
+from app.database.client import get_db
+from app.services.cassette_service import CassetteService
+from app.services.hedging_service import HedgingService
+from app.services.hybrid_search import BM25Index, normalize, reciprocal_rank_fusion, rerank_multi
+from app.services.rate_limit_service import LIMIT_EMBEDDING, RateLimitService
+from app.services.resilience_service import DEPENDENCY_OPENAI, DEPENDENCY_SUPABASE, ResilienceService
+from app.services.vector_quantization import (
+    QUANTIZATION_BINARY,
+    QUANTIZATION_FLOAT,
+    QuantizedVectorIndex,
+    parse_vector,
+    truncate,
+)
+from app.settings import get_settings
+from langchain_openai import OpenAIEmbeddings
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalService:
+    """Hybrid retriever: pgvector `match_documents` fused with a local BM25 index over ai_data.
+
+    The BM25 index is built lazily from ai_data and rebuilt in the background once older than
+    INDEX_TTL_S. If it cannot be loaded, retrieval degrades to vector search only.
+
+    Query embeddings can be cut to EMBEDDING_DIMENSIONS (Matryoshka truncation) and candidates
+    preselected on int8 or binary codes (EMBEDDING_QUANTIZATION), either by `match_documents_compact`
+    in Supabase or, with VECTOR_BACKEND=local, by an in-process index rebuilt with the BM25 one.
+
+    `search_multi` searches several variants of a query at once (reformulated, original, French and
+    English): their embeddings are requested in one batch, their searches run concurrently and all
+    the ranked lists are fused, so that a row found in either language ranks high in one list.
+    """
+
+    MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # "hybrid" or "vector"
+    TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+    VECTOR_CANDIDATES = int(os.getenv("RETRIEVAL_VECTOR_CANDIDATES", "40"))
+    LEXICAL_CANDIDATES = int(os.getenv("RETRIEVAL_LEXICAL_CANDIDATES", "40"))
+    RERANK = os.getenv("RETRIEVAL_RERANK", "true").lower() in ("1", "true", "yes", "on")
+    INDEX_TTL_S = int(os.getenv("RETRIEVAL_INDEX_TTL_S", "900"))
+    INDEX_PAGE_SIZE = 1000
+    MAX_QUERY_VARIANTS = 4
+
+    EMBEDDING_MODEL = "text-embedding-3-large"
+    FULL_DIMENSIONS = 3072
+    EMBEDDING_COLUMN = "title_embedding"
+    EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", str(FULL_DIMENSIONS)))
+    EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", QUANTIZATION_FLOAT)
+    RESCORE_CANDIDATES = int(os.getenv("EMBEDDING_RESCORE_CANDIDATES", "100"))
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "supabase")  # "supabase" or "local"
+
+    def __init__(self):
+        self._embeddings_client: OpenAIEmbeddings | None = None
+        self._embeddings_key: str | None = None
+        self._index: BM25Index | None = None
+        self._vector_index: QuantizedVectorIndex | None = None
+        self._documents: dict = {}
+        self._index_built_at = 0.0
+        self._index_lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    async def search(self, query: str, limit: int | None = None) -> list[dict]:
+        """Return up to `limit` rows with `id` and `Title`, best candidates first."""
+        return await self.search_multi([query], limit)
+
+    async def search_multi(self, queries: list[str], limit: int | None = None) -> list[dict]:
+        """Like `search`, over the fused rankings of several variants of the same query."""
+        queries = self._distinct(queries)[: self.MAX_QUERY_VARIANTS]
+        limit = limit or self.TOP_K
+        if not queries:
+            return []
+        if self.MODE != "hybrid":
+            vector_results = await self._vector_searches(queries, self.VECTOR_CANDIDATES)
+            rows = {row["id"]: row for result in vector_results for row in result}
+            fused = reciprocal_rank_fusion([[row["id"] for row in result] for result in vector_results])
+            if self.RERANK:
+                # Without the lexical index, rows are reranked on their titles.
+                documents = {
+                    doc_id: self._documents.get(doc_id, (row.get("Title") or "", "")) for doc_id, row in rows.items()
+                }
+                fused = rerank_multi(queries, fused, documents)
+            return [rows[doc_id] for doc_id, _ in fused[:limit]]
+
+        vector_results, index = await asyncio.gather(
+            self._vector_searches(queries, self.VECTOR_CANDIDATES),
+            self._get_index(),
+            return_exceptions=True,
+        )
+        if isinstance(index, BaseException):
+            logger.warning("Lexical index unavailable, using vector search only: %s", index)
+            index = None
+        if isinstance(vector_results, BaseException):
+            if index is None:
+                raise vector_results
+            logger.warning("Vector search failed, using lexical search only: %s", vector_results)
+            vector_results = []
+
+        titles = {row["id"]: row["Title"] for result in vector_results for row in result}
+        rankings = [[row["id"] for row in result] for result in vector_results]
+        if index is not None:
+            rankings.extend(
+                [doc_id for doc_id, _ in index.search(query, self.LEXICAL_CANDIDATES)] for query in queries
+            )
+
+        fused = reciprocal_rank_fusion(rankings)
+        if self.RERANK:
+            fused = rerank_multi(queries, fused, self._documents)
+
+        results = []
+        for doc_id, _ in fused[:limit]:
+            title = titles.get(doc_id) or self._documents.get(doc_id, ("", ""))[0]
+            results.append({"id": doc_id, "Title": title})
+        return results
+
+    async def documents(self) -> dict:
+        """Return the indexed ai_data rows as {id: (Title, Content)}."""
+        await self._get_index()
+        return self._documents
+
+    @staticmethod
+    def _distinct(queries: list[str]) -> list[str]:
+        """Non-empty queries in order, without the ones differing only by case, accents or spacing."""
+        distinct, seen = [], set()
+        for query in queries:
+            key = " ".join(normalize(query).split())
+            if key and key not in seen:
+                seen.add(key)
+                distinct.append(query)
+        return distinct
+
+    async def _vector_searches(self, queries: list[str], match_count: int) -> list[list[dict]]:
+        embeddings = await self._embed(queries)
+        return list(
+            await asyncio.gather(
+                *(self._match(query, embedding, match_count) for query, embedding in zip(queries, embeddings))
+            )
+        )
+
+    @property
+    def _embeddings(self) -> OpenAIEmbeddings:
+        """Embeddings client, created again when a settings reload changes the OpenAI key."""
+        api_key = get_settings().openai_api_key
+        if self._embeddings_client is None or api_key != self._embeddings_key:
+            truncated = self.EMBEDDING_DIMENSIONS < self.FULL_DIMENSIONS
+            self._embeddings_client = OpenAIEmbeddings(
+                model=self.EMBEDDING_MODEL,
+                # The API truncates and re-normalizes, which also shrinks the response.
+                dimensions=self.EMBEDDING_DIMENSIONS if truncated else None,
+                max_retries=0,
+                timeout=ResilienceService.TIMEOUTS_S[DEPENDENCY_OPENAI],
+                api_key=api_key,
+            )
+            self._embeddings_key = api_key
+        return self._embeddings_client
+
+    async def _embed(self, queries: list[str]) -> list[list[float]]:
+        if len(queries) == 1:
+            query = queries[0]
+            embedding = await CassetteService.call(
+                "openai.embedding",
+                {"model": self._embeddings.model, "dimensions": self._embeddings.dimensions, "text": query},
+                lambda: HedgingService.call(
+                    "embed_query",
+                    lambda: self._limited_embedding(
+                        RateLimitService.estimate_tokens(query), lambda: self._embeddings.aembed_query(query)
+                    ),
+                ),
+            )
+            return [embedding]
+
+        # One request for all the variants: embed_query is embed_documents of a single text.
+        return await CassetteService.call(
+            "openai.embeddings",
+            {"model": self._embeddings.model, "dimensions": self._embeddings.dimensions, "texts": queries},
+            lambda: HedgingService.call(
+                "embed_queries",
+                lambda: self._limited_embedding(
+                    sum(RateLimitService.estimate_tokens(query) for query in queries),
+                    lambda: self._embeddings.aembed_documents(queries),
+                ),
+            ),
+        )
+
+    @staticmethod
+    async def _limited_embedding(estimated_tokens: int, embed: Callable[[], Awaitable[Any]]) -> Any:
+        # The rate-limit reservation is taken before the OpenAI bulkhead slot (see ResilienceService).
+        async def embed_and_settle() -> Any:
+            result = await embed()
+            RateLimitService.settle(LIMIT_EMBEDDING, estimated_tokens, None)
+            return result
+
+        return await ResilienceService.call(
+            DEPENDENCY_OPENAI,
+            embed_and_settle,
+            admit=lambda: RateLimitService.acquire(LIMIT_EMBEDDING, estimated_tokens),
+        )
+
+    async def _match(self, query: str, user_embedding: list[float], match_count: int) -> list[dict]:
+        if self.VECTOR_BACKEND == "local":
+            await self._get_index()
+            if self._vector_index is None:
+                raise RuntimeError("Local vector index unavailable")
+            return [
+                {"id": doc_id, "Title": self._documents.get(doc_id, ("", ""))[0]}
+                for doc_id, _ in self._vector_index.search(user_embedding, match_count)
+            ]
+
+        function, params = self._match_documents_call(user_embedding, match_count)
+        # Keyed by the query text: the embedding itself is recorded by `_embed`.
+        rows = await CassetteService.call(
+            "supabase.match_documents",
+            {"query": query, "match_count": match_count, "function": function},
+            lambda: HedgingService.call(
+                "match_documents",
+                lambda: ResilienceService.call_sync(
+                    DEPENDENCY_SUPABASE,
+                    lambda: get_db().rpc(function, params).execute().data,
+                ),
+            ),
+        )
+        return rows or []
+
+    def _match_documents_call(self, user_embedding: list[float], match_count: int) -> tuple[str, dict]:
+        if self.EMBEDDING_DIMENSIONS >= self.FULL_DIMENSIONS and self.EMBEDDING_QUANTIZATION == QUANTIZATION_FLOAT:
+            return "match_documents", {"query_embedding": user_embedding, "match_count": match_count}
+        # pgvector has no int8 type: int8 only applies to the local index, Supabase scores floats.
+        binary_prefilter = self.EMBEDDING_QUANTIZATION == QUANTIZATION_BINARY
+        return "match_documents_compact", {
+            "query_embedding": user_embedding,
+            "match_count": match_count,
+            "candidate_count": max(match_count, self.RESCORE_CANDIDATES) if binary_prefilter else match_count,
+            "binary_prefilter": binary_prefilter,
+        }
+
+    async def _get_index(self) -> BM25Index:
+        if self._index is not None:
+            if time.monotonic() - self._index_built_at > self.INDEX_TTL_S and not self._refresh_running():
+                self._refresh_task = asyncio.create_task(self._rebuild_index())
+            return self._index
+
+        async with self._index_lock:
+            if self._index is None:
+                await self._rebuild_index()
+        return self._index
+
+    def _refresh_running(self) -> bool:
+        return self._refresh_task is not None and not self._refresh_task.done()
+
+    async def _rebuild_index(self) -> None:
+        try:
+            documents = await CassetteService.shared(
+                "ai_data_documents",
+                lambda: asyncio.to_thread(self._load_documents),
+                encode=lambda rows: [[doc_id, title, content] for doc_id, (title, content) in rows.items()],
+                decode=lambda rows: {doc_id: (title, content) for doc_id, title, content in rows},
+            )
+            index = await asyncio.to_thread(
+                BM25Index().build, [(doc_id, title, content) for doc_id, (title, content) in documents.items()]
+            )
+            vector_index = await self._build_vector_index() if self.VECTOR_BACKEND == "local" else None
+        except Exception as exc:
+            if self._index is None:
+                raise
+            logger.warning("Lexical index refresh failed, keeping the previous one: %s", exc)
+            self._index_built_at = time.monotonic()
+            return
+        self._documents = documents
+        self._index = index
+        self._vector_index = vector_index
+        self._index_built_at = time.monotonic()
+
+    async def _build_vector_index(self) -> QuantizedVectorIndex:
+        vectors = await CassetteService.shared(
+            f"ai_data_vectors_{self.EMBEDDING_DIMENSIONS}",
+            lambda: asyncio.to_thread(self._load_vectors),
+        )
+        index = QuantizedVectorIndex(self.EMBEDDING_DIMENSIONS, self.EMBEDDING_QUANTIZATION, self.RESCORE_CANDIDATES)
+        return await asyncio.to_thread(index.build, vectors)
+
+    def _load_vectors(self) -> list[list]:
+        """[id, vector] pairs, truncated page by page so that full vectors are never all held at once."""
+        supabase = get_db()
+        vectors = []
+        last_id = None
+        while True:
+            query = (
+                supabase.table("ai_data")
+                .select(f"id, {self.EMBEDDING_COLUMN}")
+                .order("id")
+                .limit(self.INDEX_PAGE_SIZE)
+            )
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = query.execute().data or []
+            if not rows:
+                return vectors
+            for row in rows:
+                if row.get(self.EMBEDDING_COLUMN):
+                    vectors.append(
+                        [row["id"], truncate(parse_vector(row[self.EMBEDDING_COLUMN]), self.EMBEDDING_DIMENSIONS)]
+                    )
+            last_id = rows[-1]["id"]
+
+    def _load_documents(self) -> dict:
+        supabase = get_db()
+        documents = {}
+        last_id = None
+        while True:
+            query = supabase.table("ai_data").select("id, Title, Content").order("id").limit(self.INDEX_PAGE_SIZE)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = query.execute().data or []
+            if not rows:
+                return documents
+            for row in rows:
+                documents[row["id"]] = (row.get("Title") or "", row.get("Content") or "")
+            last_id = rows[-1]["id"]
+
+
+retrieval_service = RetrievalService()
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import statistics
+import time
+from typing import AsyncIterator, Awaitable, Callable, ClassVar
+
+
+class _JobStream:
+    __slots__ = ("events", "condition", "closed", "started_at", "first_token_at")
+
+    def __init__(self):
+        self.events: list[dict] = []
+        self.condition = asyncio.Condition()
+        self.closed = False
+        self.started_at = time.monotonic()
+        self.first_token_at: float | None = None
+
+
+class StreamingService:
+    """Per-job event buffers feeding the streaming endpoint.
+
+    The orchestrator's final answer is streamed token by token as a *provisional* answer while
+    it is generated. The verifier then either approves it (a `final` event carries the
+    possibly edited answer) or rejects it (a `reset` event clears it before the next attempt).
+    Late subscribers replay the buffered events.
+    """
+
+    RETENTION_S = 120
+    MAX_TTFT_SAMPLES = 1000
+
+    _streams: ClassVar[dict[str, _JobStream]] = {}
+    _ttft_samples: ClassVar[list[float]] = []
+
+    @classmethod
+    def open(cls, job_id: str) -> None:
+        cls._streams[job_id] = _JobStream()
+
+    @classmethod
+    def exists(cls, job_id: str) -> bool:
+        return job_id in cls._streams
+
+    @classmethod
+    async def publish(cls, job_id: str, event: dict) -> None:
+        stream = cls._streams.get(job_id)
+        if stream is None or stream.closed:
+            return
+        if event["type"] == "token" and stream.first_token_at is None:
+            stream.first_token_at = time.monotonic()
+            cls._record_ttft(stream.first_token_at - stream.started_at)
+        async with stream.condition:
+            stream.events.append(event)
+            stream.condition.notify_all()
+
+    @classmethod
+    def token_callback(cls, job_id: str, attempt: int) -> Callable[[str | None], Awaitable[None]]:
+        """Callback handed to the orchestrator: a text delta, or None to discard what was streamed."""
+
+        async def on_token(delta: str | None) -> None:
+            if delta is None:
+                await cls.publish(job_id, {"type": "reset", "attempt": attempt})
+            else:
+                await cls.publish(job_id, {"type": "token", "attempt": attempt, "text": delta})
+
+        return on_token
+
+    @classmethod
+    def time_to_first_token_ms(cls, job_id: str) -> int | None:
+        stream = cls._streams.get(job_id)
+        if stream is None or stream.first_token_at is None:
+            return None
+        return round((stream.first_token_at - stream.started_at) * 1000)
+
+    @classmethod
+    async def close(cls, job_id: str, event: dict) -> None:
+        await cls.publish(job_id, event)
+        stream = cls._streams.get(job_id)
+        if stream is None:
+            return
+        async with stream.condition:
+            stream.closed = True
+            stream.condition.notify_all()
+        asyncio.get_running_loop().call_later(cls.RETENTION_S, cls._streams.pop, job_id, None)
+
+    @classmethod
+    async def subscribe(cls, job_id: str) -> AsyncIterator[str]:
+        """Yield server-sent events for a job, replaying those already published."""
+        stream = cls._streams.get(job_id)
+        if stream is None:
+            return
+        position = 0
+        while True:
+            async with stream.condition:
+                await stream.condition.wait_for(lambda: len(stream.events) > position or stream.closed)
+                pending = stream.events[position:]
+                closed = stream.closed
+            position += len(pending)
+            for event in pending:
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+            if closed and position >= len(stream.events):
+                return
+
+    @classmethod
+    def stats(cls) -> dict:
+        samples = sorted(cls._ttft_samples)
+        if not samples:
+            return {"ttft_samples": 0}
+        return {
+            "ttft_samples": len(samples),
+            "ttft_p50_ms": round(statistics.median(samples) * 1000),
+            "ttft_p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)] * 1000),
+        }
+
+    @classmethod
+    def _record_ttft(cls, seconds: float) -> None:
+        cls._ttft_samples.append(seconds)
+        if len(cls._ttft_samples) > cls.MAX_TTFT_SAMPLES:
+            del cls._ttft_samples[: len(cls._ttft_samples) - cls.MAX_TTFT_SAMPLES]
@@ -0,0 +1,100 @@
+import json
+import os
+from collections import Counter
+from typing import Any, ClassVar
+
+from app.services.hybrid_search import normalize, tokenize
+
+STOP_REPEATED_CALL = "repeated_call"
+STOP_REDUNDANT_ROUNDS = "redundant_rounds"
+STOP_MAX_ITERATIONS = "max_iterations"
+
+
+class _ToolRun:
+    """Tool calls of one `_llm_call_with_tools` run: memoized results and loop detection state."""
+
+    def __init__(self, agent_name: str):
+        self.agent_name = agent_name
+        self.results: dict[str, str] = {}
+        self.requests: Counter = Counter()
+        self.redundant_rounds = 0
+        self.round_had_new_call = False
+
+    def lookup(self, tool_name: str, tool_args: dict) -> str | None:
+        key = ToolMemoService.call_key(tool_name, tool_args)
+        self.requests[key] += 1
+        ToolMemoService.count(self.agent_name, "calls")
+        if not ToolMemoService.ENABLED or key not in self.results:
+            self.round_had_new_call = True
+            return None
+        ToolMemoService.count(self.agent_name, "memo_hits")
+        return self.results[key]
+
+    def store(self, tool_name: str, tool_args: dict, result: Any) -> None:
+        if ToolMemoService.ENABLED:
+            self.results[ToolMemoService.call_key(tool_name, tool_args)] = str(result)
+
+    def end_round(self) -> str | None:
+        """Close a round of tool calls; return why the model should be made to answer now, if it should."""
+        self.redundant_rounds = 0 if self.round_had_new_call else self.redundant_rounds + 1
+        self.round_had_new_call = False
+        if self.requests and max(self.requests.values()) >= ToolMemoService.MAX_REPEATS:
+            return STOP_REPEATED_CALL
+        # Rounds made only of calls already answered bring nothing new: the model is going in circles.
+        if self.redundant_rounds >= ToolMemoService.MAX_REDUNDANT_ROUNDS:
+            return STOP_REDUNDANT_ROUNDS
+        return None
+
+
+class ToolMemoService:
+    """Per-run memoization of tool calls and detection of tool call loops.
+
+    Within one agent run, a call to a tool with the same normalized arguments (case, accents,
+    punctuation, stopwords and word order ignored) returns the earlier result without running the
+    tool again. The run is stopped and the model asked for its final answer when one call is
+    requested MAX_REPEATS times, or after MAX_REDUNDANT_ROUNDS consecutive rounds of already
+    answered calls (repeated or oscillating patterns such as A, B, A, B).
+    """
+
+    ENABLED = os.getenv("TOOL_MEMO_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+    MAX_REPEATS = int(os.getenv("TOOL_LOOP_MAX_REPEATS", "3"))
+    MAX_REDUNDANT_ROUNDS = int(os.getenv("TOOL_LOOP_MAX_REDUNDANT_ROUNDS", "2"))
+
+    FINAL_ANSWER_INSTRUCTION = (
+        "Do not call any more tools: the previous calls did not bring new information. "
+        "Answer now with the information already gathered."
+    )
+
+    _stats: ClassVar[dict[str, dict]] = {}
+
+    @classmethod
+    def new_run(cls, agent_name: str) -> _ToolRun:
+        return _ToolRun(agent_name)
+
+    @staticmethod
+    def call_key(tool_name: str, tool_args: dict) -> str:
+        normalized = {}
+        for name, value in tool_args.items():
+            if isinstance(value, str):
+                tokens = sorted(set(tokenize(value)))
+                normalized[name] = " ".join(tokens) if tokens else normalize(value).strip()
+            else:
+                normalized[name] = value
+        return f"{tool_name}:{json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)}"
+
+    @classmethod
+    def count(cls, agent_name: str, counter: str) -> None:
+        cls._agent_stats(agent_name)[counter] += 1
+
+    @classmethod
+    def record_forced_final(cls, agent_name: str, reason: str) -> None:
+        forced_finals = cls._agent_stats(agent_name)["forced_finals"]
+        forced_finals[reason] = forced_finals.get(reason, 0) + 1
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {"enabled": cls.ENABLED, "agents": cls._stats}
+
+    @classmethod
+    def _agent_stats(cls, agent_name: str) -> dict:
+        return cls._stats.setdefault(agent_name, {"calls": 0, "memo_hits": 0, "forced_finals": {}})
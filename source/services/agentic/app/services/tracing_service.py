@@ -0,0 +1,478 @@
+import atexit
+import contextvars
+import functools
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, ClassVar, Iterator
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def cap_payload(value: Any, max_chars: int, max_items: int = 50, depth: int = 4) -> Any:
+    """Return a size-bounded copy of an observation payload."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return f"{value[:max_chars]}... [truncated {len(value) - max_chars} chars]"
+    if depth <= 0:
+        return cap_payload(str(value), max_chars)
+    if isinstance(value, dict):
+        capped = {}
+        for index, (key, item) in enumerate(value.items()):
+            if index >= max_items:
+                capped["..."] = f"{len(value) - max_items} more keys"
+                break
+            capped[str(key)] = cap_payload(item, max_chars, max_items, depth - 1)
+        return capped
+    if isinstance(value, (list, tuple)):
+        capped = [cap_payload(item, max_chars, max_items, depth - 1) for item in value[:max_items]]
+        if len(value) > max_items:
+            capped.append(f"... {len(value) - max_items} more items")
+        return capped
+    content = getattr(value, "content", None)
+    if isinstance(content, str):
+        return cap_payload(f"{type(value).__name__}: {content}", max_chars)
+    return cap_payload(str(value), max_chars)
+
+
+class _Span:
+    __slots__ = (
+        "index",
+        "parent_index",
+        "name",
+        "as_type",
+        "start",
+        "end",
+        "input",
+        "output",
+        "model",
+        "usage",
+        "metadata",
+        "level",
+        "status_message",
+    )
+
+    def __init__(self, name: str, as_type: str, index: int, parent_index: int | None):
+        # Span ids are derived from the trace id at export time to keep the hot path cheap.
+        self.index = index
+        self.parent_index = parent_index
+        self.name = name
+        self.as_type = as_type
+        self.start = time.time()
+        self.end: float | None = None
+        self.input: Any = None
+        self.output: Any = None
+        self.model: str | None = None
+        self.usage: dict | None = None
+        self.metadata: dict | None = None
+        self.level = "DEFAULT"
+        self.status_message: str | None = None
+
+
+class _Trace:
+    """In-flight trace of one job. Unsampled traces only keep span names and timings."""
+
+    __slots__ = (
+        "trace_id",
+        "name",
+        "sampled",
+        "forced_reason",
+        "start",
+        "end",
+        "input",
+        "output",
+        "user_id",
+        "session_id",
+        "metadata",
+        "spans",
+    )
+
+    def __init__(self, name: str, sampled: bool, trace_id: str | None = None):
+        self.trace_id = trace_id or uuid4().hex
+        self.name = name
+        self.sampled = sampled
+        self.forced_reason: str | None = None
+        self.start = time.time()
+        self.end: float | None = None
+        self.input: Any = None
+        self.output: Any = None
+        self.user_id: str | None = None
+        self.session_id: str | None = None
+        self.metadata: dict = {}
+        self.spans: list[_Span] = []
+
+    def force(self, reason: str) -> None:
+        if self.forced_reason is None:
+            self.forced_reason = reason
+
+
+_current_trace: contextvars.ContextVar[_Trace | None] = contextvars.ContextVar("tracing_trace", default=None)
+_current_span: contextvars.ContextVar[_Span | None] = contextvars.ContextVar("tracing_span", default=None)
+
+
+class _BatchExporter:
+    """Bounded queue drained by a daemon thread; traces are dropped rather than blocking a job."""
+
+    def __init__(self, export: Callable[[list[_Trace]], None], max_queue: int, batch_size: int, interval_s: float):
+        self._export = export
+        self._queue: queue.Queue[_Trace] = queue.Queue(maxsize=max_queue)
+        self._batch_size = max(1, batch_size)
+        self._interval_s = interval_s
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, trace: _Trace) -> bool:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout_s: float = 5.0) -> None:
+        deadline = time.monotonic() + timeout_s
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="tracing-exporter", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush, 2.0)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self._interval_s)]
+            except queue.Empty:
+                continue
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._export(batch)
+                self.exported += len(batch)
+            except Exception as exc:
+                self.failed += len(batch)
+                logger.warning("Tracing export failed: %s", exc)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+def _to_datetime(timestamp: float | None) -> datetime | None:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def _build_langfuse_export() -> Callable[[list[_Trace]], None]:
+    # Imported lazily so that a disabled tracer never loads the SDK.
+    from langfuse import Langfuse
+
+    client = Langfuse()
+
+    def export(batch: list[_Trace]) -> None:
+        for trace in batch:
+            metadata = dict(trace.metadata)
+            metadata["sampled"] = trace.sampled
+            if trace.forced_reason:
+                metadata["forced_reason"] = trace.forced_reason
+            client.trace(
+                id=trace.trace_id,
+                name=trace.name,
+                input=trace.input,
+                output=trace.output,
+                user_id=trace.user_id,
+                session_id=trace.session_id,
+                metadata=metadata,
+                timestamp=_to_datetime(trace.start),
+            )
+            for span in trace.spans:
+                common = {
+                    "trace_id": trace.trace_id,
+                    "id": f"{trace.trace_id}-{span.index}",
+                    "parent_observation_id": (
+                        f"{trace.trace_id}-{span.parent_index}" if span.parent_index is not None else None
+                    ),
+                    "name": span.name,
+                    "start_time": _to_datetime(span.start),
+                    "end_time": _to_datetime(span.end),
+                    "input": span.input,
+                    "output": span.output,
+                    "metadata": span.metadata,
+                    "level": span.level,
+                    "status_message": span.status_message,
+                }
+                if span.as_type == "generation":
+                    client.generation(model=span.model, usage_details=span.usage, **common)
+                else:
+                    client.span(**common)
+        client.flush()
+
+    return export
+
+
+class TracingService:
+    """Sampled tracing facade exported asynchronously to Langfuse.
+
+    The sampling decision is taken once per job (head-based). Unsampled jobs still
+    record span names and timings so that errors and fallbacks are always exported.
+    """
+
+    ENABLED: ClassVar[bool] = _env_flag("TRACING_ENABLED", True)
+    SAMPLE_RATE: ClassVar[float] = _env_float("TRACING_SAMPLE_RATE", 1.0)
+    MAX_PAYLOAD_CHARS: ClassVar[int] = _env_int("TRACING_MAX_PAYLOAD_CHARS", 2000)
+    EXPORT_QUEUE_SIZE: ClassVar[int] = _env_int("TRACING_EXPORT_QUEUE_SIZE", 256)
+    EXPORT_BATCH_SIZE: ClassVar[int] = _env_int("TRACING_EXPORT_BATCH_SIZE", 16)
+    EXPORT_INTERVAL_S: ClassVar[float] = 1.0
+
+    _export: ClassVar[Callable[[list[_Trace]], None] | None] = None
+    _exporter: ClassVar[_BatchExporter | None] = None
+    _exporter_lock: ClassVar[threading.Lock] = threading.Lock()
+    _counters: ClassVar[dict[str, int]] = {"started": 0, "sampled": 0, "forced": 0, "discarded": 0}
+
+    @classmethod
+    def configure(
+        cls,
+        *,
+        enabled: bool | None = None,
+        sample_rate: float | None = None,
+        max_payload_chars: int | None = None,
+        export: Callable[[list[_Trace]], None] | None = None,
+    ) -> None:
+        """Override the environment configuration (used by benchmarks and local runs)."""
+        if enabled is not None:
+            cls.ENABLED = enabled
+        if sample_rate is not None:
+            cls.SAMPLE_RATE = min(max(sample_rate, 0.0), 1.0)
+        if max_payload_chars is not None:
+            cls.MAX_PAYLOAD_CHARS = max_payload_chars
+        if export is not None:
+            cls._export = export
+            cls._exporter = None
+
+    @classmethod
+    @contextmanager
+    def trace(
+        cls,
+        name: str,
+        *,
+        input: Any = None,
+        trace_id: str | None = None,
+        user_id: str | None = None,
+        session_id: str | None = None,
+    ) -> Iterator[_Trace | None]:
+        """Open the root trace of a job; nested `traced` calls attach to it."""
+        if not cls.ENABLED:
+            yield None
+            return
+
+        cls._counters["started"] += 1
+        sampled = cls.SAMPLE_RATE >= 1.0 or random.random() < cls.SAMPLE_RATE
+        trace = _Trace(name, sampled, trace_id)
+        trace.user_id = user_id
+        trace.session_id = session_id
+        trace.input = cap_payload(input, cls.MAX_PAYLOAD_CHARS)
+
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(None)
+        try:
+            yield trace
+        except BaseException as exc:
+            trace.force("error")
+            trace.output = cap_payload(f"{type(exc).__name__}: {exc}", cls.MAX_PAYLOAD_CHARS)
+            raise
+        finally:
+            trace.end = time.time()
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            cls._submit(trace)
+
+    @classmethod
+    def is_sampled(cls) -> bool:
+        """True when the current job records full payloads; use it to skip building them."""
+        trace = _current_trace.get()
+        return trace is not None and trace.sampled
+
+    @classmethod
+    def update_trace(cls, *, output: Any = None, metadata: dict | None = None) -> None:
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        if metadata:
+            trace.metadata.update(metadata)
+        if output is not None:
+            trace.output = cap_payload(output, cls.MAX_PAYLOAD_CHARS)
+
+    @classmethod
+    def update_observation(
+        cls,
+        *,
+        name: str | None = None,
+        input: Any = None,
+        output: Any = None,
+        model: str | None = None,
+        usage_details: dict | None = None,
+        metadata: dict | None = None,
+    ) -> None:
+        trace = _current_trace.get()
+        span = _current_span.get()
+        if trace is None or span is None:
+            return
+        if name is not None:
+            span.name = name
+        if not trace.sampled:
+            return
+        if input is not None:
+            span.input = cap_payload(input, cls.MAX_PAYLOAD_CHARS)
+        if output is not None:
+            span.output = cap_payload(output, cls.MAX_PAYLOAD_CHARS)
+        if model is not None:
+            span.model = model
+        if usage_details is not None:
+            span.usage = usage_details
+        if metadata:
+            span.metadata = {**(span.metadata or {}), **cap_payload(metadata, cls.MAX_PAYLOAD_CHARS)}
+
+    @classmethod
+    def mark_error(cls, message: str) -> None:
+        """Flag the current span as failed and force the job trace to be exported."""
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        trace.force("error")
+        span = _current_span.get()
+        if span is not None:
+            span.level = "ERROR"
+            span.status_message = cap_payload(message, cls.MAX_PAYLOAD_CHARS)
+
+    @classmethod
+    def mark_fallback(cls, reason: str = "fallback") -> None:
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.force(reason)
+
+    @classmethod
+    def stats(cls) -> dict[str, int | float]:
+        exporter = cls._exporter
+        return {
+            "enabled": cls.ENABLED,
+            "sample_rate": cls.SAMPLE_RATE,
+            **cls._counters,
+            "exported": exporter.exported if exporter else 0,
+            "dropped": exporter.dropped if exporter else 0,
+            "failed": exporter.failed if exporter else 0,
+        }
+
+    @classmethod
+    def flush(cls, timeout_s: float = 5.0) -> None:
+        if cls._exporter is not None:
+            cls._exporter.flush(timeout_s)
+
+    @classmethod
+    def _submit(cls, trace: _Trace) -> None:
+        if trace.sampled:
+            cls._counters["sampled"] += 1
+        elif trace.forced_reason is not None:
+            cls._counters["forced"] += 1
+        else:
+            cls._counters["discarded"] += 1
+            return
+
+        exporter = cls._get_exporter()
+        if exporter is not None:
+            exporter.submit(trace)
+
+    @classmethod
+    def _get_exporter(cls) -> _BatchExporter | None:
+        if cls._exporter is not None:
+            return cls._exporter
+        with cls._exporter_lock:
+            if cls._exporter is None:
+                export = cls._export
+                if export is None:
+                    try:
+                        export = _build_langfuse_export()
+                    except Exception as exc:
+                        logger.warning("Tracing disabled, Langfuse exporter unavailable: %s", exc)
+                        cls.ENABLED = False
+                        return None
+                    cls._export = export
+                cls._exporter = _BatchExporter(
+                    export,
+                    max_queue=cls.EXPORT_QUEUE_SIZE,
+                    batch_size=cls.EXPORT_BATCH_SIZE,
+                    interval_s=cls.EXPORT_INTERVAL_S,
+                )
+        return cls._exporter
+
+
+def traced(name: str, as_type: str = "span") -> Callable:
+    """Async decorator recording a span under the current job trace, if any."""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return await func(*args, **kwargs)
+
+            parent = _current_span.get()
+            span = _Span(name, as_type, len(trace.spans), parent.index if parent else None)
+            trace.spans.append(span)
+            token = _current_span.set(span)
+            try:
+                return await func(*args, **kwargs)
+            except BaseException as exc:
+                span.level = "ERROR"
+                span.status_message = f"{type(exc).__name__}: {exc}"[: TracingService.MAX_PAYLOAD_CHARS]
+                trace.force("error")
+                raise
+            finally:
+                span.end = time.time()
+                _current_span.reset(token)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,145 @@
+"""Truncated (Matryoshka) and quantized embeddings, and a local vector index built on them.
+
+text-embedding-3 vectors keep most of their quality when cut to their first dimensions and
+re-normalized. Vectors can additionally be stored as int8 (one byte per dimension and a scale) or
+binary codes (one bit per dimension). Scores are always computed against the float query: int8
+codes are scored directly, while binary codes preselect candidates by Hamming distance, which are
+then rescored from their full-precision vectors, kept on disk rather than in memory.
+
+Everything here is pure Python so that it can run (and be benchmarked) without network access.
+"""
+
+import heapq
+import math
+import os
+import tempfile
+from array import array
+from operator import mul
+from typing import Hashable, Iterable, Sequence
+
+QUANTIZATION_FLOAT = "float"
+QUANTIZATION_INT8 = "int8"
+QUANTIZATION_BINARY = "binary"
+QUANTIZATIONS = (QUANTIZATION_FLOAT, QUANTIZATION_INT8, QUANTIZATION_BINARY)
+
+
+def truncate(vector: Sequence[float], dimensions: int) -> list[float]:
+    """First `dimensions` components, re-normalized to unit length."""
+    head = list(vector[:dimensions])
+    norm = math.sqrt(sum(value * value for value in head))
+    return [value / norm for value in head] if norm else head
+
+
+def quantize_int8(vector: Sequence[float]) -> tuple[array, float]:
+    """Symmetric int8 codes and the scale that maps them back to floats."""
+    peak = max((abs(value) for value in vector), default=0.0)
+    scale = peak / 127 if peak else 1.0
+    return array("b", (round(value / scale) for value in vector)), scale
+
+
+def quantize_binary(vector: Sequence[float]) -> int:
+    """Sign bits packed into an int, bit i set when component i is positive."""
+    bits = 0
+    for position, value in enumerate(vector):
+        if value > 0:
+            bits |= 1 << position
+    return bits
+
+
+def parse_vector(value) -> list[float]:
+    """pgvector columns come back from PostgREST as "[0.1,0.2,...]" strings."""
+    if isinstance(value, str):
+        return [float(component) for component in value.strip("[]").split(",") if component]
+    return list(value)
+
+
+class _DiskVectors:
+    """Float32 vectors in an anonymous temporary file, read back one at a time for rescoring."""
+
+    def __init__(self, dimensions: int):
+        self._row_bytes = dimensions * 4
+        self._file = tempfile.TemporaryFile()
+
+    def append(self, vector: Sequence[float]) -> None:
+        self._file.seek(0, os.SEEK_END)
+        array("f", vector).tofile(self._file)
+
+    def get(self, position: int) -> array:
+        self._file.seek(position * self._row_bytes)
+        vector = array("f")
+        vector.frombytes(self._file.read(self._row_bytes))
+        return vector
+
+    def size_bytes(self) -> int:
+        return self._file.seek(0, os.SEEK_END)
+
+
+class QuantizedVectorIndex:
+    """Exhaustive cosine search over truncated, optionally quantized, unit vectors."""
+
+    def __init__(self, dimensions: int, quantization: str = QUANTIZATION_FLOAT, rescore_candidates: int = 40):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self.rescore_candidates = rescore_candidates
+        self._doc_ids: list[Hashable] = []
+        self._codes: list = []
+        self._scales: list[float] = []
+        self._bits: list[int] = []
+        self._full_vectors = _DiskVectors(dimensions) if quantization == QUANTIZATION_BINARY else None
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def build(self, vectors: Iterable[tuple[Hashable, Sequence[float]]]) -> "QuantizedVectorIndex":
+        for doc_id, vector in vectors:
+            self.add(doc_id, vector)
+        return self
+
+    def add(self, doc_id: Hashable, vector: Sequence[float]) -> None:
+        head = truncate(vector, self.dimensions)
+        self._doc_ids.append(doc_id)
+        if self.quantization == QUANTIZATION_INT8:
+            codes, scale = quantize_int8(head)
+            self._codes.append(codes)
+            self._scales.append(scale)
+        elif self.quantization == QUANTIZATION_BINARY:
+            self._bits.append(quantize_binary(head))
+            self._full_vectors.append(head)
+        else:
+            self._codes.append(array("f", head))
+
+    def search(self, query: Sequence[float], limit: int) -> list[tuple[Hashable, float]]:
+        if not self._doc_ids:
+            return []
+        head = truncate(query, self.dimensions)
+        if self.quantization == QUANTIZATION_BINARY:
+            candidates = self._hamming_candidates(head, max(limit, self.rescore_candidates))
+            scored = ((index, sum(map(mul, head, self._full_vectors.get(index)))) for index in candidates)
+        elif self.quantization == QUANTIZATION_INT8:
+            scored = (
+                (index, sum(map(mul, head, codes)) * self._scales[index]) for index, codes in enumerate(self._codes)
+            )
+        else:
+            scored = ((index, sum(map(mul, head, codes))) for index, codes in enumerate(self._codes))
+        best = heapq.nlargest(limit, scored, key=lambda item: item[1])
+        return [(self._doc_ids[index], score) for index, score in best]
+
+    def memory_bytes(self) -> int:
+        """In-memory size of the stored codes, without the Python object overhead."""
+        if self.quantization == QUANTIZATION_INT8:
+            return len(self._doc_ids) * (self.dimensions + 4)
+        if self.quantization == QUANTIZATION_BINARY:
+            return len(self._doc_ids) * math.ceil(self.dimensions / 8)
+        return len(self._doc_ids) * self.dimensions * 4
+
+    def disk_bytes(self) -> int:
+        """Size of the full-precision vectors kept on disk to rescore binary candidates."""
+        return self._full_vectors.size_bytes() if self._full_vectors is not None else 0
+
+    def _hamming_candidates(self, head: list[float], count: int) -> list[int]:
+        query_bits = quantize_binary(head)
+        return heapq.nsmallest(
+            count, range(len(self._bits)), key=lambda index: (query_bits ^ self._bits[index]).bit_count()
+        )
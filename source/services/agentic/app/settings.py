@@ -0,0 +1,157 @@
+import hmac
+import logging
+import os
+from dataclasses import dataclass, fields
+from typing import Callable
+
+from dotenv import find_dotenv, load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# By default, the closest .env above this package, as load_dotenv() found it.
+ENV_FILE = os.getenv("SETTINGS_ENV_FILE") or None
+
+TIER_SMALL = "small"
+TIER_LARGE = "large"
+TIERS = (TIER_SMALL, TIER_LARGE)
+# The AGENT_NAME of every agent, each configured by its `<AGENT>_*` variables.
+AGENT_NAMES = ("reformulator", "orchestrator", "documentalist", "web_search", "verifier", "summarizer", "basic")
+DEFAULT_MODEL = "gpt-4o-mini-2024-07-18"
+DEFAULT_TEMPERATURE = 0.7
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    model: str
+    tier: str
+    temperature: float
+    max_tokens: int | None
+    timeout_s: float | None
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Secrets, connection and model settings, read once instead of on every request.
+
+    Values come from the process environment (docker compose `env_file`), completed by the .env file
+    for local runs, which is loaded into the environment once so that libraries reading their own keys
+    (Tavily, Langfuse) see it too. `reload_settings` applies the .env file again, over the environment,
+    e.g. after rotating a password, without a restart. The model settings of every agent and tier are
+    parsed here too, from `OPENAI_MODEL`, `OPENAI_SMALL_MODEL`, `OPENAI_TEMPERATURE` and the per-agent
+    `<AGENT>_MODEL`, `<AGENT>_TEMPERATURE`, `<AGENT>_MAX_TOKENS` and `<AGENT>_TIMEOUT_S` overrides.
+    Tuning knobs stay on the classes that use them.
+    """
+
+    password: str | None
+    admin_password: str | None
+    openai_api_key: str | None
+    openai_prompt_cache_key: str | None
+    supabase_url: str | None
+    supabase_service_key: str | None
+    # Default model of each tier, and the configs derived from them keyed by agent name, then tier.
+    tier_models: dict[str, str]
+    model_configs: dict[str, dict[str, ModelConfig]]
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        def value(name: str) -> str | None:
+            # Unset and empty are the same: an empty PASSWORD must not accept empty passwords.
+            return os.getenv(name) or None
+
+        large_model = value("OPENAI_MODEL") or DEFAULT_MODEL
+        tier_models = {TIER_LARGE: large_model, TIER_SMALL: value("OPENAI_SMALL_MODEL") or large_model}
+        return cls(
+            password=value("PASSWORD"),
+            admin_password=value("ADMIN_PASSWORD"),
+            openai_api_key=value("OPENAI_API_KEY"),
+            openai_prompt_cache_key=value("OPENAI_PROMPT_CACHE_KEY"),
+            supabase_url=value("SUPABASE_URL"),
+            supabase_service_key=value("SUPABASE_SERVICE_KEY"),
+            tier_models=tier_models,
+            model_configs=cls._model_configs(value, tier_models),
+        )
+
+    @staticmethod
+    def _model_configs(
+        value: Callable[[str], str | None], tier_models: dict[str, str]
+    ) -> dict[str, dict[str, ModelConfig]]:
+        def number(name: str, cast: Callable[[str], float], minimum: float, maximum: float | None = None):
+            # A typo must stop the startup (or be refused by a reload), not fail every job.
+            raw = value(name)
+            if raw is None:
+                return None
+            try:
+                parsed = cast(raw)
+            except ValueError:
+                raise ValueError(f"Invalid {name}: {raw!r} is not a number") from None
+            if parsed < minimum or (maximum is not None and parsed > maximum):
+                bounds = f"between {minimum} and {maximum}" if maximum is not None else f"at least {minimum}"
+                raise ValueError(f"Invalid {name}: {raw!r}, expected {bounds}")
+            return parsed
+
+        default_temperature = number("OPENAI_TEMPERATURE", float, 0, 2)
+        if default_temperature is None:
+            default_temperature = DEFAULT_TEMPERATURE
+        configs = {}
+        for agent_name in AGENT_NAMES:
+            prefix = agent_name.upper()
+            temperature = number(f"{prefix}_TEMPERATURE", float, 0, 2)
+            configs[agent_name] = {
+                tier: ModelConfig(
+                    model=value(f"{prefix}_MODEL") or tier_models[tier],
+                    tier=tier,
+                    temperature=default_temperature if temperature is None else temperature,
+                    max_tokens=number(f"{prefix}_MAX_TOKENS", int, 1),
+                    timeout_s=number(f"{prefix}_TIMEOUT_S", float, 0.001),
+                )
+                for tier in TIERS
+            }
+        return configs
+
+    def missing(self) -> list[str]:
+        """Required settings that are not set."""
+        required = ("password", "openai_api_key", "supabase_url", "supabase_service_key")
+        return [name.upper() for name in required if getattr(self, name) is None]
+
+    def summary(self) -> dict[str, bool]:
+        """Which secrets and connection settings are set, without their values."""
+        return {
+            field.name: getattr(self, field.name) is not None
+            for field in fields(self)
+            if field.name not in ("tier_models", "model_configs")
+        }
+
+
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    """Current settings, loaded on first use (at startup, from the lifespan)."""
+    global _settings
+    if _settings is None:
+        _settings = _load(override=False)
+    return _settings
+
+
+def reload_settings() -> Settings:
+    """Load the settings again; invalid values raise ValueError and keep the current settings."""
+    global _settings
+    _settings = _load(override=True)
+    logger.info("Settings reloaded")
+    return _settings
+
+
+def check_password(given: str | None, expected: str | None) -> bool:
+    """Constant-time comparison; always False when no password is configured."""
+    if expected is None or given is None:
+        return False
+    return hmac.compare_digest(given.encode(), expected.encode())
+
+
+def _load(override: bool) -> Settings:
+    load_dotenv(ENV_FILE or find_dotenv(), override=override)
+    settings = Settings.from_env()
+    missing = settings.missing()
+    if missing:
+        logger.warning("Missing settings: %s", ", ".join(missing))
+    return settings
@@ -0,0 +1,111 @@
+"""Recall, memory and latency of truncated and quantized embeddings against full-precision search.
+
+Run from source/services/agentic:
+
+    python benchmarks/bench_embeddings.py [--docs 1000] [--queries 20] [--seed 7]
+                                          [--vectors vectors.json]
+
+By default the corpus is synthetic: 3072-dimensional unit vectors drawn around topic centroids,
+whose variance decays along the dimensions like Matryoshka-trained embeddings, and queries are
+noisy copies of documents. The relevant answer of a synthetic query is its exact nearest
+neighbour (full dimensions, float), so exact float search is the upper bound. Pass `--vectors`
+with a JSON object {"documents": [[id, vector], ...], "queries": [[relevant_id, vector], ...]}
+(e.g. title_embedding rows and embedded questions exported from Supabase) to measure real data.
+
+"hit@10" is the share of queries whose relevant document is in the top 10, "overlap@10" the share
+of the exact top 10 (full dimensions, float) found. "payload" is the JSON size of the query vector
+sent to match_documents(_compact). "disk/doc" counts the float32 vectors binary indexes keep on
+disk to rescore their candidates.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.vector_quantization import QUANTIZATIONS, QuantizedVectorIndex, truncate  # noqa: E402
+
+FULL_DIMENSIONS = 3072
+DIMENSIONS = (3072, 1024, 512, 256)
+TOP_K = 10
+RESCORE_CANDIDATES = 100
+TOPICS = 50
+
+
+def synthetic_vector(rng: random.Random) -> list[float]:
+    return [rng.gauss(0, 1) / math.sqrt(1 + position / 64) for position in range(FULL_DIMENSIONS)]
+
+
+def synthetic_corpus(docs: int, queries: int, seed: int) -> tuple[list, list]:
+    rng = random.Random(seed)
+
+    def around(center: list[float], spread: float) -> list[float]:
+        return truncate(
+            [value + spread * noise for value, noise in zip(center, synthetic_vector(rng))], FULL_DIMENSIONS
+        )
+
+    topics = [synthetic_vector(rng) for _ in range(TOPICS)]
+    documents = [(doc_id, around(rng.choice(topics), 0.8)) for doc_id in range(docs)]
+    query_vectors = []
+    for _ in range(queries):
+        doc_id, vector = rng.choice(documents)
+        query_vectors.append((doc_id, around(vector, 0.6)))
+    return documents, query_vectors
+
+
+def main(docs: int, queries: int, seed: int, vectors_path: str | None) -> None:
+    if vectors_path:
+        with open(vectors_path, encoding="utf-8") as vectors_file:
+            loaded = json.load(vectors_file)
+        documents = [(doc_id, vector) for doc_id, vector in loaded["documents"]]
+        query_vectors = loaded["queries"]
+    else:
+        documents, query_vectors = synthetic_corpus(docs, queries, seed)
+
+    exact = QuantizedVectorIndex(FULL_DIMENSIONS).build(documents)
+    exact_rankings = [[doc_id for doc_id, _ in exact.search(query, TOP_K)] for _, query in query_vectors]
+    truth = [set(ranking) for ranking in exact_rankings]
+    if not vectors_path:
+        # The document a synthetic query was drawn from is not always its nearest neighbour.
+        query_vectors = [(ranking[0], query) for ranking, (_, query) in zip(exact_rankings, query_vectors)]
+
+    print(f"{len(documents)} documents, {len(query_vectors)} queries, top {TOP_K}")
+    print(
+        f"{'dims':>5} {'quant':>7} {'hit@10':>7} {'overlap@10':>11} {'bytes/doc':>10} {'disk/doc':>9} {'index MB':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'payload':>8}"
+    )
+    for dimensions in DIMENSIONS:
+        for quantization in QUANTIZATIONS:
+            index = QuantizedVectorIndex(dimensions, quantization, RESCORE_CANDIDATES).build(documents)
+            latencies, hits, overlaps = [], [], []
+            for (relevant_id, query), expected in zip(query_vectors, truth):
+                started = time.perf_counter()
+                found = {doc_id for doc_id, _ in index.search(query, TOP_K)}
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits.append(relevant_id in found)
+                overlaps.append(len(expected & found) / TOP_K)
+            latencies.sort()
+            payload = len(json.dumps(truncate(query_vectors[0][1], dimensions)))
+            print(
+                f"{dimensions:>5} {quantization:>7} {statistics.mean(hits):>7.3f} {statistics.mean(overlaps):>11.3f} "
+                f"{index.memory_bytes() / len(index):>10.0f} {index.disk_bytes() / len(index):>9.0f} "
+                f"{index.memory_bytes() / 1e6:>9.2f} "
+                f"{statistics.median(latencies):>8.2f} {latencies[max(0, int(len(latencies) * 0.95) - 1)]:>8.2f} "
+                f"{payload / 1000:>7.1f}K"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--vectors", help="JSON file with real document and query embeddings.")
+    args = parser.parse_args()
+    main(args.docs, args.queries, args.seed, args.vectors)
@@ -0,0 +1,136 @@
+"""Retry, backoff and circuit breaker behaviour against fault-injecting dependency stubs.
+
+Run from source/services/agentic:
+
+    python benchmarks/bench_resilience.py [--calls 400] [--seed 7]
+
+`FaultyDependency` mimics an OpenAI/Supabase/Tavily client: it answers after a short latency,
+fails a share of the calls with transient errors (HTTP 429/503) and can be taken down for an
+outage, during which every call hangs before timing out. Delays are scaled down so the
+scenarios run in a few seconds.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.loop_monitor_service import LoopMonitorService  # noqa: E402
+from app.services.resilience_service import (  # noqa: E402
+    BREAKER_CLOSED,
+    DependencyUnavailableError,
+    ResilienceService,
+)
+
+
+class StubHTTPError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FaultyDependency:
+    def __init__(self, failure_rate: float, latency_s: float = 0.002, hang_s: float = 0.2):
+        self.failure_rate = failure_rate
+        self.latency_s = latency_s
+        self.hang_s = hang_s
+        self.down_until = 0.0
+        self.calls = 0
+
+    def outage(self, duration_s: float) -> None:
+        self.down_until = time.monotonic() + duration_s
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        if time.monotonic() < self.down_until:
+            await asyncio.sleep(self.hang_s)
+            raise TimeoutError("stub dependency is down")
+        await asyncio.sleep(self.latency_s)
+        if random.random() < self.failure_rate:
+            raise StubHTTPError(random.choice((429, 503)))
+        return "ok"
+
+
+async def run_calls(dependency_name: str, stub: FaultyDependency, calls: int, max_attempts: int) -> dict:
+    succeeded = failed_fast = failed = 0
+    latencies = []
+    for _ in range(calls):
+        started_at = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):  # silence the per-retry log lines
+                await ResilienceService.call(dependency_name, stub, max_attempts=max_attempts)
+            succeeded += 1
+        except DependencyUnavailableError:
+            failed_fast += 1
+        except Exception:
+            failed += 1
+        latencies.append(time.perf_counter() - started_at)
+    latencies.sort()
+    return {
+        "succeeded": succeeded,
+        "failed": failed,
+        "failed_fast": failed_fast,
+        "stub_calls": stub.calls,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000,
+    }
+
+
+def print_row(name: str, result: dict) -> None:
+    print(
+        f"{name:<28} {result['succeeded']:>9} {result['failed']:>7} {result['failed_fast']:>12} "
+        f"{result['stub_calls']:>11} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}"
+    )
+
+
+async def main(calls: int) -> None:
+    LoopMonitorService.start()
+    ResilienceService.BASE_DELAY_S = 0.005
+    ResilienceService.MAX_DELAY_S = 0.05
+    ResilienceService.BREAKER_RESET_TIMEOUT_S = 0.5
+
+    print(f"{'scenario':<28} {'succeeded':>9} {'failed':>7} {'failed fast':>12} {'stub calls':>11} {'p50 ms':>8} {'p95 ms':>8}")
+
+    for max_attempts in (1, 3):
+        ResilienceService.reset()
+        stub = FaultyDependency(failure_rate=0.2)
+        print_row(f"20% transient, {max_attempts} attempt(s)", await run_calls("transient", stub, calls, max_attempts))
+
+    # During an outage every call hangs: without a breaker each one pays the hang on every attempt,
+    # with it the calls fail fast once the breaker opens.
+    outage_calls = 20
+    for name, threshold in (("outage, no breaker", 10**9), ("outage, breaker", 5)):
+        ResilienceService.BREAKER_FAILURE_THRESHOLD = threshold
+        ResilienceService.reset()
+        stub = FaultyDependency(failure_rate=0.0, hang_s=0.05)
+        stub.outage(3600)
+        print_row(name, await run_calls("outage", stub, outage_calls, 3))
+
+    stub.down_until = 0.0
+    await asyncio.sleep(ResilienceService.BREAKER_RESET_TIMEOUT_S)
+    print_row("after outage", await run_calls("outage", stub, 10, 3))
+    breaker = ResilienceService.breaker("outage").snapshot()
+    print(f"\nbreaker after recovery: {breaker['state']} (opened {breaker['opened']}x, rejected {breaker['rejected']})")
+    assert breaker["state"] == BREAKER_CLOSED
+
+    await LoopMonitorService.stop()
+    loop = LoopMonitorService.stats()
+    print(
+        f"\nevent loop lag: p50 {loop['lag_p50_ms']} ms, p95 {loop['lag_p95_ms']} ms, max {loop['lag_max_ms']} ms, "
+        f"{loop['slow_callbacks']} slow callback(s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(main(args.calls))
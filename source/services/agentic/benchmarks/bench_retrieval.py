@@ -0,0 +1,108 @@
+"""Offline recall@k and latency of the hybrid retriever's local stages.
+
+Run from source/services/agentic:
+
+    python benchmarks/bench_retrieval.py [--dataset benchmarks/data/retrieval_sample.json]
+                                         [--vector-rankings rankings.json]
+
+The dataset holds ai_data-like documents and labelled questions. Vector rankings cannot be
+computed offline; pass a JSON object mapping each question to the ids returned by
+match_documents (e.g. exported from a live run) to benchmark full hybrid fusion. Without it,
+only the lexical stages are measured. Questions may list `variants` (e.g. their French
+translation), searched along with the question and fused by the multi-query rankers.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.hybrid_search import BM25Index, reciprocal_rank_fusion, rerank, rerank_multi  # noqa: E402
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(__file__), "data", "retrieval_sample.json")
+KS = (1, 3, 5, 8)
+CANDIDATES = 40
+
+
+def evaluate(name: str, questions: list[dict], ranker) -> None:
+    hits = {k: 0 for k in KS}
+    reciprocal_ranks = []
+    latencies = []
+    for item in questions:
+        started = time.perf_counter()
+        ranked = ranker(item["question"])
+        latencies.append((time.perf_counter() - started) * 1e3)
+        relevant = set(item["relevant"])
+        for k in KS:
+            if relevant & set(ranked[:k]):
+                hits[k] += 1
+        first = next((rank for rank, doc_id in enumerate(ranked, start=1) if doc_id in relevant), None)
+        reciprocal_ranks.append(1 / first if first else 0.0)
+
+    recalls = " ".join(f"R@{k}={hits[k] / len(questions):.2f}" for k in KS)
+    p95 = sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"{name:>25}: {recalls} MRR={statistics.mean(reciprocal_ranks):.2f} "
+        f"p50={statistics.median(latencies):.3f}ms p95={p95:.3f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--vector-rankings", help="JSON mapping question -> ranked ids from match_documents.")
+    args = parser.parse_args()
+
+    with open(args.dataset, encoding="utf-8") as dataset_file:
+        dataset = json.load(dataset_file)
+    documents = {doc["id"]: (doc["Title"], doc["Content"]) for doc in dataset["documents"]}
+    questions = dataset["questions"]
+    variants = {item["question"]: [item["question"], *item.get("variants", [])] for item in questions}
+
+    started = time.perf_counter()
+    index = BM25Index().build((doc_id, title, content) for doc_id, (title, content) in documents.items())
+    print(f"index: {len(index)} documents built in {(time.perf_counter() - started) * 1e3:.1f}ms")
+
+    def bm25(query: str) -> list:
+        return [doc_id for doc_id, _ in index.search(query, CANDIDATES)]
+
+    def bm25_rerank(query: str) -> list:
+        return [doc_id for doc_id, _ in rerank(query, reciprocal_rank_fusion([bm25(query)]), documents)]
+
+    def bm25_multi(query: str) -> list:
+        fused = reciprocal_rank_fusion([bm25(variant) for variant in variants[query]])
+        return [doc_id for doc_id, _ in rerank_multi(variants[query], fused, documents)]
+
+    evaluate("bm25", questions, bm25)
+    evaluate("bm25 + rerank", questions, bm25_rerank)
+    evaluate("bm25 multi-query + rerank", questions, bm25_multi)
+
+    if args.vector_rankings:
+        with open(args.vector_rankings, encoding="utf-8") as rankings_file:
+            vector_rankings = json.load(rankings_file)
+
+        def vector(query: str) -> list:
+            return vector_rankings.get(query, [])[:CANDIDATES]
+
+        def hybrid(query: str) -> list:
+            return [doc_id for doc_id, _ in reciprocal_rank_fusion([vector(query), bm25(query)])]
+
+        def hybrid_rerank(query: str) -> list:
+            return [doc_id for doc_id, _ in rerank(query, reciprocal_rank_fusion([vector(query), bm25(query)]), documents)]
+
+        def hybrid_multi(query: str) -> list:
+            rankings = [ranking for variant in variants[query] for ranking in (vector(variant), bm25(variant))]
+            return [doc_id for doc_id, _ in rerank_multi(variants[query], reciprocal_rank_fusion(rankings), documents)]
+
+        evaluate("vector", questions, vector)
+        evaluate("hybrid (rrf)", questions, hybrid)
+        evaluate("hybrid (rrf + rerank)", questions, hybrid_rerank)
+        evaluate("hybrid multi-query", questions, hybrid_multi)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Per-job overhead of the tracing facade at several sampling rates.
+
+Run from source/services/agentic:
+
+    python benchmarks/bench_tracing.py --jobs 2000
+
+The simulated job mirrors the multi-agent pipeline span tree (reformulator,
+orchestrator with nested documentalist tool calls, verifier) and attaches
+realistic payloads. No network is involved: the exporter only counts traces.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.tracing_service import TracingService, traced  # noqa: E402
+
+LARGE_TOOL_RESULT = [["id", "question"]] + [[index, "Question title " * 8] for index in range(40)]
+LARGE_MESSAGES = ["System prompt " * 200, "User question " * 10]
+
+
+@traced("Method: Tool Call")
+async def fake_tool(name: str) -> list:
+    if TracingService.is_sampled():
+        TracingService.update_observation(input={"Tool Called": name, "Args": {"query": "q" * 200}})
+    return LARGE_TOOL_RESULT
+
+
+@traced("Method: LLM Call", as_type="generation")
+async def fake_llm_call(tool_calls: int) -> str:
+    for _ in range(tool_calls):
+        await fake_tool("get_relevant_question_titles")
+    if TracingService.is_sampled():
+        TracingService.update_observation(
+            input=LARGE_MESSAGES,
+            model="gpt-4o-mini",
+            usage_details={"input": 1200, "output": 300, "total": 1500},
+        )
+    return "answer " * 100
+
+
+@traced("Agent: Documentalist")
+async def fake_documentalist() -> str:
+    return await fake_llm_call(tool_calls=3)
+
+
+@traced("Agent: Orchestrator")
+async def fake_orchestrator() -> str:
+    for _ in range(2):
+        await fake_documentalist()
+    return await fake_llm_call(tool_calls=0)
+
+
+@traced("Method: Multi-Agent Message")
+async def fake_pipeline() -> str:
+    await fake_llm_call(tool_calls=0)
+    answer = await fake_orchestrator()
+    await fake_llm_call(tool_calls=0)
+    TracingService.update_trace(output=answer)
+    return answer
+
+
+async def run_jobs(jobs: int) -> float:
+    started = time.perf_counter()
+    for index in range(jobs):
+        with TracingService.trace("Chat", input="Quels sont les horaires ?", trace_id=str(index)):
+            await fake_pipeline()
+    return (time.perf_counter() - started) / jobs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=2000)
+    args = parser.parse_args()
+
+    exported = []
+    TracingService.configure(export=lambda batch: exported.extend(batch))
+
+    TracingService.configure(enabled=False)
+    baseline = asyncio.run(run_jobs(args.jobs))
+    print(f"{'tracing off':>16}: {baseline * 1e6:8.1f} us/job")
+
+    for rate in (0.0, 0.1, 1.0):
+        TracingService.configure(enabled=True, sample_rate=rate)
+        per_job = asyncio.run(run_jobs(args.jobs))
+        overhead = (per_job - baseline) * 1e6
+        print(f"{f'sampling {rate:.0%}':>16}: {per_job * 1e6:8.1f} us/job (+{overhead:.1f} us overhead)")
+
+    TracingService.flush()
+    print(f"exporter stats: {TracingService.stats()}")
+
+
+if __name__ == "__main__":
+    main()
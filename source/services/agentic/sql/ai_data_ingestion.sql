@@ -0,0 +1,64 @@
+-- Schema used by app/scripts/ingest_ai_data.py.
+-- ai_data already holds id, "Title", "Content" and title_embedding (read by match_documents).
+
+alter table ai_data add column if not exists content_hash text;
+
+-- Optional content chunks, filled with `python -m app.scripts.ingest_ai_data --chunks`.
+create table if not exists ai_data_chunks (
+    id bigserial primary key,
+    question_id bigint not null references ai_data (id) on delete cascade,
+    chunk_index integer not null,
+    content text not null,
+    embedding vector(3072),
+    unique (question_id, chunk_index)
+);
+
+create index if not exists ai_data_chunks_question_id_idx on ai_data_chunks (question_id);
+
+create or replace function match_document_chunks(query_embedding vector(3072), match_count int)
+returns table (question_id bigint, chunk_index integer, content text, similarity float)
+language sql stable
+as $$
+    select question_id, chunk_index, content, 1 - (embedding <=> query_embedding) as similarity
+    from ai_data_chunks
+    order by embedding <=> query_embedding
+    limit match_count;
+$$;
+
+-- Vector search with truncated and/or binary-quantized embeddings (pgvector >= 0.7), called instead of
+-- match_documents when EMBEDDING_DIMENSIONS < 3072 or EMBEDDING_QUANTIZATION=binary. The stored
+-- title_embedding stays full size: it is cut to the query's dimensions and re-normalized on the fly.
+-- With binary_prefilter, candidate_count rows are preselected by Hamming distance between sign bits,
+-- then rescored by cosine similarity on the same truncated float vectors (not the full embedding).
+-- Both steps compute their distance on every row: the dimensions vary with the query, so no index
+-- applies and this is a sequential scan. The prefilter saves float distance computations, not reads.
+create or replace function match_documents_compact(
+    query_embedding vector,
+    match_count int,
+    candidate_count int,
+    binary_prefilter boolean default false
+)
+returns table (id bigint, "Title" text, similarity float)
+language sql stable
+as $$
+    with candidates as (
+        select id, "Title", title_embedding
+        from ai_data
+        where binary_prefilter and title_embedding is not null
+        order by binary_quantize(subvector(title_embedding, 1, vector_dims(query_embedding)))
+            <~> binary_quantize(query_embedding)
+        limit candidate_count
+    ),
+    pool as (
+        select id, "Title", title_embedding from candidates
+        union all
+        select id, "Title", title_embedding from ai_data where not binary_prefilter and title_embedding is not null
+    )
+    select
+        id,
+        "Title",
+        1 - (l2_normalize(subvector(title_embedding, 1, vector_dims(query_embedding))) <=> query_embedding) as similarity
+    from pool
+    order by similarity desc
+    limit match_count;
+$$;